@@ -77,5 +77,6 @@ class FusionCredentials:
     def get_fusion_token_expires_in(self, token_key: str) -> int | None: ...
     def refresh_bearer_token(self) -> None: ...
     def get_fusion_token_headers(self, url: str) -> dict[str, str]: ...
+    def token_cache_stats(self) -> dict[str, int]: ...
 
 def rust_ok() -> bool: ...
@@ -0,0 +1,249 @@
+"""Persistent on-disk block cache for Fusion file random access."""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, ClassVar
+
+from fsspec.caching import BaseCache, register_cache
+
+logger = logging.getLogger(__name__)
+VERBOSE_LVL = 25
+DEFAULT_BLOCK_CACHE_DIR = Path.home() / ".cache" / "fusion" / "blocks"
+DEFAULT_BLOCK_CACHE_SIZE = 10 * 2**30
+DEFAULT_READAHEAD_BLOCKS = 2
+# eviction frees space down to this fraction of max_size, so it does not run again on the next write
+EVICTION_TARGET = 0.9
+
+# bytes in each cache folder, scanned once per process and then kept up to date by the writes and evictions
+_cache_dir_usage: dict[Path, int] = {}
+_cache_dir_usage_lock = threading.Lock()
+
+
+class FusionBlockCache(BaseCache):  # type: ignore
+    """Size-bounded block cache persisted on disk and shared between processes.
+
+    Blocks are stored as individual files named after a hash of the cache key (the distribution
+    URL and its digest) and the block offset, so every process reading the same distribution
+    version reuses the blocks fetched by any other. Blocks are written atomically and the least
+    recently used ones are evicted once the cache directory grows beyond max_size. The size of the
+    directory is kept as a running total, so it is only scanned when eviction is due.
+
+    Two readahead policies are supported. "parquet" fetches the block holding the file footer
+    together with the first requested block, since parquet readers always start from the footer
+    and then jump to column chunks. "sequential" extends reads that continue where the previous
+    one stopped by readahead_blocks blocks, which suits streaming CSV and JSON readers.
+    """
+
+    name: ClassVar[str] = "fusion_disk"
+
+    def __init__(  # noqa: PLR0913
+        self,
+        blocksize: int,
+        fetcher: Callable[[int, int], bytes],
+        size: int,
+        key: str = "",
+        cache_dir: str | Path | None = None,
+        max_size: int = DEFAULT_BLOCK_CACHE_SIZE,
+        readahead: str = "auto",
+        readahead_blocks: int = DEFAULT_READAHEAD_BLOCKS,
+    ) -> None:
+        """Constructor to instantiate the cache, fsspec passes cache_options as keyword arguments.
+
+        Args:
+            blocksize (int): Size of a cached block in bytes.
+            fetcher (Callable): Function fetching the bytes between start and end from the remote file.
+            size (int): Size of the remote file.
+            key (str, optional): Identity of the remote file version, e.g. its URL and digest.
+            cache_dir (Union[str, Path], optional): Folder where blocks are persisted.
+                Defaults to FUSION_BLOCK_CACHE_DIR or ~/.cache/fusion/blocks.
+            max_size (int, optional): Maximum size of the cache folder in bytes. Defaults to 10 GiB.
+            readahead (str, optional): Readahead policy, one of "auto", "parquet", "sequential" or "none".
+                "auto" picks "parquet" for parquet distributions and "sequential" otherwise.
+            readahead_blocks (int, optional): Number of blocks read ahead by the sequential policy.
+        """
+        super().__init__(blocksize, fetcher, size)
+        if readahead == "auto":
+            readahead = "parquet" if key.rstrip("/").split("|")[0].endswith(("parquet", "parq")) else "sequential"
+        if readahead not in ["parquet", "sequential", "none"]:
+            raise ValueError(f"Unknown readahead policy {readahead}")
+
+        self.key = key
+        self.cache_dir = Path(cache_dir or os.environ.get("FUSION_BLOCK_CACHE_DIR") or DEFAULT_BLOCK_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.readahead = readahead
+        self.readahead_blocks = readahead_blocks
+        self._prefix = hashlib.sha256(f"{key}|{size}|{blocksize}".encode()).hexdigest()
+        self._last_stop: int | None = None
+        self._footer_fetched = False
+        self.hit_count = 0
+        self.miss_count = 0
+        with _cache_dir_usage_lock:
+            if self.cache_dir not in _cache_dir_usage:
+                _cache_dir_usage[self.cache_dir] = sum(size for _, size, _ in self._blocks_on_disk())
+
+    def __repr__(self) -> str:
+        """Object representation."""
+        return (
+            f"<FusionBlockCache: key={self.key!r}, blocksize={self.blocksize}, size={self.size}, "
+            f"hits={self.hit_count}, misses={self.miss_count}>"
+        )
+
+    def _block_path(self, block_number: int) -> Path:
+        return self.cache_dir / self._prefix[:2] / f"{self._prefix}_{block_number * self.blocksize}"
+
+    def _read_block(self, block_number: int) -> bytes | None:
+        path = self._block_path(block_number)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        expected = min(self.blocksize, self.size - block_number * self.blocksize)
+        if len(data) != expected:
+            return None
+        with contextlib.suppress(OSError):
+            # touch the block so eviction drops the least recently used ones first
+            os.utime(path)
+        return data
+
+    def _write_block(self, block_number: int, data: bytes) -> int:
+        path = self._block_path(block_number)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            Path(tmp_path).replace(path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return len(data)
+
+    def _fetch_blocks(self, first: int, last: int) -> dict[int, bytes]:
+        """Fetch a contiguous run of blocks from the remote file in a single request."""
+        start = first * self.blocksize
+        stop = min((last + 1) * self.blocksize, self.size)
+        data = self.fetcher(start, stop)
+        blocks = {}
+        written = 0
+        for block_number in range(first, last + 1):
+            offset = (block_number - first) * self.blocksize
+            blocks[block_number] = data[offset : offset + self.blocksize]
+            written += self._write_block(block_number, blocks[block_number])
+        self._add_usage(written)
+        return blocks
+
+    def _blocks_to_load(self, start: int, stop: int) -> list[int]:
+        first = start // self.blocksize
+        last = (stop - 1) // self.blocksize
+        n_blocks = (self.size - 1) // self.blocksize + 1
+        wanted = set(range(first, last + 1))
+        if self.readahead == "parquet" and not self._footer_fetched:
+            wanted.add(n_blocks - 1)
+            self._footer_fetched = True
+        elif self.readahead == "sequential" and self._last_stop == start:
+            wanted.update(range(last + 1, min(last + 1 + self.readahead_blocks, n_blocks)))
+        return sorted(wanted)
+
+    def _fetch(self, start: int | None, stop: int | None) -> bytes:
+        if start is None:
+            start = 0
+        if stop is None:
+            stop = self.size
+        stop = min(stop, self.size)
+        if start >= self.size or start >= stop:
+            return b""
+
+        blocks: dict[int, bytes] = {}
+        missing = []
+        for block_number in self._blocks_to_load(start, stop):
+            data = self._read_block(block_number)
+            if data is None:
+                missing.append(block_number)
+            else:
+                blocks[block_number] = data
+        self.hit_count += len(blocks)
+        self.miss_count += len(missing)
+
+        # coalesce contiguous missing blocks into single ranged requests
+        runs: list[list[int]] = []
+        for block_number in missing:
+            if runs and runs[-1][-1] == block_number - 1:
+                runs[-1].append(block_number)
+            else:
+                runs.append([block_number])
+        for run in runs:
+            blocks.update(self._fetch_blocks(run[0], run[-1]))
+
+        first = start // self.blocksize
+        last = (stop - 1) // self.blocksize
+        out = b"".join(blocks[b] for b in range(first, last + 1))
+        self._last_stop = stop
+        offset = first * self.blocksize
+        return out[start - offset : stop - offset]
+
+    def _blocks_on_disk(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.cache_dir.glob("*/*"):
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _add_usage(self, written: int) -> None:
+        with _cache_dir_usage_lock:
+            _cache_dir_usage[self.cache_dir] += written
+            if _cache_dir_usage[self.cache_dir] > self.max_size:
+                _cache_dir_usage[self.cache_dir] = self._evict()
+
+    def _evict(self) -> int:
+        """Delete the least recently used blocks until the cache folder fits in EVICTION_TARGET of max_size.
+
+        The folder is scanned again, which also accounts for the blocks written by other processes.
+
+        Returns:
+            int: The size of the cache folder after eviction.
+        """
+        entries = self._blocks_on_disk()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_size * EVICTION_TARGET)
+        if total <= target:
+            return total
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            path.unlink(missing_ok=True)
+            total -= size
+            if total <= target:
+                break
+        logger.log(VERBOSE_LVL, "Evicted blocks from %s, %d bytes remain", self.cache_dir, total)
+        return total
+
+
+def register_block_cache() -> None:
+    """Make the persistent block cache available to fsspec files as cache_type="fusion_disk"."""
+    register_cache(FusionBlockCache, clobber=True)
+
+
+def block_cache_key(url: str, info: dict[str, Any]) -> str | None:
+    """Cache key identifying a version of a distribution.
+
+    Args:
+        url (str): The distribution URL.
+        info (dict): The distribution info, holding the digest or ETag reported by the server.
+
+    Returns:
+        Optional[str]: The cache key, or None when the server reports neither a digest nor an ETag,
+            since the version of the distribution is then unknown and persisted blocks could be stale.
+    """
+    digest = info.get("digest")
+    return f"{url}|{digest}" if digest else None
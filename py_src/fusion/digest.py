@@ -0,0 +1,210 @@
+"""Chunked SHA-256 digests in the format used by Fusion, hashed concurrently."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+from .sync_state import FileState, file_signature, state_key
+from .utils import cpu_count
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    import fsspec
+
+    from .sync_state import SyncStateDB
+
+DEFAULT_CHUNK_SIZE = 5 * 2**20
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def hash_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all chunk hashing.
+
+    hashlib releases the GIL while hashing large buffers, so chunks are hashed on as many cores
+    as there are threads in the pool.
+
+    Returns:
+        ThreadPoolExecutor: The shared pool, sized with cpu_count.
+    """
+    global _executor  # noqa: PLW0603
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=cpu_count(), thread_name_prefix="fusion-hash")
+    return _executor
+
+
+def chunk_digest(chunk: bytes) -> bytes:
+    """SHA-256 digest of a single chunk.
+
+    Args:
+        chunk (bytes): The chunk.
+
+    Returns:
+        bytes: The raw digest.
+    """
+    return hashlib.sha256(chunk).digest()
+
+
+def digest_of_digests(digests: Iterable[bytes]) -> bytes:
+    """SHA-256 digest of the concatenated chunk digests, the digest of a multipart upload.
+
+    Args:
+        digests (Iterable[bytes]): Raw chunk digests, in chunk order.
+
+    Returns:
+        bytes: The raw digest.
+    """
+    hash_sha256 = hashlib.sha256()
+    for digest in digests:
+        hash_sha256.update(digest)
+    return hash_sha256.digest()
+
+
+def fusion_digest(digests: list[bytes]) -> bytes:
+    """Digest of a file as reported by Fusion, from the digests of its chunks.
+
+    A single chunk file is identified by the digest of its content and a multi chunk file by
+    the digest of its chunk digests.
+
+    Args:
+        digests (list[bytes]): Raw chunk digests, in chunk order.
+
+    Returns:
+        bytes: The raw digest.
+    """
+    if not digests:
+        return hashlib.sha256().digest()
+    return digests[0] if len(digests) == 1 else digest_of_digests(digests)
+
+
+def b64(digest: bytes) -> str:
+    """Base64 encode a raw digest as sent in the Digest header.
+
+    Args:
+        digest (bytes): The raw digest.
+
+    Returns:
+        str: The encoded digest.
+    """
+    return base64.b64encode(digest).decode()
+
+
+def iter_chunks(file: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Read a file object chunk by chunk.
+
+    Args:
+        file (Any): A binary file object.
+        chunk_size (int, optional): Size of the chunks in bytes.
+
+    Returns:
+        Iterator[bytes]: The chunks.
+    """
+    return iter(lambda: file.read(chunk_size), b"")
+
+
+def stream_digest(file: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> tuple[bytes, int]:
+    """SHA-256 digest of the whole content of a file object, read chunk by chunk.
+
+    Args:
+        file (Any): A binary file object, read from its current position.
+        chunk_size (int, optional): Size of the reads in bytes.
+
+    Returns:
+        tuple[bytes, int]: The raw digest and the number of bytes read.
+    """
+    hash_sha256 = hashlib.sha256()
+    size = 0
+    for chunk in iter_chunks(file, chunk_size):
+        hash_sha256.update(chunk)
+        size += len(chunk)
+    return hash_sha256.digest(), size
+
+
+def hash_chunks(chunks: Iterable[bytes], max_pending: int | None = None) -> Iterator[tuple[bytes, bytes]]:
+    """Hash chunks concurrently on the shared hashing pool.
+
+    Chunks are consumed ahead of the caller so that several are hashed at once, but no more than
+    max_pending chunks are held in memory.
+
+    Args:
+        chunks (Iterable[bytes]): The chunks, e.g. from iter_chunks.
+        max_pending (int, optional): Maximum number of chunks read ahead. Defaults to twice the pool size.
+
+    Returns:
+        Iterator[tuple[bytes, bytes]]: Each chunk with its raw digest, in chunk order.
+    """
+    executor = hash_executor()
+    max_pending = max_pending or 2 * executor._max_workers
+    pending: deque[tuple[bytes, Future[bytes]]] = deque()
+    for chunk in chunks:
+        pending.append((chunk, executor.submit(chunk_digest, chunk)))
+        if len(pending) >= max_pending:
+            chunk_done, digest = pending.popleft()
+            yield chunk_done, digest.result()
+    while pending:
+        chunk_done, digest = pending.popleft()
+        yield chunk_done, digest.result()
+
+
+def file_chunk_digests(file: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[bytes]:
+    """Raw digests of every chunk of a file object, hashed concurrently.
+
+    Args:
+        file (Any): A binary file object, read from its current position.
+        chunk_size (int, optional): Size of the chunks in bytes.
+
+    Returns:
+        list[bytes]: The chunk digests, in chunk order.
+    """
+    return [digest for _, digest in hash_chunks(iter_chunks(file, chunk_size))]
+
+
+def file_digest(
+    fs: fsspec.AbstractFileSystem,
+    path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    multipart: bool = True,
+    state_db: SyncStateDB | None = None,
+) -> tuple[int, str]:
+    """Digest of a file as Fusion reports it once the file is uploaded.
+
+    Files uploaded in parts are identified by the digest of their chunk digests and other files
+    by the digest of their content. Digests recorded in state_db are reused while the stat signature
+    of the file is unchanged, including those fsync records for the files it synchronises.
+
+    Args:
+        fs (fsspec.AbstractFileSystem): The filesystem of the file.
+        path (str): The file path.
+        chunk_size (int, optional): Size of the upload parts.
+        multipart (bool, optional): Whether files larger than chunk_size are uploaded in parts. Defaults to True.
+        state_db (SyncStateDB, optional): Database of previously computed digests.
+
+    Returns:
+        tuple[int, str]: The size of the file and its base64 encoded digest.
+    """
+    info = fs.info(path)
+    signature = file_signature(info)
+    size = signature[0]
+    in_parts = multipart and size > chunk_size
+    key = state_key(fs, path)
+    # fsync records digests of DEFAULT_CHUNK_SIZE parts, digests computed otherwise are recorded apart
+    shared = chunk_size == DEFAULT_CHUNK_SIZE if in_parts else size <= DEFAULT_CHUNK_SIZE
+    if not shared:
+        key = f"{key}|{chunk_size if in_parts else 0}"
+    state = state_db.get_many([key]).get(key) if state_db else None
+    if state is not None and state[:3] == signature:
+        return size, state.digest
+    with fs.open(path, "rb") as f:
+        raw = fusion_digest(file_chunk_digests(f, chunk_size)) if in_parts else stream_digest(f, chunk_size)[0]
+    digest = b64(raw)
+    if state_db:
+        state_db.set_many({key: FileState(*signature, digest)})
+    return size, digest
@@ -1,23 +1,36 @@
 """Fusion fsync."""
 
-import base64
-import hashlib
+import asyncio
+import contextlib
+import functools
+import itertools
 import json
 import logging
+import os
+import random
+import re
 import sys
+import threading
 import time
 import warnings
 from os.path import relpath
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Optional
 
 import fsspec
 import pandas as pd
 from joblib import Parallel, delayed
 
+from .digest import b64, file_chunk_digests, fusion_digest
+from .fusion_filesystem import FusionHTTPFileSystem
+from .listing import _get_fusion_df
+from .sharding import DEFAULT_LEASE_TTL, WorkerLease
+from .sync_plan import SyncAction, SyncPlan, frame_entries, iter_sync_actions, plan_sync
+from .sync_state import FileState, SyncStateDB, file_signature, state_key
 from .utils import (
     cpu_count,
     distribution_to_filename,
+    get_client,
     is_dataset_raw,
     joblib_progress,
     path_to_url,
@@ -28,6 +41,13 @@ from .utils import (
 logger = logging.getLogger(__name__)
 VERBOSE_LVL = 25
 DEFAULT_CHUNK_SIZE = 2**16
+DEFAULT_SYNC_SLEEP = 10
+DEFAULT_SAFETY_POLL_INTERVAL = 600
+DEFAULT_RECONNECT_DELAY = 5
+DEFAULT_RECONCILIATION_INTERVAL = 3600
+DEFAULT_MAX_POLL_INTERVAL = 300
+DEFAULT_POLL_JITTER = 0.1
+DEFAULT_SYNC_BATCH = 10000
 
 
 def _url_to_path(x: str) -> str:
@@ -86,60 +106,313 @@ def _upload(
 
 
 def _generate_sha256_token(path: str, fs: fsspec.filesystem, chunk_size: int = 5 * 2**20) -> str:
-    hash_sha256 = hashlib.sha256()
-    chunk_count = 0
     with fs.open(path, "rb") as file:
-        for chunk in iter(lambda: file.read(chunk_size), b""):
-            hash_sha256_chunk = hashlib.sha256()
-            hash_sha256_chunk.update(chunk)
-            hash_sha256.update(hash_sha256_chunk.digest())
-            chunk_count += 1
-
-    if chunk_count > 1:
-        return base64.b64encode(hash_sha256.digest()).decode()
-    else:
-        return base64.b64encode(hash_sha256_chunk.digest()).decode()
+        return b64(fusion_digest(file_chunk_digests(file, chunk_size)))
+
+
+class _DatasetEvents:
+    """Datasets of a catalog named in its notifications, collected by a subscription in the background.
+
+    Notifications that name no dataset mark all the datasets as changed.
+    """
+
+    def __init__(
+        self,
+        fs_fusion: fsspec.filesystem,
+        catalog: str,
+        datasets: list[str],
+        reconnect_delay: float = DEFAULT_RECONNECT_DELAY,
+        cond: Optional[threading.Condition] = None,
+    ) -> None:
+        self.fs_fusion = fs_fusion
+        self.url = f'{fs_fusion.client_kwargs["root_url"]}catalogs/{catalog}/notifications/subscribe'
+        self.datasets = set(datasets)
+        self.reconnect_delay = reconnect_delay
+        self.last_event_id: Optional[str] = None
+        self._changed: set[str] = set()
+        self._cond = cond or threading.Condition()
+        self._loop = asyncio.new_event_loop()
+        self._task = self._loop.create_task(self._listen())
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        with contextlib.suppress(asyncio.CancelledError):
+            self._loop.run_until_complete(self._task)
+
+    async def _listen(self) -> None:
+        from aiohttp_sse_client import client as sse_client
+
+        proxies = self.fs_fusion.credentials.proxies
+        kwargs: dict[str, Any] = {"proxy": proxies.get("http", proxies.get("https"))} if proxies else {}
+        while True:
+            try:
+                async with await get_client(self.fs_fusion.credentials, timeout=1e100) as session:
+                    headers = {"Last-Event-ID": self.last_event_id} if self.last_event_id else {}
+                    async with sse_client.EventSource(self.url, session=session, headers=headers, **kwargs) as messages:
+                        async for msg in messages:
+                            self._on_message(msg.data, msg.last_event_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001
+                logger.log(VERBOSE_LVL, "Notifications subscription dropped, reconnecting", exc_info=True)
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _on_message(self, data: str, last_event_id: Optional[str] = None) -> None:
+        events = json.loads(data)
+        changed: set[str] = set()
+        for event in events if isinstance(events, list) else [events]:
+            if event.get("type") == "HeartBeatNotification":
+                continue
+            if event.get("datasetIdentifier"):
+                changed.add(event["datasetIdentifier"])
+                continue
+            named = {m for v in event.values() if isinstance(v, str) for m in re.findall(r"datasets/([^/?]+)", v)}
+            changed |= named or self.datasets
+        with self._cond:
+            self.last_event_id = last_event_id or self.last_event_id
+            self._changed |= changed & self.datasets
+            self._cond.notify_all()
+
+    def has_changes(self) -> bool:
+        """Whether datasets changed since the last call of pop, to be called holding the condition."""
+        return bool(self._changed)
+
+    def pop(self) -> set[str]:
+        """The datasets changed since the last call.
+
+        Returns (set): Dataset identifiers.
+
+        """
+        with self._cond:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def close(self) -> None:
+        """Stop the subscription."""
+        self._loop.call_soon_threadsafe(self._task.cancel)
+        self._thread.join()
+        self._loop.close()
+
+
+class _LocalChanges:
+    """Local files created, modified or deleted in watched directories, reported by watchdog.
+
+    Changes that cannot be narrowed down to files, e.g. a directory moved in, require a full scan.
+    """
+
+    def __init__(self, dirs: list[str], cond: Optional[threading.Condition] = None) -> None:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        feed = self
+
+        class _Handler(FileSystemEventHandler):  # type: ignore
+            def on_any_event(self, event: Any) -> None:
+                feed._on_event(event)
+
+        self._changed: set[str] = set()
+        self._rescan = False
+        self._cond = cond or threading.Condition()
+        self._observer = Observer()
+        for local_dir in dirs:
+            self._observer.schedule(_Handler(), local_dir, recursive=True)
+        self._observer.start()
+
+    def _on_event(self, event: Any) -> None:
+        if event.event_type not in ("created", "modified", "deleted", "moved", "closed"):
+            return
+        if event.is_directory and event.event_type == "modified":
+            return
+        with self._cond:
+            if event.is_directory:
+                self._rescan = True
+            else:
+                self._changed |= {os.fsdecode(p) for p in (event.src_path, getattr(event, "dest_path", "")) if p}
+            self._cond.notify_all()
+
+    def has_changes(self) -> bool:
+        """Whether files changed since the last call of pop, to be called holding the condition."""
+        return bool(self._changed) or self._rescan
+
+    def pop(self) -> Optional[set[str]]:
+        """The files changed since the last call.
+
+        Returns (set): Changed file paths, or None if the directories have to be scanned again.
+
+        """
+        with self._cond:
+            changed, self._changed = self._changed, set()
+            rescan, self._rescan = self._rescan or not self._observer.is_alive(), False
+        return None if rescan else changed
+
+    def close(self) -> None:
+        """Stop watching."""
+        self._observer.stop()
+        self._observer.join()
+
+
+def _watch_local(
+    fs_local: fsspec.filesystem, datasets: list[str], catalog: str, local_path: str, cond: threading.Condition
+) -> _LocalChanges:
+    if "file" not in fs_local.protocol:
+        raise ValueError("Watching for local changes requires a local filesystem.")
+    local_dirs = [fs_local._strip_protocol(d) for d in _local_dirs(datasets, catalog, local_path)]
+    for local_dir in local_dirs:
+        fs_local.makedirs(local_dir, exist_ok=True)
+    return _LocalChanges(local_dirs, cond)
+
+
+class _Backoff:
+    """Polling interval growing exponentially while nothing changes, back to the initial one on changes.
+
+    Intervals are jittered, so that daemons started together do not keep polling in step.
+    """
+
+    def __init__(
+        self, initial: float, maximum: float, factor: float = 2.0, jitter: float = DEFAULT_POLL_JITTER
+    ) -> None:
+        self.initial = initial
+        self.maximum = max(maximum, initial)
+        self.factor = factor
+        self.jitter = jitter
+        self.interval = initial
+
+    def reset(self) -> None:
+        """Poll at the initial interval again, e.g. once changes were found."""
+        self.interval = self.initial
+
+    def next_delay(self) -> float:
+        """The delay before the next poll, extending the following ones.
+
+        Returns (float): Number of seconds.
+
+        """
+        delay = self.interval * (1 + self.jitter * (2 * random.random() - 1))  # noqa: S311
+        self.interval = min(self.interval * self.factor, self.maximum)
+        return delay
+
+
+def _probe(fs_fusion: fsspec.filesystem, catalog: str, previous: Optional[str] = None) -> Optional[str]:
+    """Fingerprint of the changes of a catalog, None if it cannot be requested."""
+    if not isinstance(fs_fusion, FusionHTTPFileSystem):
+        return None
+    try:
+        return fs_fusion.fingerprint(f"{catalog}/datasets/changes", previous)
+    except Exception:  # noqa: BLE001
+        logger.log(VERBOSE_LVL, f"Could not probe the changes of {catalog}", exc_info=True)
+        return None
+
+
+def _wait_for_changes(cond: threading.Condition, feeds: list[Any], timeout: float) -> bool:
+    with cond:
+        return cond.wait_for(lambda: any(f.has_changes() for f in feeds), timeout)
+
+
+def _idle(
+    wait: Callable[[float], bool],
+    seconds: float,
+    lease: Optional[WorkerLease],
+    datasets: list[str],
+    shard: list[str],
+) -> bool:
+    """Sleep between loops, in steps of a third of the lease ttl with a lease.
 
+    The sleep ends early once wait reports changes, or once the datasets of this worker changed,
+    so datasets of dead workers are taken over within the lease ttl.
 
-def _get_fusion_df(
+    Returns:
+        bool: Whether wait reported changes.
+    """
+    if lease is None:
+        return wait(seconds)
+    deadline = time.monotonic() + seconds
+    while True:
+        remaining = max(deadline - time.monotonic(), 0)
+        step = min(remaining, lease.ttl / 3)
+        if wait(step):
+            return True
+        if step >= remaining or lease.owned(datasets) != shard:
+            return False
+
+
+def _sleep(seconds: float) -> bool:
+    time.sleep(seconds)
+    return False
+
+
+def _refresh_fusion_df(
     fs_fusion: fsspec.filesystem,
+    fusion_state: Optional[pd.DataFrame],
     datasets_lst: list[str],
     catalog: str,
     flatten: bool = False,
     dataset_format: Optional[str] = None,
 ) -> pd.DataFrame:
-    df_lst = []
-    for dataset in datasets_lst:
-        changes = fs_fusion.info(f"{catalog}/datasets/{dataset}")["changes"]["datasets"]
-        if len(changes) > 0:
-            changes = changes[0]["distributions"]
-            keys = [i["key"].replace(".", "/").split("/") for i in changes]
-            keys = ["/".join([k[0], k[1], k[2], k[-1]]) for k in keys]
-            urls = [catalog + "/datasets/" + k for k in keys]
-            urls = [i.replace("distribution", "distributions") for i in urls]
-            urls = [
-                ("/".join(i.split("/")[:3] + ["datasetseries"] + i.split("/")[3:]) if "datasetseries" not in i else i)
-                for i in urls
-            ]
-            sz = [int(i["values"][1]) for i in changes]
-            md = [i["values"][2].split("SHA-256=")[-1][:44] for i in changes]
-            keys = [_url_to_path(i) for i in urls]
-
-            if flatten:
-                keys = ["/".join(k.split("/")[:2] + k.split("/")[-1:]) for k in keys]
-
-            info_df = pd.DataFrame([keys, urls, sz, md]).T
-            info_df.columns = pd.Index(["path", "url", "size", "sha256"])
-            if dataset_format and len(info_df) > 0:
-                info_df = info_df[info_df.url.str.split("/").str[-1] == dataset_format]
-            df_lst.append(info_df)
-        else:
-            df_lst.append(pd.DataFrame(columns=["path", "url", "size", "sha256"]))
+    """Replace the rows of the given datasets by their current state in Fusion."""
+    df_lst = [] if fusion_state is None else [fusion_state[~fusion_state.url.str.split("/").str[2].isin(datasets_lst)]]
+    if datasets_lst:
+        df_lst.append(_get_fusion_df(fs_fusion, datasets_lst, catalog, flatten, dataset_format))
+    return pd.concat(df_lst).sort_values("url").reset_index(drop=True)
+
+
+def _local_dirs(datasets: list[str], catalog: str, local_path: str = "") -> list[str]:
+    return [f"{local_path}{catalog}/{i}" for i in datasets] if len(datasets) > 0 else [local_path + catalog]
+
 
-    return pd.concat(df_lst)
+def _record_downloads(
+    fs_local: fsspec.filesystem,
+    actions: pd.DataFrame,
+    res: list[tuple[bool, str, Optional[str]]],
+    local_path: str,
+    state_db: SyncStateDB,
+) -> list[tuple[bool, str, Optional[str]]]:
+    """Record the digests Fusion reports for downloaded files, so they are never read back to be compared.
 
+    A downloaded file of the announced size is recorded with the digest Fusion reports and its stat
+    signature, so the next local scan reuses that digest. A file of another size was not fully
+    downloaded, it is reported as failed and downloaded again.
 
-def _get_local_state(
+    Returns:
+        list: The download results, with the files of another size than announced marked as failed.
+    """
+    verified: list[tuple[bool, str, Optional[str]]] = []
+    states = {}
+    for (_, row), r in zip(actions.iterrows(), res):
+        if not r[0] or pd.isna(row["sha256"]):
+            verified.append(r)
+            continue
+        path = local_path + row["path_fusion"]
+        info = fs_local.info(path)
+        if pd.notna(row["size"]) and int(info["size"]) != int(row["size"]):
+            verified.append((False, path, f"Downloaded {path} is not of the announced size {int(row['size'])}"))
+            continue
+        states[state_key(fs_local, path)] = FileState(*file_signature(info), row["sha256"])
+        verified.append(r)
+    state_db.set_many(states)
+    return verified
+
+
+def _stored_digests(
+    fs_local: fsspec.filesystem, paths: list[str], infos: list[dict[str, Any]], state_db: SyncStateDB
+) -> list[str]:
+    """Digests of local files, only hashing the files whose stat signature changed since they were recorded."""
+    keys = [state_key(fs_local, p) for p in paths]
+    known = state_db.get_many(keys)
+    digests = []
+    hashed = {}
+    for key, path, info in zip(keys, paths, infos):
+        signature = file_signature(info)
+        state = known.get(key)
+        if state is None or state[:3] != signature:
+            state = FileState(*signature, _generate_sha256_token(path, fs_local))
+            hashed[key] = state
+        digests.append(state.digest)
+    state_db.set_many(hashed)
+    return digests
+
+
+def _get_local_state(  # noqa: PLR0913
     fs_local: fsspec.filesystem,
     fs_fusion: fsspec.filesystem,
     datasets: list[str],
@@ -147,16 +420,29 @@ def _get_local_state(
     dataset_format: Optional[str] = None,
     local_state: Optional[pd.DataFrame] = None,
     local_path: str = "",
+    state_db: Optional[SyncStateDB] = None,
+    changed: Optional[set[str]] = None,
 ) -> pd.DataFrame:
+    """State of the local files.
+
+    With changed, only the changed paths are processed and local_state, the previous state, is updated with them.
+    Otherwise, all local files are listed.
+    """
     local_files = []
     local_files_rel = []
-    local_dirs = [f"{local_path}{catalog}/{i}" for i in datasets] if len(datasets) > 0 else [local_path + catalog]
+    local_dirs = _local_dirs(datasets, catalog, local_path)
+    incremental = changed is not None and local_state is not None
+    changed = {fs_local._strip_protocol(p) for p in changed} if changed is not None else set()
 
     for local_dir in local_dirs:
         if not fs_local.exists(local_dir):
             fs_local.mkdir(local_dir, exist_ok=True, create_parents=True)
 
-        local_files_temp = fs_local.find(local_dir)
+        if incremental:
+            prefix = fs_local._strip_protocol(local_dir).rstrip("/") + "/"
+            local_files_temp = sorted(p for p in changed if p.startswith(prefix) and fs_local.isfile(p))
+        else:
+            local_files_temp = fs_local.find(local_dir)
         local_rel_path = [i[i.find(local_dir) :] for i in local_files_temp]
         local_file_validation = validate_file_names(local_rel_path, fs_fusion)
         local_files += [f for flag, f in zip(local_file_validation, local_files_temp) if flag]
@@ -165,25 +451,36 @@ def _get_local_state(
             for loc_file in local_files_temp
         ]
 
-    local_mtime = [fs_local.info(x)["mtime"] for x in local_files]
+    local_info = [fs_local.info(x) for x in local_files]
+    local_mtime = [i["mtime"] for i in local_info]
+    local_size = [i["size"] for i in local_info]
     is_raw_lst = is_dataset_raw(local_files, fs_fusion)
     local_url_eqiv = [path_to_url(i, r) for i, r in zip(local_files, is_raw_lst)]
-    df_local = pd.DataFrame([local_files_rel, local_url_eqiv, local_mtime, local_files]).T
-    df_local.columns = pd.Index(["path", "url", "mtime", "local_path"])
+    df_local = pd.DataFrame([local_files_rel, local_url_eqiv, local_mtime, local_files, local_size]).T
+    df_local.columns = pd.Index(["path", "url", "mtime", "local_path", "size"])
 
-    if local_state is not None and len(local_state) > 0:
+    if state_db is not None:
+        df_local["sha256"] = _stored_digests(fs_local, local_files, local_info, state_db)
+    elif local_state is not None and len(local_state) > 0:
         df_join = df_local.merge(local_state, on="path", how="left", suffixes=("", "_prev"))
         df_join.loc[df_join["mtime"] != df_join["mtime_prev"], "sha256"] = [
             _generate_sha256_token(x, fs_local) for x in df_join[df_join["mtime"] != df_join["mtime_prev"]].local_path
         ]
-        df_local = df_join[["path", "url", "mtime", "sha256"]]
+        df_local = df_join[["path", "url", "mtime", "size", "sha256"]]
     else:
         df_local["sha256"] = [_generate_sha256_token(x, fs_local) for x in local_files]
 
     if dataset_format and len(df_local) > 0:
         df_local = df_local[df_local.url.str.split("/").str[-1] == dataset_format]
 
-    df_local = df_local.sort_values("path").drop_duplicates()
+    if incremental and local_state is not None:
+        removed = [p for p in changed if not fs_local.exists(p)]
+        if state_db is not None and removed:
+            state_db.remove(state_key(fs_local, p) for p in removed)
+        df_local = pd.concat([local_state[~local_state.local_path.isin(changed)], df_local])
+
+    # sorted by url like the Fusion state, so both are merged without sorting them again
+    df_local = df_local.sort_values("url", kind="stable").drop_duplicates().reset_index(drop=True)
     return df_local
 
 
@@ -196,50 +493,35 @@ def _synchronize(  # noqa: PLR0913
     n_par: Optional[int] = None,
     show_progress: bool = True,
     local_path: str = "",
+    state_db: Optional[SyncStateDB] = None,
 ) -> list[tuple[bool, str, Optional[str]]]:
     """Synchronize two filesystems."""
 
     n_par = cpu_count(n_par)
-    if direction == "upload":
-        if len(df_local) == 0:
-            msg = "No dataset members available for upload for your dataset selection."
-            logger.warning(msg)
-            warnings.warn(msg, stacklevel=2)
-            res = []
-        else:
-            join_df = df_local.merge(df_fusion, on="url", suffixes=("_local", "_fusion"), how="left")
-            join_df = join_df[join_df["sha256_local"] != join_df["sha256_fusion"]]
-            res = _upload(
-                fs_fusion,
-                fs_local,
-                join_df,
-                n_par,
-                show_progress=show_progress,
-                local_path=local_path,
-            )
-    elif direction == "download":
-        if len(df_fusion) == 0:
-            msg = "No dataset members available for download for your dataset selection."
-            logger.warning(msg)
-            warnings.warn(msg, stacklevel=2)
-            res = []
-        else:
-            join_df = df_local.merge(df_fusion, on="url", suffixes=("_local", "_fusion"), how="right")
-            join_df = join_df[join_df["sha256_local"] != join_df["sha256_fusion"]]
-            res = _download(
-                fs_fusion,
-                fs_local,
-                join_df,
-                n_par,
-                show_progress=show_progress,
-                local_path=local_path,
-            )
-    else:
+    if direction not in ["upload", "download"]:
         raise ValueError("Unknown direction of operation.")
+    if len(df_local if direction == "upload" else df_fusion) == 0:
+        msg = f"No dataset members available for {direction} for your dataset selection."
+        logger.warning(msg)
+        warnings.warn(msg, stacklevel=2)
+        return []
+
+    # the sorted states are merged in one pass, the transfers are made in batches as they are planned
+    actions = iter_sync_actions(frame_entries(df_local), frame_entries(df_fusion), direction)
+    res: list[tuple[bool, str, Optional[str]]] = []
+    while batch := list(itertools.islice(actions, DEFAULT_SYNC_BATCH)):
+        batch_df = pd.DataFrame(batch, columns=list(SyncAction._fields))
+        if direction == "upload":
+            res += _upload(fs_fusion, fs_local, batch_df, n_par, show_progress=show_progress, local_path=local_path)
+            continue
+        batch_res = _download(fs_fusion, fs_local, batch_df, n_par, show_progress=show_progress, local_path=local_path)
+        if state_db is not None:
+            batch_res = _record_downloads(fs_local, batch_df, batch_res, local_path, state_db)
+        res += batch_res
     return res
 
 
-def fsync(  # noqa: PLR0913
+def fsync(  # noqa: PLR0912, PLR0913, PLR0915
     fs_fusion: fsspec.filesystem,
     fs_local: fsspec.filesystem,
     products: Optional[list[str]] = None,
@@ -253,7 +535,18 @@ def fsync(  # noqa: PLR0913
     local_path: str = "",
     log_level: int = logging.ERROR,
     log_path: str = ".",
-) -> None:
+    use_events: bool = False,
+    safety_poll_interval: float = DEFAULT_SAFETY_POLL_INTERVAL,
+    state_path: Optional[str] = None,
+    watch_local: bool = False,
+    reconciliation_interval: float = DEFAULT_RECONCILIATION_INTERVAL,
+    dry_run: bool = False,
+    poll_interval: float = DEFAULT_SYNC_SLEEP,
+    max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+    lease_dir: Optional[str] = None,
+    worker_id: Optional[str] = None,
+    lease_ttl: float = DEFAULT_LEASE_TTL,
+) -> Optional[SyncPlan]:
     """Synchronisation between the local filesystem and Fusion.
 
     Args:
@@ -270,8 +563,33 @@ def fsync(  # noqa: PLR0913
         local_path (str): path to files in the local filesystem, e.g., "s3a://my_bucket/"
         log_level (int): Logging level. Error level by default.
         log_path (str): The folder path where the log is stored. Defaults to ".".
+        use_events (bool): Subscribe to the notifications of the catalog and only query Fusion again
+            for the datasets named in them, instead of querying all datasets on every loop. Defaults to False.
+        safety_poll_interval (float): Number of seconds after which all datasets are queried again, in case
+            notifications were missed with use_events, or changes went unnoticed by the probe of the catalog
+            otherwise. Defaults to 600.
+        state_path (str, optional): SQLite file the digests of local files are recorded in, so that after a
+            restart only files whose size, mtime or inode changed are hashed again.
+            Defaults to FUSION_SYNC_STATE or ~/.cache/fusion/fsync_state.db.
+        watch_local (bool): Watch the local directories with watchdog and only process the files created,
+            modified or deleted since the last loop, instead of listing all local files on every loop.
+            Requires a local filesystem and the watchdog package. Defaults to False.
+        reconciliation_interval (float): With watch_local, number of seconds after which all local files
+            are listed again, in case changes were missed. Defaults to 3600.
+        poll_interval (float): Number of seconds slept after the first loop that found nothing to synchronise.
+            Each following idle loop doubles it, up to max_poll_interval, and changes bring it back. Defaults to 10.
+        max_poll_interval (float): Maximum number of seconds slept between loops. Defaults to 300.
+        dry_run (bool): Return the transfers a synchronisation would make instead of making them. Defaults to False.
+        lease_dir (str, optional): Directory of the local filesystem shared by several fsync workers, e.g. on
+            NFS or S3. Each worker keeps a lease file in it and only synchronises the datasets assigned to it by
+            consistent hashing over the live workers. The datasets of a worker are taken over by the others once
+            its lease is released, or not renewed for lease_ttl seconds. Defaults to a single worker.
+        worker_id (str, optional): Unique identifier of this worker with lease_dir, kept across restarts. Defaults
+            to the host name, several workers on one host need their own.
+        lease_ttl (float): Number of seconds without renewal after which a worker is considered dead. Defaults to 60.
 
     Returns:
+        Optional[SyncPlan]: With dry_run, the files and bytes a synchronisation would transfer.
 
     """
 
@@ -310,19 +628,95 @@ def fsync(  # noqa: PLR0913
 
     local_state = pd.DataFrame()
     fusion_state = pd.DataFrame()
-    while True:
+    if dry_run:
+        state_db = SyncStateDB(state_path)
         try:
-            local_state_temp = _get_local_state(
-                fs_local,
-                fs_fusion,
-                datasets,
-                catalog,
-                dataset_format,
-                local_state,
-                local_path,
+            df_local = _get_local_state(
+                fs_local, fs_fusion, datasets, catalog, dataset_format, local_path=local_path, state_db=state_db
             )
-            fusion_state_temp = _get_fusion_df(fs_fusion, datasets, catalog, flatten, dataset_format)
+            return plan_sync(df_local, _get_fusion_df(fs_fusion, datasets, catalog, flatten, dataset_format), direction)
+        finally:
+            state_db.close()
+
+    # with change feeds, the latest scanned states are kept separately from the last synced ones
+    cond = threading.Condition()
+    events = _DatasetEvents(fs_fusion, catalog, datasets, cond=cond) if use_events else None
+    local_changes = _watch_local(fs_local, datasets, catalog, local_path, cond) if watch_local else None
+    feeds = [f for f in (events, local_changes) if f is not None]
+    state_db = SyncStateDB(state_path)
+    lease = WorkerLease(fs_local, lease_dir, worker_id, lease_ttl) if lease_dir else None
+    shard = datasets
+    remote_state: Optional[pd.DataFrame] = None
+    scanned_state: Optional[pd.DataFrame] = None
+    next_full_poll = next_reconciliation = 0.0
+    last_fingerprint: Optional[str] = None
+    backoff = _Backoff(poll_interval, max_poll_interval)
+    while True:
+        try:
+            if lease is not None:
+                owned = lease.owned(datasets)
+                if owned != shard:
+                    # datasets taken over or handed over are listed again on both sides
+                    logger.log(VERBOSE_LVL, f"Worker {lease.worker_id} synchronises {len(owned)} datasets")
+                    shard, scanned_state, remote_state = owned, None, None
+                if not shard:
+                    time.sleep(min(poll_interval, lease_ttl / 3))
+                    continue
+            if local_changes is None:
+                local_state_temp = _get_local_state(
+                    fs_local,
+                    fs_fusion,
+                    shard,
+                    catalog,
+                    dataset_format,
+                    local_state,
+                    local_path,
+                    state_db,
+                )
+            else:
+                # a failed scan leaves no scanned state, so all local files are listed again
+                previous_scan, scanned_state, paths = scanned_state, None, local_changes.pop()
+                if previous_scan is None or paths is None or time.monotonic() >= next_reconciliation:
+                    previous_scan, paths = None, None
+                    next_reconciliation = time.monotonic() + reconciliation_interval
+                scanned_state = _get_local_state(
+                    fs_local,
+                    fs_fusion,
+                    shard,
+                    catalog,
+                    dataset_format,
+                    previous_scan,
+                    local_path,
+                    state_db,
+                    paths,
+                )
+                local_state_temp = scanned_state
+            if events is None:
+                # the full state is only collected if a cheap probe of the catalog reports changes
+                fingerprint = _probe(fs_fusion, catalog, last_fingerprint)
+                if (
+                    remote_state is None
+                    or fingerprint is None
+                    or fingerprint != last_fingerprint
+                    or time.monotonic() >= next_full_poll
+                ):
+                    remote_state = None
+                    remote_state = _get_fusion_df(fs_fusion, shard, catalog, flatten, dataset_format)
+                    last_fingerprint = fingerprint
+                    next_full_poll = time.monotonic() + safety_poll_interval
+                fusion_state_temp = remote_state
+            else:
+                # a failed refresh leaves no remote state, so all datasets are queried again
+                previous_state, remote_state, changed = remote_state, None, events.pop()
+                if previous_state is None or time.monotonic() >= next_full_poll:
+                    previous_state, changed = None, set(shard)
+                    next_full_poll = time.monotonic() + safety_poll_interval
+                remote_state = _refresh_fusion_df(
+                    fs_fusion, previous_state, sorted(changed & set(shard)), catalog, flatten, dataset_format
+                )
+                fusion_state_temp = remote_state
             if not local_state_temp.equals(local_state) or not fusion_state_temp.equals(fusion_state):
+                backoff.reset()
                 res = _synchronize(
                     fs_fusion,
                     fs_local,
@@ -332,6 +726,7 @@ def fsync(  # noqa: PLR0913
                     n_par,
                     show_progress,
                     local_path,
+                    state_db,
                 )
                 if len(res) == 0 or all(i[0] for i in res):
                     local_state = local_state_temp
@@ -347,12 +742,27 @@ def fsync(  # noqa: PLR0913
 
             else:
                 logger.info("All synced, sleeping")
-                time.sleep(10)
+                poll_sleep = backoff.next_delay()
+                if not feeds:
+                    _idle(_sleep, poll_sleep, lease, datasets, shard)
+                else:
+                    # the side without a change feed is polled, changes reported by a feed end the sleep early
+                    now = time.monotonic()
+                    remote_sleep = next_full_poll - now if events is not None else poll_sleep
+                    local_sleep = next_reconciliation - now if local_changes is not None else poll_sleep
+                    wait = functools.partial(_wait_for_changes, cond, feeds)
+                    if _idle(wait, max(min(remote_sleep, local_sleep), 0), lease, datasets, shard):
+                        backoff.reset()
 
         except KeyboardInterrupt:  # noqa: PERF203
             if input("Type exit to exit: ") != "exit":
                 continue
-            break
+            for feed in feeds:
+                feed.close()
+            if lease is not None:
+                lease.release()
+            state_db.close()
+            return None
 
         except Exception as _:
             logger.error("Exception thrown", exc_info=True)
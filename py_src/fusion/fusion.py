@@ -4,15 +4,17 @@ import json as js
 import logging
 import re
 import sys
+import threading
 import warnings
 from io import BytesIO
 from pathlib import Path
-from typing import Any, Optional, Union
+from typing import TYPE_CHECKING, Any, Optional, Union
 from zipfile import ZipFile
 
 import fsspec
 import pandas as pd
 import pyarrow as pa
+import pyarrow.dataset as ds
 import requests
 from joblib import Parallel, delayed
 from tabulate import tabulate
@@ -20,12 +22,17 @@ from tabulate import tabulate
 from fusion._fusion import FusionCredentials
 
 from .exceptions import APIResponseError
-from .fusion_filesystem import FusionHTTPFileSystem
+from .fusion_filesystem import DEFAULT_PART_CONCURRENCY, FusionHTTPFileSystem
+from .materialized_view import MaterializedView
+from .parquet_scan import scan_parquet
+from .table_stream import TABLE_FORMATS, ChunkPipe, write_table
 from .types import PyArrowFilterT
 from .utils import (
     RECOGNIZED_FORMATS,
+    PathLikeT,
     cpu_count,
     csv_to_table,
+    dataset_resolver,
     distribution_to_filename,
     distribution_to_url,
     # download_single_file_threading,
@@ -45,6 +52,11 @@ from .utils import (
     validate_file_names,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    import polars as pl
+
 logger = logging.getLogger(__name__)
 VERBOSE_LVL = 25
 
@@ -778,32 +790,10 @@ class Fusion:
         if dt_str == "sample":
             dataset_format = "csv"
 
-        if not download_folder:
-            download_folder = self.download_folder
-        download_res = self.download(
-            dataset,
-            dt_str,
-            dataset_format,
-            catalog,
-            n_par,
-            show_progress,
-            force_download,
-            download_folder,
-            return_paths=True,
+        files = self._download_to_files(
+            dataset, dt_str, dataset_format, catalog, n_par, show_progress, force_download, download_folder
         )
 
-        if not download_res:
-            raise ValueError("Must specify 'return_paths=True' in download call to use this function")
-
-        if not all(res[0] for res in download_res):
-            failed_res = [res for res in download_res if not res[0]]
-            raise Exception(
-                f"Not all downloads were successfully completed. "
-                f"Re-run to collect missing files. The following failed:\n{failed_res}"
-            )
-
-        files = [res[1] for res in download_res]
-
         pd_read_fn_map = {
             "csv": read_csv,
             "parquet": read_parquet,
@@ -848,11 +838,6 @@ class Fusion:
 
         pd_read_kwargs.update(kwargs)
 
-        if len(files) == 0:
-            raise APIResponseError(
-                f"No series members for dataset: {dataset} "
-                f"in date or date range: {dt_str} and format: {dataset_format}"
-            )
         if dataset_format in ["parquet", "parq"]:
             data_df = pd_reader(files, **pd_read_kwargs)  # type: ignore
         elif dataset_format == "raw":
@@ -915,6 +900,7 @@ class Fusion:
         filters: Optional[PyArrowFilterT] = None,
         force_download: bool = False,
         download_folder: Optional[str] = None,
+        remote: bool = False,
         **kwargs: Any,
     ) -> pa.Table:
         """Gets distributions for a specified date or date range and returns the data as an arrow table.
@@ -942,38 +928,26 @@ class Fusion:
                 if it is already on disk. Defaults to False.
             download_folder (str, optional): The path, absolute or relative, where downloaded files are saved.
                 Defaults to download_folder as set in __init__
+            remote (bool, optional): If True then parquet distributions are scanned in place over ranged
+                requests instead of being downloaded. Only the footers and the column chunks and row groups
+                selected by columns and filters are transferred, with at most n_par concurrent requests.
+                Cannot be combined with force_download, download_folder or reader keyword arguments.
+                Defaults to False.
         Returns:
             class:`pyarrow.Table`: a dataframe containing the requested data.
                 If multiple dataset instances are retrieved then these are concatenated first.
         """
         catalog = self._use_catalog(catalog)
+        if remote:
+            if force_download or download_folder or kwargs:
+                raise ValueError("force_download, download_folder and reader arguments do not apply to remote scans")
+            return self._remote_parquet_to_table(dataset, dt_str, dataset_format, catalog, n_par, columns, filters)
+
         n_par = cpu_count(n_par)
-        if not download_folder:
-            download_folder = self.download_folder
-        download_res = self.download(
-            dataset,
-            dt_str,
-            dataset_format,
-            catalog,
-            n_par,
-            show_progress,
-            force_download,
-            download_folder,
-            return_paths=True,
+        files = self._download_to_files(
+            dataset, dt_str, dataset_format, catalog, n_par, show_progress, force_download, download_folder
         )
 
-        if not download_res:
-            raise ValueError("Must specify 'return_paths=True' in download call to use this function")
-
-        if not all(res[0] for res in download_res):
-            failed_res = [res for res in download_res if not res[0]]
-            raise RuntimeError(
-                f"Not all downloads were successfully completed. "
-                f"Re-run to collect missing files. The following failed:\n{failed_res}"
-            )
-
-        files = [res[1] for res in download_res]
-
         read_fn_map = {
             "csv": csv_to_table,
             "parquet": parquet_to_table,
@@ -998,11 +972,6 @@ class Fusion:
 
         read_kwargs.update(kwargs)
 
-        if len(files) == 0:
-            raise APIResponseError(
-                f"No series members for dataset: {dataset} "
-                f"in date or date range: {dt_str} and format: {dataset_format}"
-            )
         if dataset_format in ["parquet", "parq"]:
             tbl = reader(files, **read_kwargs)  # type: ignore
         else:
@@ -1011,6 +980,260 @@ class Fusion:
 
         return tbl
 
+    def _remote_parquet_to_table(  # noqa: PLR0913
+        self,
+        dataset: str,
+        dt_str: str,
+        dataset_format: str,
+        catalog: str,
+        n_par: Optional[int] = None,
+        columns: Optional[list[str]] = None,
+        filters: Optional[PyArrowFilterT] = None,
+    ) -> pa.Table:
+        """Read parquet distributions in place using ranged requests against the Fusion filesystem.
+
+        Args:
+            dataset (str): A dataset identifier
+            dt_str (str): Either a single date or a range identified by a start or end date,
+                or both separated with a ":".
+            dataset_format (str): The file format, must be parquet.
+            catalog (str): A catalog identifier.
+            n_par (int, optional): Maximum number of concurrent requests. Defaults to DEFAULT_RANGE_CONCURRENCY.
+            columns (List, optional): A list of columns to return. Defaults to None
+            filters (List, optional): Arrow filters used to prune row groups and rows. Defaults to None
+
+        Returns:
+            class:`pyarrow.Table`: a table containing the requested data.
+        """
+        if dataset_format not in ["parquet", "parq"]:
+            raise ValueError(f"Remote scans are only supported for parquet, not {dataset_format}")
+
+        required_series = self._resolve_distro_tuples(dataset, dt_str, dataset_format, catalog)
+        paths: list[PathLikeT] = [
+            distribution_to_url(self.root_url, series[1], series[2], series[3], series[0]) for series in required_series
+        ]
+        logger.log(VERBOSE_LVL, f"Scanning {len(paths)} remote parquet distributions")
+        return scan_parquet(self.get_fusion_filesystem(), paths, columns=columns, filters=filters, batch_size=n_par)
+
+    def _download_to_files(  # noqa: PLR0913
+        self,
+        dataset: str,
+        dt_str: str,
+        dataset_format: str,
+        catalog: str,
+        n_par: Optional[int],
+        show_progress: bool,
+        force_download: bool,
+        download_folder: Optional[str],
+    ) -> list[str]:
+        """Download the requested distributions and return their local paths.
+
+        Args:
+            dataset (str): A dataset identifier
+            dt_str (str): Either a single date or a range identified by a start or end date,
+                or both separated with a ":".
+            dataset_format (str): The file format, e.g. CSV or Parquet.
+            catalog (str): A catalog identifier.
+            n_par (int, optional): Specify how many distributions to download in parallel.
+            show_progress (bool): Display a progress bar during data download.
+            force_download (bool): If True then will always download a file even if it is already on disk.
+            download_folder (str, optional): The path where downloaded files are saved.
+
+        Returns:
+            list: local paths of the downloaded distributions.
+        """
+        if not download_folder:
+            download_folder = self.download_folder
+        download_res = self.download(
+            dataset,
+            dt_str,
+            dataset_format,
+            catalog,
+            n_par,
+            show_progress,
+            force_download,
+            download_folder,
+            return_paths=True,
+        )
+
+        if not download_res:
+            raise APIResponseError(
+                f"No series members for dataset: {dataset} "
+                f"in date or date range: {dt_str} and format: {dataset_format}"
+            )
+
+        if not all(res[0] for res in download_res):
+            failed_res = [res for res in download_res if not res[0]]
+            raise RuntimeError(
+                f"Not all downloads were successfully completed. "
+                f"Re-run to collect missing files. The following failed:\n{failed_res}"
+            )
+
+        return [str(res[1]) for res in download_res]
+
+    def to_lazyframe(  # noqa: PLR0913
+        self,
+        dataset: str,
+        dt_str: str = "latest",
+        dataset_format: str = "parquet",
+        catalog: Optional[str] = None,
+        n_par: Optional[int] = None,
+        show_progress: bool = True,
+        force_download: bool = False,
+        download_folder: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "pl.LazyFrame":
+        """Gets distributions for a specified date or date range and returns a lazy polars scan over them.
+
+        The distributions are downloaded (or reused from the download folder) and scanned with
+        polars' native readers, so projections and predicates applied to the returned LazyFrame are
+        pushed down into the file scans and nothing is read until the frame is collected.
+
+        Args:
+            dataset (str): A dataset identifier
+            dt_str (str, optional): Either a single date or a range identified by a start or end date,
+                or both separated with a ":". Defaults to 'latest' which will return the most recent
+                instance of the dataset.
+            dataset_format (str, optional): The file format, e.g. CSV or Parquet. Defaults to 'parquet'.
+            catalog (str, optional): A catalog identifier. Defaults to 'common'.
+            n_par (int, optional): Specify how many distributions to download in parallel.
+                Defaults to all cpus available.
+            show_progress (bool, optional): Display a progress bar during data download Defaults to True.
+            force_download (bool, optional): If True then will always download a file even
+                if it is already on disk. Defaults to False.
+            download_folder (str, optional): The path, absolute or relative, where downloaded files are saved.
+                Defaults to download_folder as set in __init__
+            **kwargs (Any): Keyword arguments passed to the polars scan function.
+
+        Returns:
+            class:`polars.LazyFrame`: a lazy frame over the requested data.
+                If multiple dataset instances are retrieved then these are concatenated diagonally.
+        """
+        import polars as pl
+
+        catalog = self._use_catalog(catalog)
+
+        # sample data is limited to csv
+        if dt_str == "sample":
+            dataset_format = "csv"
+
+        scan_fn_map: dict[str, Callable[..., pl.LazyFrame]] = {
+            "csv": pl.scan_csv,
+            "parquet": pl.scan_parquet,
+            "parq": pl.scan_parquet,
+            "json": pl.scan_ndjson,
+        }
+        scan_fn = scan_fn_map.get(dataset_format)
+        if not scan_fn:
+            raise ValueError(f"No polars function to scan file in format {dataset_format}")
+
+        files = self._download_to_files(
+            dataset, dt_str, dataset_format, catalog, n_par, show_progress, force_download, download_folder
+        )
+
+        return pl.concat([scan_fn(f, **kwargs) for f in files], how="diagonal")
+
+    def query(  # noqa: PLR0913
+        self,
+        sql: str,
+        datasets: Union[str, list[str]],
+        dt_str: str = "latest",
+        dataset_format: str = "parquet",
+        catalog: Optional[str] = None,
+        n_par: Optional[int] = None,
+        show_progress: bool = True,
+        force_download: bool = False,
+        download_folder: Optional[str] = None,
+        dataframe_type: str = "pandas",
+    ) -> Union[pd.DataFrame, "pl.DataFrame", pa.Table]:
+        """Runs a SQL query over one or more datasets using an embedded DuckDB engine.
+
+        Each dataset is downloaded (or reused from the download folder) and registered as an
+        arrow dataset under its identifier, so it can be referenced as a table in the query.
+        The schema of a dataset is read from its most recent distribution only, the other
+        distributions are cast to it.
+        Filters and projections are pushed into the file scans and the query runs multithreaded
+        and out-of-core, without materialising the distributions in pandas first.
+
+        Args:
+            sql (str): The SQL query, referencing datasets by their identifiers.
+            datasets (Union[str, list]): A dataset identifier or a list of dataset identifiers to register.
+            dt_str (str, optional): Either a single date or a range identified by a start or end date,
+                or both separated with a ":". Defaults to 'latest' which will return the most recent
+                instance of each dataset.
+            dataset_format (str, optional): The file format, e.g. CSV or Parquet. Defaults to 'parquet'.
+            catalog (str, optional): A catalog identifier. Defaults to 'common'.
+            n_par (int, optional): Specify how many distributions to download in parallel.
+                Defaults to all cpus available.
+            show_progress (bool, optional): Display a progress bar during data download Defaults to True.
+            force_download (bool, optional): If True then will always download a file even
+                if it is already on disk. Defaults to False.
+            download_folder (str, optional): The path, absolute or relative, where downloaded files are saved.
+                Defaults to download_folder as set in __init__
+            dataframe_type (str, optional): Type of the returned frame, pandas, polars or arrow.
+                Defaults to 'pandas'.
+
+        Returns:
+            Union[pandas.DataFrame, polars.DataFrame, pyarrow.Table]: the query result, of dataframe_type.
+        """
+        import duckdb
+
+        catalog = self._use_catalog(catalog)
+        if dataframe_type not in ["pandas", "polars", "arrow"]:
+            raise ValueError(f"Unknown DataFrame type {dataframe_type}")
+
+        arrow_format_map = {"csv": "csv", "parquet": "parquet", "parq": "parquet", "json": "json"}
+        arrow_format = arrow_format_map.get(dataset_format)
+        if not arrow_format:
+            raise ValueError(f"No arrow dataset format to query files in format {dataset_format}")
+
+        datasets = [datasets] if isinstance(datasets, str) else datasets
+        con = duckdb.connect()
+        try:
+            for dataset in datasets:
+                files = self._download_to_files(
+                    dataset, dt_str, dataset_format, catalog, n_par, show_progress, force_download, download_folder
+                )
+                schema = ds.dataset(files[-1], format=arrow_format, filesystem=self.fs).schema
+                con.register(dataset, ds.dataset(files, schema=schema, format=arrow_format, filesystem=self.fs))
+
+            rel = con.sql(sql)
+            if dataframe_type == "polars":
+                return rel.pl()
+            if dataframe_type == "arrow":
+                # newer duckdb versions return a record batch reader
+                tbl = rel.arrow()
+                return tbl.read_all() if isinstance(tbl, pa.RecordBatchReader) else tbl
+            return rel.df()
+        finally:
+            con.close()
+
+    def materialized_view(
+        self,
+        dataset: str,
+        dt_str: str,
+        dataset_format: str = "parquet",
+        catalog: Optional[str] = None,
+        path: Optional[str] = None,
+    ) -> MaterializedView:
+        """Returns an incrementally refreshed, persisted view over a dataset's series members.
+
+        Calling refresh on the view only downloads the series members that are new or changed since
+        the previous refresh, so repeated reads of a growing date range do not re-read the history.
+
+        Args:
+            dataset (str): A dataset identifier
+            dt_str (str): Either a single date or a range identified by a start or end date,
+                or both separated with a ":", e.g. "20200101:".
+            dataset_format (str, optional): The file format, e.g. CSV or Parquet. Defaults to 'parquet'.
+            catalog (str, optional): A catalog identifier. Defaults to 'common'.
+            path (str, optional): Folder where the view is persisted. Defaults to a folder in download_folder.
+
+        Returns:
+            MaterializedView: the view, loaded with any previously persisted state.
+        """
+        return MaterializedView(self, dataset, dt_str, dataset_format, catalog, path)
+
     def upload(  # noqa: PLR0913
         self,
         path: str,
@@ -1026,6 +1249,9 @@ class Fusion:
         to_date: Optional[str] = None,
         preserve_original_name: Optional[bool] = False,
         additional_headers: Optional[dict[str, str]] = None,
+        part_concurrency: Optional[int] = None,
+        skip_unchanged: bool = False,
+        state_path: Optional[str] = None,
     ) -> Optional[list[tuple[bool, str, Optional[str]]]]:
         """Uploads the requested files/files to Fusion.
 
@@ -1049,6 +1275,14 @@ class Fusion:
             to_date (str, optional): end of the data date range contained in the distribution,
                 defaults to upload date.
             preserve_original_name (bool, optional): Preserve the original name of the file. Defaults to False.
+            additional_headers (dict, optional): Additional headers to include in the request.
+            part_concurrency (int, optional): Number of parts of each multipart upload sent concurrently.
+                Defaults to 4.
+            skip_unchanged (bool, optional): Skip files whose identical content is already published, comparing
+                their digests with the published ones. Defaults to False.
+            state_path (str, optional): With skip_unchanged, SQLite file the digests of local files are recorded
+                in, so unmodified files are not hashed again. Defaults to FUSION_SYNC_STATE or
+                ~/.cache/fusion/fsync_state.db.
 
         Returns:
 
@@ -1082,9 +1316,7 @@ class Fusion:
                     dt_str = dt_str if dt_str != "latest" else pd.Timestamp("today").date().strftime("%Y%m%d")
                     dt_str = pd.Timestamp(dt_str).date().strftime("%Y%m%d")
 
-                if catalog not in fs_fusion.ls("") or dataset not in [
-                    i.split("/")[-1] for i in fs_fusion.ls(f"{catalog}/datasets")
-                ]:
+                if not dataset_resolver(fs_fusion).exists([(catalog, dataset)])[(catalog, dataset)]:
                     msg = (
                         f"File file has not been uploaded, one of the catalog: {catalog} "
                         f"or dataset: {dataset} does not exit."
@@ -1120,6 +1352,9 @@ class Fusion:
             from_date=from_date,
             to_date=to_date,
             additional_headers=additional_headers,
+            part_concurrency=part_concurrency,
+            skip_unchanged=skip_unchanged,
+            state_path=state_path,
         )
 
         if not all(r[0] for r in res):
@@ -1143,6 +1378,7 @@ class Fusion:
         from_date: Optional[str] = None,
         to_date: Optional[str] = None,
         file_name: Optional[str] = None,
+        multipart: bool = True,
         **kwargs: Any,  # noqa: ARG002
     ) -> Optional[list[tuple[bool, str, Optional[str]]]]:
         """Uploads data from an object in memory.
@@ -1162,6 +1398,7 @@ class Fusion:
                 defaults to upload date
             to_date (str, optional): end of the data date range contained in the distribution, defaults to upload date.
             file_name (str, optional): file name to be used for the uploaded file. Defaults to Fusion standard naming.
+            multipart (bool, optional): Upload data larger than chunk_size in parts. Defaults to True.
 
         Returns:
 
@@ -1173,7 +1410,7 @@ class Fusion:
         if distribution not in RECOGNIZED_FORMATS + ["raw"]:
             raise ValueError(f"Dataset format {distribution} is not supported")
 
-        is_raw = js.loads(fs_fusion.cat(f"{catalog}/datasets/{dataset}"))["isRawData"]
+        is_raw = dataset_resolver(fs_fusion).is_raw(catalog, str(dataset))
         local_url_eqiv = path_to_url(f"{dataset}__{catalog}__{series_member}.{distribution}", is_raw)
 
         data_map_df = pd.DataFrame(["", local_url_eqiv, file_name]).T
@@ -1185,7 +1422,7 @@ class Fusion:
             data_map_df,
             parallel=False,
             n_par=1,
-            multipart=False,
+            multipart=multipart,
             chunk_size=chunk_size,
             show_progress=show_progress,
             from_date=from_date,
@@ -1200,6 +1437,94 @@ class Fusion:
 
         return res if return_paths else None
 
+    def from_table(  # noqa: PLR0913
+        self,
+        data: Any,
+        dataset: str,
+        series_member: str = "latest",
+        catalog: Optional[str] = None,
+        distribution: str = "parquet",
+        return_paths: bool = False,
+        chunk_size: int = 5 * 2**20,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        file_name: Optional[str] = None,
+        part_concurrency: Optional[int] = None,
+    ) -> Optional[list[tuple[bool, str, Optional[str]]]]:
+        """Uploads a table without writing it to a file or a buffer first.
+
+        The table is serialized batch by batch into a multipart upload, each part is hashed and sent
+        as soon as it is produced, so only a few chunks of the serialized file are held in memory.
+
+        Args:
+            data (Any): A pyarrow Table, pandas DataFrame or polars DataFrame.
+            dataset (str): Dataset name to which the table will be uploaded.
+            series_member (str, optional): A single date or label. Defaults to 'latest' which will return
+                the most recent.
+            catalog (str, optional): A catalog identifier. Defaults to 'common'.
+            distribution (str, optional): The file format, parquet or csv. Defaults to 'parquet'.
+            return_paths (bool, optional): Return paths and success statuses of the uploaded files.
+            chunk_size (int, optional): Maximum chunk size.
+            from_date (str, optional): start of the data date range contained in the distribution,
+                defaults to upload date
+            to_date (str, optional): end of the data date range contained in the distribution, defaults to upload date.
+            file_name (str, optional): file name to be used for the uploaded file. Defaults to Fusion standard naming.
+            part_concurrency (int, optional): Number of parts sent concurrently. Defaults to the filesystem default.
+
+        Returns:
+
+
+        """
+        catalog = self._use_catalog(catalog)
+
+        if distribution not in TABLE_FORMATS:
+            raise ValueError(f"Dataset format {distribution} is not supported, expected one of {TABLE_FORMATS}")
+
+        fs_fusion = self.get_fusion_filesystem()
+        is_raw = dataset_resolver(fs_fusion).is_raw(catalog, dataset)
+        local_url_eqiv = path_to_url(f"{dataset}__{catalog}__{series_member}.{distribution}", is_raw)
+
+        pipe = ChunkPipe(max_buffered=2 * chunk_size)
+
+        def _write() -> None:
+            try:
+                write_table(data, pipe, distribution)
+            except BaseException as ex:  # noqa: BLE001
+                pipe.finish(ex)
+            else:
+                pipe.finish()
+
+        writer = threading.Thread(target=_write, name="fusion-table-writer", daemon=True)
+        writer.start()
+        res: list[tuple[bool, str, Optional[str]]]
+        try:
+            fs_fusion.put(
+                pipe,  # type: ignore
+                local_url_eqiv,
+                chunk_size=chunk_size,
+                method="put",
+                multipart=True,
+                from_date=from_date,
+                to_date=to_date,
+                file_name=file_name,
+                part_concurrency=part_concurrency or DEFAULT_PART_CONCURRENCY,
+            )
+            res = [(True, local_url_eqiv, None)]
+        except Exception as ex:  # noqa: BLE001
+            logger.log(VERBOSE_LVL, f"Failed to upload table to {local_url_eqiv}.", exc_info=True)
+            res = [(False, local_url_eqiv, str(ex))]
+        finally:
+            pipe.abort()
+            writer.join()
+
+        if not all(r[0] for r in res):
+            failed_res = [r for r in res if not r[0]]
+            msg = f"Not all uploads were successfully completed. The following failed:\n{failed_res}"
+            logger.warning(msg)
+            warnings.warn(msg, stacklevel=2)
+
+        return res if return_paths else None
+
     def listen_to_events(
         self,
         last_event_id: Optional[str] = None,
@@ -2,11 +2,11 @@
 
 import asyncio
 import base64
+import bisect
 import hashlib
 import io
 import logging
-from collections.abc import AsyncGenerator, Generator
-from copy import deepcopy
+from collections.abc import AsyncGenerator
 from pathlib import Path
 from typing import Any, Optional, Union
 from urllib.parse import quote, urljoin
@@ -22,11 +22,68 @@ from fsspec.utils import nullcontext
 
 from fusion._fusion import FusionCredentials
 
+from .block_cache import block_cache_key, register_block_cache
+from .digest import (
+    b64,
+    chunk_digest,
+    digest_of_digests,
+    file_chunk_digests,
+    hash_executor,
+    iter_chunks,
+    stream_digest,
+)
+from .upload_checkpoint import UploadCheckpoint
 from .utils import get_client, get_default_fs
 
 logger = logging.getLogger(__name__)
 VERBOSE_LVL = 25
 DEFAULT_CHUNK_SIZE = 5 * 2**20
+DEFAULT_RANGE_GAP = 2**16
+DEFAULT_RANGE_BLOCK = 32 * 2**20
+DEFAULT_RANGE_CONCURRENCY = 10
+DEFAULT_PART_CONCURRENCY = 4
+DEFAULT_PART_RETRIES = 3
+DEFAULT_CLOUD_READ_AHEAD = 4
+# prefix of the fingerprints of resources identified by their Last-Modified date
+_LAST_MODIFIED = "Last-Modified:"
+register_block_cache()
+
+
+async def _stream_chunks(
+    file: Any, chunk_size: int, callback: fsspec.callbacks.Callback = _DEFAULT_CALLBACK
+) -> AsyncGenerator[bytes, None]:
+    """Request body reading a file object chunk by chunk, so it is never held in memory whole."""
+    for chunk in iter_chunks(file, chunk_size):
+        yield chunk
+        callback.relative_update(len(chunk))
+
+
+def _coalesce_ranges(
+    ranges: list[tuple[str, int, int]], max_gap: int, max_block: Optional[int]
+) -> list[tuple[str, int, int]]:
+    """Merge byte ranges of the same file that overlap or are separated by at most max_gap bytes.
+
+    Args:
+        ranges (list): Tuples of url, start and end byte.
+        max_gap (int): Largest gap in bytes between two ranges that are still merged.
+        max_block (int, optional): Largest merged range in bytes, no bound if None.
+
+    Returns:
+        list: The merged ranges sorted by url and start byte.
+    """
+    merged: list[tuple[str, int, int]] = []
+    for url, start, end in sorted(set(ranges)):
+        if merged:
+            m_url, m_start, m_end = merged[-1]
+            if (
+                url == m_url
+                and start - m_end <= max_gap
+                and (max_block is None or max(end, m_end) - m_start <= max_block)
+            ):
+                merged[-1] = (m_url, m_start, max(end, m_end))
+                continue
+        merged.append((url, start, end))
+    return merged
 
 
 class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
@@ -119,6 +176,55 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
             logger.log(VERBOSE_LVL, f"Artificial error, {ex}")
             raise ex
 
+    @staticmethod
+    def _validator(headers: Any) -> Optional[str]:
+        etag: Optional[str] = headers.get("ETag")
+        if etag:
+            return etag
+        last_modified = headers.get("Last-Modified")
+        return _LAST_MODIFIED + last_modified if last_modified else None
+
+    async def _fingerprint(self, url: str, previous: Optional[str] = None) -> str:
+        url = self._decorate_url(url)
+        session = await self.set_session()
+        conditional: dict[str, str] = {}
+        if previous and previous.startswith(('"', 'W/"')):
+            conditional = {"If-None-Match": previous}
+        elif previous and previous.startswith(_LAST_MODIFIED):
+            conditional = {"If-Modified-Since": previous[len(_LAST_MODIFIED) :]}
+        elif not previous:
+            async with session.head(url, **self.kwargs) as r:
+                self._raise_not_found_for_status(r, url)
+                validator = self._validator(r.headers)
+            if validator:
+                return validator
+        # the content is only sent if it changed since the validator seen last time; when a previous
+        # probe found no validator, the content is hashed without asking for one first
+        kw = self.kwargs.copy()
+        kw["headers"] = {**(kw.get("headers") or {}), **conditional}
+        async with session.get(url, **kw) as r:
+            if previous and r.status == requests.codes.not_modified:
+                return previous
+            self._raise_not_found_for_status(r, url)
+            return self._validator(r.headers) or hashlib.sha256(await r.read()).hexdigest()
+
+    def fingerprint(self, url: str, previous: Optional[str] = None) -> str:
+        """Fingerprint of a resource, changing whenever the resource changes.
+
+        The ETag or Last-Modified date of the resource is requested with HEAD, then with a GET
+        conditional on the previous fingerprint, so an unchanged resource is never transferred.
+        Resources with neither are hashed, without a HEAD once a probe found they have none.
+
+        Args:
+            url (str): Resource url, relative to the catalogs root.
+            previous (str, optional): The fingerprint returned by the previous call, if any.
+
+        Returns:
+            str: The ETag or Last-Modified date of the resource, or the digest of its content if it has neither.
+        """
+        res: str = sync(super().loop, self._fingerprint, url, previous)
+        return res
+
     async def _ls_real(self, url: str, detail: bool = True, **kwargs: Any) -> Any:
         # ignoring URL-encoded arguments
         clean_url = url
@@ -129,6 +235,7 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
         session = await self.set_session()
         is_file = False
         size = None
+        digest = None
         url = url if url[-1] != "/" else url[:-1]
         url_parts = url.split("/")
         if url_parts[-2] == "distributions":
@@ -139,6 +246,7 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
                 ]
 
                 size = int(r.headers["Content-Length"])
+                digest = r.headers.get("Digest") or r.headers.get("ETag")
                 is_file = True
         else:
             async with session.get(url, **self.kwargs) as r:
@@ -164,6 +272,7 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
                         "name": out[0],
                         "size": size,
                         "type": "file",
+                        "digest": digest,
                     }
                 ]
         else:
@@ -263,6 +372,118 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
         url = self._decorate_url(url)
         return super().cat(url, start=start, end=end, **kwargs)
 
+    async def _size(self, path: str) -> int:
+        size: int = (await self._ls_real(self._decorate_url(path)))[0]["size"]
+        return size
+
+    async def _cat_range(self, url: str, start: int, end: int) -> bytes:
+        """Download the bytes between start and end of a distribution in a single request."""
+        session = await self.set_session()
+        range_url = url + f"/operationType/download?downloadRange=bytes={start}-{end - 1}"
+        async with session.get(range_url, **self.kwargs) as r:
+            if r.status == requests.codes.range_not_satisfiable:
+                return b""
+            if r.status >= requests.codes.bad_request:
+                await self._async_raise_not_found_for_status(r, url)
+            out: bytes = await r.read()
+        if r.status != requests.codes.partial_content and len(out) > end - start:
+            # the server ignored the range and sent the whole file
+            out = out[start:end]
+        return out
+
+    async def _cat_ranges(  # noqa: PLR0913
+        self,
+        paths: list[str],
+        starts: Union[int, list[int], None],
+        ends: Union[int, list[int], None],
+        max_gap: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        on_error: str = "return",
+        max_block: Optional[int] = DEFAULT_RANGE_BLOCK,
+        **kwargs: Any,  # noqa: ARG002
+    ) -> list[Any]:
+        """Fetch byte ranges from one or more distributions concurrently.
+
+        Ranges of the same distribution that overlap or are close to each other are merged so that
+        scattered reads, such as the column chunks of a parquet file, need as few requests as
+        possible, and the merged requests are sent concurrently.
+
+        Args:
+            paths (list): Distribution paths or URLs.
+            starts (Union[int, list]): Start byte of each range, negative values count from the end of the file.
+            ends (Union[int, list]): End byte (exclusive) of each range, None reads to the end of the file.
+            max_gap (int, optional): Largest gap in bytes between two ranges that are still merged.
+                Defaults to DEFAULT_RANGE_GAP.
+            batch_size (int, optional): Maximum number of concurrent requests. Defaults to DEFAULT_RANGE_CONCURRENCY.
+            on_error (str, optional): "return" to return exceptions in place of the failed ranges' bytes,
+                "raise" to raise the first one. Defaults to "return".
+            max_block (int, optional): Largest merged range in bytes. Defaults to DEFAULT_RANGE_BLOCK.
+            **kwargs: Kwargs.
+
+        Returns:
+            list: The bytes of each range, in the order requested.
+        """
+        if not isinstance(paths, list):
+            raise TypeError("paths must be a list")
+        if not isinstance(starts, list):
+            starts = [starts] * len(paths)  # type: ignore
+        if not isinstance(ends, list):
+            ends = [ends] * len(paths)  # type: ignore
+        if len(starts) != len(paths) or len(ends) != len(paths):
+            raise ValueError("paths, starts and ends must have the same length")
+
+        urls = [self._decorate_url(p) for p in paths]
+        semaphore = asyncio.Semaphore(batch_size or DEFAULT_RANGE_CONCURRENCY)
+
+        async def _sized(url: str) -> int:
+            async with semaphore:
+                return await self._size(url)
+
+        # the sizes of the files read from their end are requested concurrently, once per file
+        unsized = list(
+            dict.fromkeys(
+                url
+                for url, start, end in zip(urls, starts, ends)
+                if end is None or end < 0 or (start is not None and start < 0)
+            )
+        )
+        sizes = dict(zip(unsized, await asyncio.gather(*(_sized(url) for url in unsized))))
+
+        ranges = []
+        for url, start, end in zip(urls, starts, ends):
+            start = start or 0  # noqa: PLW2901
+            start = start + sizes[url] if start < 0 else start  # noqa: PLW2901
+            end = sizes[url] if end is None else end + sizes[url] if end < 0 else end  # noqa: PLW2901
+            ranges.append((url, start, max(start, end)))
+
+        merged = _coalesce_ranges(
+            [r for r in ranges if r[2] > r[1]], DEFAULT_RANGE_GAP if max_gap is None else max_gap, max_block
+        )
+
+        async def _fetch(url: str, start: int, end: int) -> bytes:
+            async with semaphore:
+                return await self._cat_range(url, start, end)
+
+        blocks = await asyncio.gather(*[_fetch(*r) for r in merged], return_exceptions=True)
+        logger.log(VERBOSE_LVL, "Fetched %d ranges in %d requests", len(ranges), len(merged))
+
+        out: list[Any] = []
+        for url, start, end in ranges:
+            if end == start:
+                out.append(b"")
+                continue
+            # merged ranges are sorted, the one holding this range is the last starting at or before it
+            idx = bisect.bisect_right(merged, (url, start, float("inf"))) - 1
+            block = blocks[idx]
+            if isinstance(block, BaseException):
+                if on_error == "raise":
+                    raise block
+                out.append(block)
+            else:
+                offset = merged[idx][1]
+                out.append(block[start - offset : end - offset])
+        return out
+
     async def _fetch_range(
         self,
         session: aiohttp.ClientSession,
@@ -531,7 +752,7 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
             kw["headers"].update(additional_headers)
         return kw
 
-    async def _put_file(  # noqa: PLR0915, PLR0913
+    async def _put_file(  # noqa: PLR0912, PLR0915, PLR0913
         self,
         lpath: Union[str, io.IOBase, fsspec.spec.AbstractBufferedFile],
         rpath: str,
@@ -540,9 +761,53 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
         method: str = "post",
         multipart: bool = False,
         additional_headers: Optional[dict[str, str]] = None,
+        part_concurrency: int = DEFAULT_PART_CONCURRENCY,
+        part_retries: int = DEFAULT_PART_RETRIES,
+        resume: bool = True,
+        read_ahead: int = 0,
+        part_slots: Optional[asyncio.Semaphore] = None,
         **kwargs: Any,
     ) -> None:
-        async def put_data() -> AsyncGenerator[dict[Any, Any], None]:
+        async def put_part(part_number: int, chunk: bytes) -> Any:
+            # parts are hashed concurrently on the hashing pool, off the event loop
+            digests[part_number] = await asyncio.get_running_loop().run_in_executor(
+                hash_executor(), chunk_digest, chunk
+            )
+            digest = b64(digests[part_number])
+            kw = self.kwargs.copy()
+            url = rpath + f"/operations/upload?operationId={operation_id}&partNumber={part_number}"
+            kw.update({"headers": {"Content-Type": "application/octet-stream", "Digest": "SHA-256=" + digest}})
+            kw = FusionHTTPFileSystem._update_kwargs(kw, headers, additional_headers)
+            try:
+                async with uploading:
+                    attempt = 0
+                    while True:
+                        try:
+                            async with meth(url=url, data=chunk, **kw) as resp:
+                                await self._async_raise_not_found_for_status(resp, rpath)
+                                res = await resp.json()
+                            if checkpoint:
+                                # one line is appended to the journal, off the event loop
+                                await asyncio.to_thread(checkpoint.add_part, part_number, res, digest)
+                            callback.relative_update(len(chunk))
+                            return res
+                        except Exception:  # noqa: BLE001, PERF203
+                            attempt += 1
+                            if attempt >= part_retries:
+                                # the error of the last attempt fails the upload, a part is never silently missing
+                                raise
+                            wait_time = 2 ** (attempt - 1)  # Exponential backoff
+                            logger.log(
+                                VERBOSE_LVL,
+                                f"Upload of part {part_number} failed, retrying in {wait_time} seconds...",
+                                exc_info=True,
+                            )
+                            await asyncio.sleep(wait_time)
+            finally:
+                # frees the part's buffer slot for the next chunk to be read
+                in_flight.release()
+
+        async def put_data() -> list[Any]:
             # Support passing arbitrary file-like objects
             # and use them instead of streams.
             if isinstance(lpath, io.IOBase):
@@ -552,26 +817,49 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
                 context = open(lpath, "rb")  # noqa: SIM115, PTH123, ASYNC101
                 use_seek = True
 
+            loop = asyncio.get_running_loop()
+            tasks: dict[int, asyncio.Task[Any]] = {}
+            resps: dict[int, Any] = {}
             with context as f:
                 if use_seek:
                     callback.set_size(f.seek(0, 2))
                     f.seek(0)
                 else:
+                    if isinstance(f, io.BytesIO):
+                        f.seek(0)
                     callback.set_size(getattr(f, "size", None))
 
-                chunk = f.read(chunk_size)
-                i = 0
-                while chunk:
-                    kw = self.kwargs.copy()
-                    url = rpath + f"/operations/upload?operationId={operation_id}&partNumber={i+1}"
-                    kw.update({"headers": kwargs["chunk_headers_lst"][i]})
-                    kw = FusionHTTPFileSystem._update_kwargs(kw, headers, additional_headers)
-                    async with meth(url=url, data=chunk, **kw) as resp:
-                        await self._async_raise_not_found_for_status(resp, rpath)
-                        yield await resp.json()
-                    i += 1
-                    callback.relative_update(len(chunk))
-                    chunk = f.read(chunk_size)
+                # each chunk is read once, hashed and sent, the whole file digest is sent on completion;
+                # at most part_concurrency + read_ahead chunks are held in memory, the next chunks are
+                # read while part_concurrency parts are uploaded
+                try:
+                    part_number = 0
+                    while True:
+                        part_number += 1
+                        if checkpoint and part_number in checkpoint.parts:
+                            # uploaded by a previous attempt, its digest is known and its bytes are skipped
+                            digests[part_number] = base64.b64decode(checkpoint.parts[part_number]["digest"])
+                            resps[part_number] = checkpoint.parts[part_number]["response"]
+                            f.seek(min(part_number * chunk_size, checkpoint.size))
+                            callback.relative_update(min(chunk_size, checkpoint.size - (part_number - 1) * chunk_size))
+                            continue
+                        await in_flight.acquire()
+                        failed = [t for t in tasks.values() if t.done() and t.exception()]
+                        # reads run off the event loop, remote files such as S3File block on their own requests
+                        chunk = await loop.run_in_executor(None, f.read, chunk_size) if not failed else b""
+                        if not chunk:
+                            in_flight.release()
+                            break
+                        tasks[part_number] = asyncio.create_task(put_part(part_number, chunk))
+                    resps.update(zip(tasks.keys(), await asyncio.gather(*tasks.values())))
+                except BaseException:
+                    for task in tasks.values():
+                        task.cancel()
+                    raise
+            return [resps[i] for i in sorted(resps)]
+
+        if part_retries < 1:
+            raise ValueError(f"part_retries must be at least 1, not: {part_retries}")
 
         session = await self.set_session()
 
@@ -582,47 +870,96 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
         headers = kwargs["headers"]
 
         meth = getattr(session, method)
+        digests: dict[int, bytes] = {}
         if not multipart:
-            kw = self.kwargs.copy()
-            kw.update({"headers": headers})
-            if additional_headers:
-                kw["headers"].update(additional_headers)
             if isinstance(lpath, io.BytesIO):
                 lpath.seek(0)
-            async with meth(rpath, data=lpath.read(), **kw) as resp:  # type: ignore
-                await self._async_raise_not_found_for_status(resp, rpath)
+            context = Path(lpath).open("rb") if isinstance(lpath, str) else nullcontext(lpath)  # noqa: SIM115, ASYNC101
+            with context as f:
+                seekable = getattr(f, "seekable", lambda: False)()
+                if seekable:
+                    # the digest is sent ahead of the body, so the file is hashed first and then streamed
+                    start = f.tell()
+                    digest, size = await asyncio.get_running_loop().run_in_executor(
+                        hash_executor(), stream_digest, f, DEFAULT_CHUNK_SIZE
+                    )
+                    f.seek(start)
+                    data: Any = _stream_chunks(f, DEFAULT_CHUNK_SIZE, callback)
+                else:
+                    data = f.read()
+                    digest, size = chunk_digest(data), len(data)
+                callback.set_size(size)
+                headers = {**headers, "Digest": "SHA-256=" + b64(digest), "Content-Length": str(size)}
+                kw = self.kwargs.copy()
+                kw.update({"headers": headers})
+                if additional_headers:
+                    kw["headers"].update(additional_headers)
+                async with meth(rpath, data=data, **kw) as resp:
+                    await self._async_raise_not_found_for_status(resp, rpath)
         else:
-            kw = self.kwargs.copy()
-            kw = FusionHTTPFileSystem._update_kwargs(kw, headers, additional_headers)
+            checkpoint = UploadCheckpoint.for_upload(lpath, rpath, chunk_size) if resume else None
+            # parts of concurrent uploads can share a global limit
+            uploading = part_slots or asyncio.Semaphore(max(part_concurrency, 1))
+            while True:
+                resumed = bool(checkpoint and checkpoint.operation_id)
+                in_flight = asyncio.Semaphore(max(part_concurrency, 1) + max(read_ahead, 0))
+                try:
+                    if checkpoint and checkpoint.operation_id:
+                        operation_id = checkpoint.operation_id
+                    else:
+                        kw = self.kwargs.copy()
+                        kw = FusionHTTPFileSystem._update_kwargs(kw, headers, additional_headers)
 
-            async with session.post(rpath + "/operationType/upload", **kw) as resp:
-                await self._async_raise_not_found_for_status(resp, rpath)
-                operation_id = await resp.json()
+                        async with session.post(rpath + "/operationType/upload", **kw) as resp:
+                            await self._async_raise_not_found_for_status(resp, rpath)
+                            operation_id = await resp.json()
 
-            operation_id = operation_id["operationId"]
-            resps = [resp async for resp in put_data()]
-            kw = self.kwargs.copy()
-            kw.update({"headers": headers})
-            kw = FusionHTTPFileSystem._update_kwargs(kw, headers, additional_headers)
-            async with session.post(
-                url=rpath + f"/operations/upload?operationId={operation_id}",
-                json={"parts": resps},
-                **kw,
-            ) as resp:
-                self._raise_not_found_for_status(resp, rpath + f"/operations/upload?operationId={operation_id}")
+                        operation_id = operation_id["operationId"]
+                        if checkpoint:
+                            await asyncio.to_thread(checkpoint.start, operation_id)
+
+                    resps = await put_data()
+                    file_digest = digest_of_digests(digests[i] for i in sorted(digests))
+                    headers = {**headers, "Digest": "SHA-256=" + b64(file_digest)}
+                    kw = self.kwargs.copy()
+                    kw.update({"headers": headers})
+                    kw = FusionHTTPFileSystem._update_kwargs(kw, headers, additional_headers)
+                    async with session.post(
+                        url=rpath + f"/operations/upload?operationId={operation_id}",
+                        json={"parts": resps},
+                        **kw,
+                    ) as resp:
+                        self._raise_not_found_for_status(resp, rpath + f"/operations/upload?operationId={operation_id}")
+                except Exception:  # noqa: BLE001
+                    if checkpoint is None or not resumed:
+                        raise
+                    # an expired or aborted operation fails its parts or its completion, with a 404, 400 or
+                    # 410 alike, so the checkpoint is dropped and the upload starts over with a new operation
+                    logger.log(
+                        VERBOSE_LVL,
+                        f"Resuming operation {operation_id} of {rpath} failed, starting a new operation",
+                        exc_info=True,
+                    )
+                    await asyncio.to_thread(checkpoint.remove)
+                    digests.clear()
+                    callback.absolute_update(0)
+                    if not isinstance(lpath, str):
+                        lpath.seek(0)
+                    continue
+                break
+            if checkpoint:
+                await asyncio.to_thread(checkpoint.remove)
 
     @staticmethod
-    def _construct_headers(
-        file_local: Any,
+    def _distribution_headers(
         dt_from: str,
         dt_to: str,
         dt_created: str,
-        chunk_size: int = 5 * 2**20,
         multipart: bool = False,
         file_name: Optional[str] = None,
-    ) -> tuple[dict[str, str], list[dict[str, str]]]:
+    ) -> dict[str, str]:
         headers = {
-            "Content-Type": "application/octet-stream",
+            "Content-Type": "application/json" if multipart else "application/octet-stream",
             "x-jpmc-distribution-created-date": dt_created,
             "x-jpmc-distribution-from-date": dt_from,
             "x-jpmc-distribution-to-date": dt_to,
@@ -630,31 +967,35 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
         }
         if file_name:
             headers["File-Name"] = file_name
+        return headers
 
-        headers["Content-Type"] = "application/json" if multipart else headers["Content-Type"]
-        headers_chunks = {"Content-Type": "application/octet-stream", "Digest": ""}
-
-        headers_chunk_lst = []
-        hash_sha256 = hashlib.sha256()
+    @staticmethod
+    def _construct_headers(
+        file_local: Any,
+        dt_from: str,
+        dt_to: str,
+        dt_created: str,
+        chunk_size: int = 5 * 2**20,
+        multipart: bool = False,
+        file_name: Optional[str] = None,
+    ) -> tuple[dict[str, str], list[dict[str, str]]]:
+        headers = FusionHTTPFileSystem._distribution_headers(dt_from, dt_to, dt_created, multipart, file_name)
         if isinstance(file_local, io.BytesIO):
             file_local.seek(0)
-        for chunk in iter(lambda: file_local.read(chunk_size), b""):
-            hash_sha256_chunk = hashlib.sha256()
-            hash_sha256_chunk.update(chunk)
-            hash_sha256.update(hash_sha256_chunk.digest())
-            headers_chunks = deepcopy(headers_chunks)
-            headers_chunks["Digest"] = "SHA-256=" + base64.b64encode(hash_sha256_chunk.digest()).decode()
-            headers_chunk_lst.append(headers_chunks)
+        digests = file_chunk_digests(file_local, chunk_size)
+        headers_chunk_lst = [
+            {"Content-Type": "application/octet-stream", "Digest": "SHA-256=" + b64(digest)} for digest in digests
+        ]
 
         file_local.seek(0)
         if multipart:
-            headers["Digest"] = "SHA-256=" + base64.b64encode(hash_sha256.digest()).decode()
+            headers["Digest"] = "SHA-256=" + b64(digest_of_digests(digests))
         else:
-            headers["Digest"] = "SHA-256=" + base64.b64encode(hash_sha256_chunk.digest()).decode()
+            headers["Digest"] = "SHA-256=" + b64(digests[-1])
 
         return headers, headers_chunk_lst
 
-    def _cloud_copy(  # noqa: PLR0913, PLR0915
+    async def _cloud_copy(  # noqa: PLR0913
         self,
         lpath: Any,
         rpath: Any,
@@ -666,98 +1007,78 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
         method: str = "put",
         file_name: Optional[str] = None,
         additional_headers: Optional[dict[str, str]] = None,
+        resume: bool = True,
+        part_concurrency: int = DEFAULT_PART_CONCURRENCY,
+        read_ahead: int = DEFAULT_CLOUD_READ_AHEAD,
+        **kwargs: Any,
     ) -> None:
-        async def _get_operation_id(kw: dict[str, str]) -> dict[str, Any]:
-            session = await self.set_session()
-            async with session.post(rpath + "/operationType/upload", **kw) as r:
-                await self._async_raise_not_found_for_status(r, rpath + "/operationType/upload")
-                res: dict[str, Any] = await r.json()
-                return res
-
-        async def _finish_operation(operation_id: Any, kw: Any) -> None:
-            session = await self.set_session()
-            async with session.post(
-                url=rpath + f"/operations/upload?operationId={operation_id}",
-                json={"parts": resps},
-                **kw,
-            ) as r:
-                await self._async_raise_not_found_for_status(
-                    r, rpath + f"/operations/upload?operationId={operation_id}"
-                )
-
-        def put_data() -> Generator[dict[str, Any], None, None]:
-            async def _meth(url: Any, kw: Any) -> None:
-                session = await self.set_session()
-                meth = getattr(session, method)
-                retry_num = 3
-                ex_cnt = 0
-                last_ex = None
-                while ex_cnt < retry_num:
-                    async with meth(url=url, data=chunk, **kw) as resp:
-                        try:
-                            await self._async_raise_not_found_for_status(resp, url)
-                            return await resp.json()  # type: ignore
-                        except Exception as ex:  # noqa: BLE001
-                            ex_cnt += 1
-                            last_ex = ex
-
-                raise Exception(f"Failed to upload file: {last_ex}, failed after {ex_cnt} exceptions.")
-
-            context = nullcontext(lpath)
-
-            with context as f:
-                callback.get_size(getattr(f, "size", None))
-
-            chunk = f.read(chunk_size)
-            i = 0
-            headers_chunks = {"Content-Type": "application/octet-stream", "Digest": ""}
-            while chunk:
-                hash_sha256_chunk = hashlib.sha256()
-                hash_sha256_chunk.update(chunk)
-                hash_sha256_lst[0].update(hash_sha256_chunk.digest())
-                headers_chunks = deepcopy(headers_chunks)
-                headers_chunks["Digest"] = "SHA-256=" + base64.b64encode(hash_sha256_chunk.digest()).decode()
-                kw = self.kwargs.copy()
-                kw.update({"headers": headers_chunks})
-                kw = FusionHTTPFileSystem._update_kwargs(kw, headers, additional_headers)
-                url = rpath + f"/operations/upload?operationId={operation_id}&partNumber={i+1}"
-                yield sync(self.loop, _meth, url, kw)
-                i += 1
-                callback.relative_update(len(chunk))
-                chunk = f.read(chunk_size)
-
-        method = method.lower()
-        if method not in ("put", "post"):
-            raise ValueError(f"method has to be either 'post' or 'put', not {method!r}")
-        hash_sha256 = hashlib.sha256()
-        hash_sha256_lst = [hash_sha256]
-        headers = {
-            "Content-Type": "application/json",
-            "x-jpmc-distribution-created-date": dt_created,
-            "x-jpmc-distribution-from-date": dt_from,
-            "x-jpmc-distribution-to-date": dt_to,
-            "Digest": "",  # to be changed to x-jpmc-digest
-        }
-        if file_name:
-            headers["File-Name"] = file_name
-
-        if additional_headers:
-            for k, v in additional_headers.items():
-                headers[k] = v
-
+        # the next chunks are read from the cloud store while earlier parts are uploaded concurrently,
+        # so the copy runs at the speed of the slower link
+        headers = self._distribution_headers(dt_from, dt_to, dt_created, multipart=True, file_name=file_name)
         lpath.seek(0)
+        await self._put_file(
+            lpath,
+            rpath,
+            chunk_size,
+            callback,
+            method,
+            True,
+            additional_headers,
+            part_concurrency=part_concurrency,
+            resume=resume,
+            read_ahead=read_ahead,
+            headers=headers,
+            **kwargs,
+        )
 
-        kw_op = self.kwargs.copy()
-        kw_op = FusionHTTPFileSystem._update_kwargs(kw_op, headers, additional_headers)
+    async def _put_distribution(  # noqa: PLR0913
+        self,
+        lpath: Any,
+        rpath: str,
+        chunk_size: int = 5 * 2**20,
+        callback: fsspec.callbacks.Callback = _DEFAULT_CALLBACK,
+        method: str = "put",
+        multipart: bool = False,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        file_name: Optional[str] = None,
+        additional_headers: Optional[dict[str, str]] = None,
+        part_concurrency: int = DEFAULT_PART_CONCURRENCY,
+        resume: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        if from_date is None or to_date is None:
+            dt_from = pd.Timestamp.now().strftime("%Y-%m-%d")
+            dt_to = "2199-12-31"
+        else:
+            dt_from = pd.Timestamp(from_date).strftime("%Y-%m-%d")
+            dt_to = pd.Timestamp(to_date).strftime("%Y-%m-%d")
 
-        operation_id = sync(self.loop, _get_operation_id, kw_op)["operationId"]
-        resps = list(put_data())
-        hash_sha256 = hash_sha256_lst[0]
-        headers["Digest"] = "SHA-256=" + base64.b64encode(hash_sha256.digest()).decode()
-        kw = self.kwargs.copy()
-        kw.update({"headers": headers})
-        kw = FusionHTTPFileSystem._update_kwargs(kw, headers, additional_headers)
-        sync(self.loop, _finish_operation, operation_id, kw)
+        dt_created = pd.Timestamp.now().strftime("%Y-%m-%d")
+        rpath = self._decorate_url(rpath)
+        if type(lpath).__name__ in ["S3File"]:
+            await self._cloud_copy(
+                lpath,
+                rpath,
+                dt_from,
+                dt_to,
+                dt_created,
+                chunk_size,
+                callback,
+                method,
+                file_name,
+                additional_headers,
+                resume=resume,
+                part_concurrency=part_concurrency,
+                **kwargs,
+            )
+            return
+        # digests are computed by _put_file while the file is sent, so it is read only once
+        headers = self._distribution_headers(dt_from, dt_to, dt_created, multipart, file_name)
+        kwargs.update({"headers": headers})
+        if multipart:
+            kwargs.update({"part_concurrency": part_concurrency, "resume": resume})
+        await self._put_file(lpath, rpath, chunk_size, callback, method, multipart, additional_headers, **kwargs)
 
     def put(  # noqa: PLR0913
         self,
@@ -771,6 +1092,8 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
         to_date: Optional[str] = None,
         file_name: Optional[str] = None,
         additional_headers: Optional[dict[str, str]] = None,
+        part_concurrency: int = DEFAULT_PART_CONCURRENCY,
+        resume: bool = True,
         **kwargs: Any,
     ) -> Any:
         """Copy file(s) from local.
@@ -786,36 +1109,30 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
             to_date: latest date of data in upload file
             file_name: Name of the file.
             additional_headers: Additional headers.
+            part_concurrency: Number of parts of a multipart upload sent concurrently.
+            resume: Resume a failed multipart upload of the same unchanged file from its checkpoint.
             **kwargs: Kwargs.
 
         Returns:
 
         """
-
-        if from_date is None or to_date is None:
-            dt_from = pd.Timestamp.now().strftime("%Y-%m-%d")
-            dt_to = "2199-12-31"
-        else:
-            dt_from = pd.Timestamp(from_date).strftime("%Y-%m-%d")
-            dt_to = pd.Timestamp(to_date).strftime("%Y-%m-%d")
-
-        dt_created = pd.Timestamp.now().strftime("%Y-%m-%d")
-        rpath = self._decorate_url(rpath)
-        if type(lpath).__name__ in ["S3File"]:
-            return self._cloud_copy(
-                lpath, rpath, dt_from, dt_to, dt_created, chunk_size, callback, method, file_name, additional_headers
-            )
-        headers, chunk_headers_lst = self._construct_headers(
-            lpath, dt_from, dt_to, dt_created, chunk_size, multipart, file_name
+        return sync(
+            super().loop,
+            self._put_distribution,
+            lpath,
+            rpath,
+            chunk_size,
+            callback,
+            method,
+            multipart,
+            from_date,
+            to_date,
+            file_name,
+            additional_headers,
+            part_concurrency=part_concurrency,
+            resume=resume,
+            **kwargs,
         )
-        kwargs.update({"headers": headers})
-        if multipart:
-            kwargs.update({"chunk_headers_lst": chunk_headers_lst})
-            args = [lpath, rpath, chunk_size, callback, method, multipart, additional_headers]
-        else:
-            args = [lpath, rpath, None, callback, method, multipart, additional_headers]
-
-        return sync(super().loop, self._put_file, *args, **kwargs)
 
     def find(self, path: str, maxdepth: Optional[int] = None, withdirs: bool = False, **kwargs: Any) -> Any:
         """Find all file in a folder.
@@ -871,8 +1188,8 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
         mode: str = "rb",
         block_size: Optional[int] = None,
         _autocommit: Optional[bool] = None,
-        cache_type: None = None,
-        cache_options: None = None,
+        cache_type: Optional[str] = None,
+        cache_options: Optional[dict[str, Any]] = None,
         size: Optional[None] = None,
         **kwargs: Any,
     ) -> fsspec.spec.AbstractBufferedFile:
@@ -884,8 +1201,9 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
             block_size (int): Bytes to download in one request; use instance value if None. If
             zero, will return a streaming Requests file-like instance.
             autocommit (bool):
-            cache_type ():
-            cache_options ():
+            cache_type (): fsspec cache type, "fusion_disk" selects the persistent block cache. Distributions
+                without a digest or ETag are cached in memory instead, as their version is unknown.
+            cache_options (): Options passed to the cache, see FusionBlockCache.
             size ():
             **kwargs ():
 
@@ -898,6 +1216,18 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
         kw = self.kwargs.copy()
         kw["asynchronous"] = self.asynchronous
         kw.update(kwargs)
+        cache_type = cache_type or self.cache_type
+        cache_options = dict(cache_options or self.cache_options or {})
+        if cache_type == "fusion_disk":
+            # key blocks by distribution version so a republished distribution never reuses stale blocks
+            info = self.info(path, **kwargs)
+            size = size or info["size"]
+            key = cache_options.get("key") or block_cache_key(path, info)
+            if key:
+                cache_options["key"] = key
+            else:
+                logger.log(VERBOSE_LVL, f"No digest for {path}, its blocks are cached in memory only")
+                cache_type, cache_options = "blockcache", {}
         size = size or self.info(path, **kwargs)["size"]
         session = sync(self.loop, self.set_session)
         if block_size and size:
@@ -908,8 +1238,8 @@ class FusionHTTPFileSystem(HTTPFileSystem):  # type: ignore
                 block_size=block_size,
                 mode=mode,
                 size=size,
-                cache_type=cache_type or self.cache_type,
-                cache_options=cache_options or self.cache_options,
+                cache_type=cache_type,
+                cache_options=cache_options,
                 loop=self.loop,
                 **kw,
             )
@@ -924,6 +1254,22 @@ class FusionFile(HTTPFile):  # type: ignore
         """Init."""
         super().__init__(*args, **kwargs)
 
+    async def async_fetch_ranges(self, starts: list[int], ends: list[int], **kwargs: Any) -> list[bytes]:
+        """Download several blocks of data concurrently, see FusionHTTPFileSystem._cat_ranges.
+
+        Args:
+            starts (list): Start byte of each block.
+            ends (list): End byte (exclusive) of each block.
+            **kwargs: Passed to FusionHTTPFileSystem._cat_ranges.
+
+        Returns:
+            list: The bytes of each block, in the order requested.
+        """
+        res: list[bytes] = await self.fs._cat_ranges([self.url] * len(starts), starts, ends, on_error="raise", **kwargs)
+        return res
+
+    fetch_ranges = sync_wrapper(async_fetch_ranges)
+
     async def async_fetch_range(self, start: int, end: int) -> bytes:
         """Download a block of data.
 
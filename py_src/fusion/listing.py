@@ -0,0 +1,133 @@
+"""Listing of the published distributions of datasets, from the changes Fusion reports for them."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+from urllib.parse import quote
+
+import fsspec
+import fsspec.asyn
+import pandas as pd
+
+from .fusion_filesystem import FusionHTTPFileSystem
+
+DEFAULT_REMOTE_CONCURRENCY = 16
+DEFAULT_CATALOG_CHANGES_THRESHOLD = 64
+
+
+def _get_dataset_changes(
+    fs_fusion: fsspec.filesystem,
+    datasets_lst: list[str],
+    catalog: str,
+    max_concurrency: int = DEFAULT_REMOTE_CONCURRENCY,
+) -> list[dict[str, Any]]:
+    """The changes of each dataset, requested concurrently."""
+    if isinstance(fs_fusion, FusionHTTPFileSystem):
+        # only the changes are requested, on the event loop and session of the filesystem
+        async def _changes_all() -> list[dict[str, Any]]:
+            slots = asyncio.Semaphore(max_concurrency)
+
+            async def _changes(dataset: str) -> dict[str, Any]:
+                async with slots:
+                    return await fs_fusion._changes(f"{catalog}/datasets/changes?datasets={quote(dataset)}")
+
+            return await asyncio.gather(*(_changes(d) for d in datasets_lst))
+
+        res: list[dict[str, Any]] = fsspec.asyn.sync(fs_fusion.loop, _changes_all)
+        return res
+    with ThreadPoolExecutor(max_workers=max(min(max_concurrency, len(datasets_lst)), 1)) as executor:
+        return list(executor.map(lambda d: fs_fusion.info(f"{catalog}/datasets/{d}")["changes"], datasets_lst))
+
+
+def _key_dataset(key: str) -> str:
+    """The dataset of a distribution key, e.g. my_dataset.20200101.distribution.csv."""
+    return key.replace(".", "/").split("/")[0]
+
+
+def _latest_distributions(changes: dict[str, Any]) -> list[dict[str, Any]]:
+    """The distributions of the latest change of each dataset in a changes response."""
+    distributions = []
+    seen = set()
+    for entry in changes["datasets"]:
+        dataset = entry.get("identifier") or next((_key_dataset(d["key"]) for d in entry["distributions"]), None)
+        if dataset in seen:
+            continue
+        seen.add(dataset)
+        distributions += entry["distributions"]
+    return distributions
+
+
+def _get_fusion_df(
+    fs_fusion: fsspec.filesystem,
+    datasets_lst: Optional[list[str]],
+    catalog: str,
+    flatten: bool = False,
+    dataset_format: Optional[str] = None,
+    max_concurrency: int = DEFAULT_REMOTE_CONCURRENCY,
+    catalog_changes_threshold: int = DEFAULT_CATALOG_CHANGES_THRESHOLD,
+) -> pd.DataFrame:
+    """The published distributions of datasets, sorted by url.
+
+    Without a dataset filter, or with more datasets than catalog_changes_threshold, the changes of
+    the whole catalog are requested once from a Fusion filesystem, instead of once per dataset.
+
+    Args:
+        fs_fusion (fsspec.filesystem): Fusion filesystem.
+        datasets_lst (list[str], optional): Datasets to list. Defaults to all datasets of the catalog.
+        catalog (str): Catalog of the datasets.
+        flatten (bool): Paths without the series member folders. Defaults to False.
+        dataset_format (str, optional): Only list the distributions of this format.
+        max_concurrency (int): Maximum number of concurrent requests for the changes of single datasets.
+        catalog_changes_threshold (int): Number of datasets above which the changes of the catalog are requested.
+
+    Returns:
+        pd.DataFrame: The path, url, size and sha256 of each distribution.
+    """
+    if isinstance(fs_fusion, FusionHTTPFileSystem) and (
+        datasets_lst is None or len(datasets_lst) > catalog_changes_threshold
+    ):
+        changes = fsspec.asyn.sync(fs_fusion.loop, fs_fusion._changes, f"{catalog}/datasets/changes")
+        distributions = _latest_distributions(changes)
+        if datasets_lst is not None:
+            wanted = set(datasets_lst)
+            distributions = [d for d in distributions if _key_dataset(d["key"]) in wanted]
+    else:
+        if datasets_lst is None:
+            datasets_lst = [p.rstrip("/").split("/")[-1] for p in fs_fusion.ls(f"{catalog}/datasets")]
+        distributions = [
+            d
+            for changes in _get_dataset_changes(fs_fusion, datasets_lst, catalog, max_concurrency)
+            if len(changes["datasets"]) > 0
+            for d in changes["datasets"][0]["distributions"]
+        ]
+    if not distributions:
+        return pd.DataFrame(columns=["path", "url", "size", "sha256"])
+
+    changes_df = pd.DataFrame.from_records(distributions, columns=["key", "values"])
+    key = changes_df["key"].str.replace(".", "/", regex=False).str.split("/")
+    urls = catalog + "/datasets/" + key.str[0] + "/" + key.str[1] + "/" + key.str[2] + "/" + key.str[-1]
+    urls = urls.str.replace("distribution", "distributions", regex=False)
+    urls = urls.where(
+        urls.str.contains("datasetseries", regex=False),
+        urls.str.replace(r"^([^/]*/[^/]*/[^/]*)", r"\1/datasetseries", regex=True),
+    )
+    values = changes_df["values"]
+    parts = urls.str.split("/")
+    # the path _url_to_path returns for each url
+    file_names = parts.str[2] + "__" + parts.str[0] + "__" + parts.str[4] + "." + parts.str[6]
+    if flatten:
+        paths = parts.str[0] + "/" + parts.str[2] + "/" + file_names
+    else:
+        paths = parts.str[0] + "/" + parts.str[2] + "/" + parts.str[4] + "//" + file_names
+
+    info_df = pd.DataFrame(
+        {
+            "path": paths,
+            "url": urls,
+            "size": values.str[1].astype(int),
+            "sha256": values.str[2].str.split("SHA-256=").str[-1].str[:44],
+        }
+    )
+    if dataset_format:
+        info_df = info_df[parts.str[-1] == dataset_format]
+    return info_df.sort_values("url", kind="stable").reset_index(drop=True)
@@ -0,0 +1,258 @@
+"""Incrementally refreshed materialized views over Fusion datasets."""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import TYPE_CHECKING, Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from joblib import Parallel, delayed
+
+from .listing import _get_fusion_df
+from .utils import (
+    PathLikeT,
+    cpu_count,
+    csv_to_table,
+    distribution_to_filename,
+    json_to_table,
+    normalise_dt_param_str,
+    parquet_to_table,
+)
+
+if TYPE_CHECKING:
+    from .fusion import Fusion
+
+logger = logging.getLogger(__name__)
+VERBOSE_LVL = 25
+WATERMARK_FILE_NAME = "_watermark.json"
+
+
+def _filter_members(members: list[str], dt_str: str) -> list[str]:
+    """Select the series members that fall within a date or date range.
+
+    Args:
+        members (list): Series member identifiers.
+        dt_str (str): Either a single date or a range identified by a start or end date,
+            or both separated with a ":".
+
+    Returns:
+        list: The series members within the range.
+    """
+    parsed_dates = normalise_dt_param_str(dt_str)
+    if len(parsed_dates) == 1:
+        parsed_dates = (parsed_dates[0], parsed_dates[0])
+
+    member_dates = pd.Series([pd.to_datetime(i, errors="coerce") for i in members], dtype="datetime64[ns]")
+    mask = pd.Series([True] * len(members))
+    if parsed_dates[0]:
+        mask &= member_dates >= pd.to_datetime(parsed_dates[0])
+    if parsed_dates[1]:
+        mask &= member_dates <= pd.to_datetime(parsed_dates[1])
+
+    return [m for m, keep in zip(members, mask) if keep]
+
+
+class MaterializedView:
+    """A persisted concatenation of a dataset's series members, refreshed incrementally.
+
+    The view is stored as one parquet part per series member together with a watermark
+    recording the digest of every member included. A refresh compares the watermark with the
+    digests published on Fusion and only downloads and rewrites members that are new or changed,
+    so its cost scales with the delta rather than with the history.
+    """
+
+    def __init__(
+        self,
+        fusion: Fusion,
+        dataset: str,
+        dt_str: str,
+        dataset_format: str = "parquet",
+        catalog: str | None = None,
+        path: str | None = None,
+    ) -> None:
+        """Constructor to instantiate a materialized view.
+
+        Args:
+            fusion (Fusion): Fusion client used to query and download distributions.
+            dataset (str): A dataset identifier.
+            dt_str (str): Either a single date or a range identified by a start or end date,
+                or both separated with a ":", e.g. "20200101:".
+            dataset_format (str, optional): The file format, e.g. CSV or Parquet. Defaults to 'parquet'.
+            catalog (str, optional): A catalog identifier. Defaults to the Fusion default catalog.
+            path (str, optional): Folder where the view is persisted.
+                Defaults to "{download_folder}/views/{catalog}/{dataset}/{dataset_format}".
+        """
+        if dataset_format not in ["csv", "parquet", "json"]:
+            raise ValueError(f"Dataset format {dataset_format} is not supported for materialized views")
+        normalise_dt_param_str(dt_str)
+
+        self.fusion = fusion
+        self.dataset = dataset
+        self.dt_str = dt_str
+        self.dataset_format = dataset_format
+        self.catalog = fusion._use_catalog(catalog)
+        self.fs = fusion.fs
+        self.path = (
+            path if path else f"{fusion.download_folder}/views/{self.catalog}/{dataset}/{dataset_format}"
+        ).rstrip("/")
+        self.watermark = self._read_watermark()
+
+    def __repr__(self) -> str:
+        """Object representation."""
+        return (
+            f"MaterializedView(catalog={self.catalog!r}, dataset={self.dataset!r}, dt_str={self.dt_str!r}, "
+            f"members={len(self.watermark)})"
+        )
+
+    @property
+    def _watermark_path(self) -> str:
+        return f"{self.path}/{WATERMARK_FILE_NAME}"
+
+    def _part_path(self, member: str) -> str:
+        return f"{self.path}/{member}.parquet"
+
+    def _read_watermark(self) -> dict[str, str]:
+        if not self.fs.exists(self._watermark_path):
+            return {}
+        with self.fs.open(self._watermark_path, "r") as f:
+            state = json.load(f)
+        members: dict[str, str] = state.get("members", {})
+        return members
+
+    def _write_watermark(self) -> None:
+        state = {
+            "catalog": self.catalog,
+            "dataset": self.dataset,
+            "dt_str": self.dt_str,
+            "format": self.dataset_format,
+            "members": self.watermark,
+        }
+        tmp_path = self._watermark_path + ".tmp"
+        with self.fs.open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        self.fs.mv(tmp_path, self._watermark_path)
+
+    def _remote_state(self) -> dict[str, str]:
+        """Digests of the dataset's series members currently published on Fusion, by member."""
+        fs_fusion = self.fusion.get_fusion_filesystem()
+        fusion_df = _get_fusion_df(fs_fusion, [self.dataset], self.catalog, dataset_format=self.dataset_format)
+        members = [u.split("/")[4] for u in fusion_df["url"]]
+        state = dict(zip(members, fusion_df["sha256"]))
+        return {m: state[m] for m in _filter_members(list(state.keys()), self.dt_str)}
+
+    def _materialize_member(self, member: str) -> None:
+        """Download a single series member, rewrite it as a parquet part and delete the download."""
+        fs_fusion = self.fusion.get_fusion_filesystem()
+        download_folder = f"{self.fusion.download_folder}/{self.catalog}/{self.dataset}"
+        if not self.fs.exists(download_folder):
+            self.fs.mkdir(download_folder, create_parents=True)
+        lpath = distribution_to_filename(download_folder, self.dataset, member, self.dataset_format, self.catalog)
+        rpath = f"{self.catalog}/datasets/{self.dataset}/datasetseries/{member}/distributions/{self.dataset_format}"
+        res = fs_fusion.download(self.fs, rpath, lpath, overwrite=True)
+        if not res[0]:
+            raise RuntimeError(f"Failed to download series member {member} of {self.dataset}: {res[2]}")
+
+        read_fn_map = {"csv": csv_to_table, "parquet": parquet_to_table, "json": json_to_table}
+        tbl = read_fn_map[self.dataset_format](lpath, fs=self.fs)
+        pq.write_table(tbl, self._part_path(member), filesystem=self.fs)
+        # the view keeps the rewritten part only
+        self.fs.rm(lpath)
+
+    def refresh(self, n_par: int | None = None) -> dict[str, list[str]]:
+        """Bring the view up to date with the series members published on Fusion.
+
+        Only members that are new or whose digest changed since the last refresh are downloaded
+        and rewritten; members no longer published within the date range are dropped.
+
+        Args:
+            n_par (int, optional): Specify how many members to download in parallel.
+                Defaults to all cpus available.
+
+        Returns:
+            dict: The members that were added, updated and removed.
+        """
+        n_par = cpu_count(n_par)
+        if not self.fs.exists(self.path):
+            self.fs.mkdir(self.path, create_parents=True)
+
+        remote = self._remote_state()
+        added = [m for m in remote if m not in self.watermark]
+        updated = [
+            m
+            for m in remote
+            if m in self.watermark and (remote[m] != self.watermark[m] or not self.fs.exists(self._part_path(m)))
+        ]
+        removed = [m for m in self.watermark if m not in remote]
+        logger.log(
+            VERBOSE_LVL,
+            "Refreshing view %s: %d added, %d updated, %d removed",
+            self.path,
+            len(added),
+            len(updated),
+            len(removed),
+        )
+
+        delta = sorted(added + updated)
+        res = Parallel(n_jobs=n_par, backend="threading", return_as="generator")(
+            delayed(self._materialize_member)(m) for m in delta
+        )
+        try:
+            # record members as they complete so a failed refresh keeps its progress
+            for member, _ in zip(delta, res):
+                self.watermark[member] = remote[member]
+            for member in removed:
+                if self.fs.exists(self._part_path(member)):
+                    self.fs.rm(self._part_path(member))
+                self.watermark.pop(member)
+        finally:
+            if delta or removed:
+                self._write_watermark()
+
+        return {"added": sorted(added), "updated": sorted(updated), "removed": sorted(removed)}
+
+    @property
+    def members(self) -> list[str]:
+        """Returns the series members currently included in the view.
+
+        Returns:
+            list: Series member identifiers.
+        """
+        return sorted(self.watermark)
+
+    def to_table(self, columns: list[str] | None = None, filters: Any = None) -> pa.Table:
+        """Returns the materialized data as an arrow table.
+
+        Args:
+            columns (list, optional): A list of columns to return. Defaults to None.
+            filters (list, optional): Arrow filters applied to the scanned data. Defaults to None.
+
+        Returns:
+            class:`pyarrow.Table`: The concatenated series members of the view.
+        """
+        if not self.watermark:
+            raise ValueError("The materialized view is empty, call refresh first.")
+        parts: list[PathLikeT] = [self._part_path(m) for m in self.members]
+        return parquet_to_table(parts, fs=self.fs, columns=columns, filters=filters)
+
+    def to_df(self, columns: list[str] | None = None, filters: Any = None, dataframe_type: str = "pandas") -> Any:
+        """Returns the materialized data as a dataframe.
+
+        Args:
+            columns (list, optional): A list of columns to return. Defaults to None.
+            filters (list, optional): Arrow filters applied to the scanned data. Defaults to None.
+            dataframe_type (str, optional): Datafame type pandas or polars. Defaults to 'pandas'.
+
+        Returns:
+            Union[pandas.DataFrame, polars.DataFrame]: The concatenated series members of the view.
+        """
+        tbl = self.to_table(columns=columns, filters=filters)
+        if dataframe_type == "pandas":
+            return tbl.to_pandas()
+        if dataframe_type == "polars":
+            import polars as pl
+
+            return pl.from_arrow(tbl)
+        raise ValueError(f"Unknown DataFrame type {dataframe_type}")
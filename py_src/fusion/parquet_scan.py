@@ -0,0 +1,174 @@
+"""Reading of parquet distributions in place, transferring only their footers and the column chunks read."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+from typing import TYPE_CHECKING, Any
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from fsspec.asyn import sync
+
+from .fusion_filesystem import DEFAULT_RANGE_BLOCK, DEFAULT_RANGE_CONCURRENCY, DEFAULT_RANGE_GAP, _coalesce_ranges
+
+if TYPE_CHECKING:
+    from .fusion_filesystem import FusionHTTPFileSystem
+    from .types import PyArrowFilterT
+    from .utils import PathLikeT
+
+logger = logging.getLogger(__name__)
+VERBOSE_LVL = 25
+# arrow reads the last 64 KiB of a file to find its footer, the sample must cover that read
+DEFAULT_FOOTER_SAMPLE = 2**16
+_FOOTER_TAIL = 8
+
+
+def _footer_length(tail: bytes, url: str) -> int:
+    """Length of the footer of a parquet file, including the trailing length and magic bytes."""
+    if len(tail) < _FOOTER_TAIL or tail[-4:] != b"PAR1":
+        raise ValueError(f"{url} is not a parquet file")
+    return int(struct.unpack("<I", tail[-8:-4])[0]) + _FOOTER_TAIL
+
+
+def _filter_columns(filters: PyArrowFilterT) -> set[str]:
+    conjunctions = filters if isinstance(filters[0], list) else [filters]
+    return {predicate[0] for conjunction in conjunctions for predicate in conjunction}
+
+
+def _column_chunk_ranges(
+    metadata: pq.FileMetaData, row_groups: list[int], columns: set[str] | None
+) -> list[tuple[int, int]]:
+    """Byte ranges of the chunks of the given columns in the given row groups."""
+    ranges = []
+    for i in row_groups:
+        row_group = metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            chunk = row_group.column(j)
+            if columns is not None and chunk.path_in_schema.split(".")[0] not in columns:
+                continue
+            start = chunk.data_page_offset
+            if chunk.has_dictionary_page and chunk.dictionary_page_offset:
+                start = min(start, chunk.dictionary_page_offset)
+            ranges.append((start, start + chunk.total_compressed_size))
+    return ranges
+
+
+async def _sizes(fs_fusion: FusionHTTPFileSystem, urls: list[str], batch_size: int) -> list[int]:
+    semaphore = asyncio.Semaphore(batch_size)
+
+    async def size(url: str) -> int:
+        async with semaphore:
+            return await fs_fusion._size(url)
+
+    return list(await asyncio.gather(*(size(url) for url in urls)))
+
+
+def scan_parquet(  # noqa: PLR0913
+    fs_fusion: FusionHTTPFileSystem,
+    paths: list[PathLikeT],
+    columns: list[str] | None = None,
+    filters: PyArrowFilterT | None = None,
+    batch_size: int | None = None,
+    footer_sample: int = DEFAULT_FOOTER_SAMPLE,
+) -> pa.Table:
+    """Read parquet distributions with ranged requests.
+
+    The footers of all distributions are fetched concurrently, once. Row groups are pruned with the
+    statistics in the footers and the chunks of the selected columns are then fetched concurrently,
+    adjacent chunks of a distribution in a single request. Arrow reads the distributions from these
+    fetched blocks.
+
+    Args:
+        fs_fusion (FusionHTTPFileSystem): Fusion filesystem.
+        paths (list[PathLikeT]): Distribution urls.
+        columns (list[str], optional): Columns to read. Defaults to all columns.
+        filters (PyArrowFilterT, optional): Arrow filters used to prune row groups and rows.
+        batch_size (int, optional): Maximum number of concurrent requests. Defaults to DEFAULT_RANGE_CONCURRENCY.
+        footer_sample (int, optional): Number of bytes fetched from the end of each distribution for its footer.
+
+    Returns:
+        pyarrow.Table: The data of all distributions, cast to their unified schema.
+    """
+    batch_size = batch_size or DEFAULT_RANGE_CONCURRENCY
+    urls = [fs_fusion._decorate_url(str(p)) for p in paths]
+    sizes = sync(fs_fusion.loop, _sizes, fs_fusion, urls, batch_size)
+
+    tail_starts = [max(0, size - footer_sample) for size in sizes]
+    tails = sync(
+        fs_fusion.loop, fs_fusion._cat_ranges, urls, tail_starts, sizes, batch_size=batch_size, on_error="raise"
+    )
+    # footers longer than the sample are completed with a second request
+    footer_starts = [size - _footer_length(tail, url) for url, size, tail in zip(urls, sizes, tails)]
+    short = [i for i, start in enumerate(footer_starts) if start < tail_starts[i]]
+    if short:
+        heads = sync(
+            fs_fusion.loop,
+            fs_fusion._cat_ranges,
+            [urls[i] for i in short],
+            [footer_starts[i] for i in short],
+            [tail_starts[i] for i in short],
+            batch_size=batch_size,
+            on_error="raise",
+        )
+        for i, head in zip(short, heads):
+            tails[i] = head + tails[i]
+            tail_starts[i] = footer_starts[i]
+
+    metadata = [pq.read_metadata(pa.BufferReader(tail)) for tail in tails]
+    schema = pa.unify_schemas([md.schema.to_arrow_schema() for md in metadata])
+    expr = pq.filters_to_expression(filters) if filters else None
+    needed = None if columns is None else set(columns) | (_filter_columns(filters) if filters else set())
+    parquet_format = ds.ParquetFileFormat()
+
+    def open_file(i: int, blocks: dict[tuple[int, int], bytes]) -> Any:
+        # reads are served from the fetched blocks, any other read is a ranged request
+        return fs_fusion.open(urls[i], "rb", size=sizes[i], cache_type="parts", cache_options={"data": blocks})
+
+    row_groups = []
+    requests = []
+    for i, md in enumerate(metadata):
+        if expr is None:
+            selected = list(range(md.num_row_groups))
+        else:
+            with open_file(i, {(tail_starts[i], sizes[i]): tails[i]}) as f:
+                fragment = parquet_format.make_fragment(f)
+                selected = [rg.id for rg in fragment.subset(expr, schema=schema).row_groups]
+        row_groups.append(selected)
+        ranges = [(urls[i], *r) for r in _column_chunk_ranges(md, selected, needed)]
+        # the block reaching into the footer is only fetched up to the footer
+        for url, start, end in _coalesce_ranges(
+            [*ranges, (urls[i], tail_starts[i], sizes[i])], DEFAULT_RANGE_GAP, DEFAULT_RANGE_BLOCK
+        ):
+            if start < tail_starts[i]:
+                requests.append((i, url, start, min(end, tail_starts[i])))
+
+    chunks = sync(
+        fs_fusion.loop,
+        fs_fusion._cat_ranges,
+        [r[1] for r in requests],
+        [r[2] for r in requests],
+        [r[3] for r in requests],
+        max_gap=0,
+        batch_size=batch_size,
+        on_error="raise",
+    )
+    blocks: list[dict[tuple[int, int], bytes]] = [
+        {(start, size): tail} for start, size, tail in zip(tail_starts, sizes, tails)
+    ]
+    for (i, _, start, end), chunk in zip(requests, chunks):
+        blocks[i][(start, end)] = chunk
+    logger.log(VERBOSE_LVL, f"Fetched {len(urls)} footers and {len(requests)} blocks of column chunks")
+
+    tables = []
+    scan_options = ds.ParquetFragmentScanOptions(pre_buffer=False)
+    for i in range(len(urls)):
+        with open_file(i, blocks[i]) as f:
+            fragment = parquet_format.make_fragment(f, row_groups=row_groups[i])
+            scanner = ds.Scanner.from_fragment(
+                fragment, schema=schema, columns=columns, filter=expr, fragment_scan_options=scan_options
+            )
+            tables.append(scanner.to_table())
+    return pa.concat_tables(tables)
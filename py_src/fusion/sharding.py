@@ -0,0 +1,165 @@
+"""Partitioning of fsync datasets across workers sharing a target filesystem."""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    import fsspec
+
+logger = logging.getLogger(__name__)
+VERBOSE_LVL = 25
+DEFAULT_LEASE_TTL = 60
+DEFAULT_RING_REPLICAS = 64
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hashing of keys onto members.
+
+    When a member joins or leaves, only the keys it owns, or comes to own, change owner.
+    """
+
+    def __init__(self, members: Iterable[str], replicas: int = DEFAULT_RING_REPLICAS) -> None:
+        """Constructor to place the members on the ring.
+
+        Args:
+            members (Iterable[str]): Member identifiers.
+            replicas (int, optional): Number of points of each member on the ring, evening out the shards.
+        """
+        points = sorted((_ring_hash(f"{m}#{i}"), m) for m in set(members) for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._members = [m for _, m in points]
+
+    def owner(self, key: str) -> str:
+        """The member owning a key.
+
+        Args:
+            key (str): The key, e.g. a dataset identifier.
+
+        Returns:
+            str: The member identifier.
+        """
+        if not self._members:
+            raise ValueError("The ring has no members")
+        i = bisect.bisect(self._hashes, _ring_hash(key)) % len(self._hashes)
+        return self._members[i]
+
+
+class WorkerLease:
+    """Membership of an fsync worker, kept alive by a lease file in a directory shared by all workers.
+
+    A background thread rewrites the lease with an increasing sequence number. Peers whose sequence
+    number has not changed for ttl seconds, as measured by the observing worker, are considered dead,
+    so no clock synchronisation between hosts is needed. Their datasets are then owned by the live workers,
+    and their lease files are removed, so the directory only holds the leases of live workers.
+    """
+
+    def __init__(
+        self,
+        fs: fsspec.AbstractFileSystem,
+        lease_dir: str,
+        worker_id: str | None = None,
+        ttl: float = DEFAULT_LEASE_TTL,
+        replicas: int = DEFAULT_RING_REPLICAS,
+    ) -> None:
+        """Constructor to join the workers and start renewing the lease.
+
+        Args:
+            fs (fsspec.AbstractFileSystem): Filesystem shared by the workers, e.g. the fsync target.
+            lease_dir (str): Directory of the lease files.
+            worker_id (str, optional): Unique worker identifier, kept across restarts so a restarted worker
+                reuses its lease. Defaults to the host name, several workers on one host need their own.
+            ttl (float, optional): Number of seconds without renewal after which a worker is considered dead.
+            replicas (int, optional): Number of points of each worker on the hash ring.
+        """
+        self.fs = fs
+        self.lease_dir = lease_dir.rstrip("/")
+        self.worker_id = worker_id or socket.gethostname()
+        self.ttl = ttl
+        self.replicas = replicas
+        self.path = f"{self.lease_dir}/{self.worker_id}.lease"
+        self._seq = 0
+        self._seen: dict[str, tuple[int, float]] = {}
+        self._stop = threading.Event()
+        fs.makedirs(self.lease_dir, exist_ok=True)
+        self.renew()
+        self._thread = threading.Thread(target=self._renew_periodically, daemon=True)
+        self._thread.start()
+
+    def renew(self) -> None:
+        """Rewrite the lease file."""
+        self._seq += 1
+        lease = {"worker": self.worker_id, "seq": self._seq, "host": socket.gethostname(), "pid": os.getpid()}
+        self.fs.pipe_file(self.path, json.dumps(lease).encode())
+
+    def _renew_periodically(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                self.renew()
+            except Exception:  # noqa: BLE001, PERF203
+                logger.log(VERBOSE_LVL, f"Failed to renew the lease {self.path}", exc_info=True)
+
+    def live_workers(self) -> list[str]:
+        """The workers whose lease is renewed, including this one. The leases of dead workers are removed.
+
+        Returns:
+            list[str]: Worker identifiers.
+        """
+        now = time.monotonic()
+        live = {self.worker_id}
+        for path in self.fs.ls(self.lease_dir, detail=False):
+            if not path.endswith(".lease"):
+                continue
+            try:
+                lease = json.loads(self.fs.cat_file(path))
+            except Exception:  # noqa: BLE001, PERF203
+                # a lease being rewritten or removed
+                continue
+            worker, seq = lease["worker"], lease["seq"]
+            prev_seq, since = self._seen.get(worker, (None, now))
+            if seq != prev_seq:
+                self._seen[worker] = (seq, now)
+                since = now
+            if now - since < self.ttl:
+                live.add(worker)
+            elif worker != self.worker_id:
+                # a worker renewing again after its removal rewrites its lease and joins again
+                logger.log(VERBOSE_LVL, f"Removing the expired lease {path}")
+                with contextlib.suppress(FileNotFoundError):
+                    self.fs.rm_file(path)
+                self._seen.pop(worker, None)
+        return sorted(live)
+
+    def owned(self, keys: Iterable[str]) -> list[str]:
+        """The keys owned by this worker among the live workers.
+
+        Args:
+            keys (Iterable[str]): Keys to partition, e.g. dataset identifiers.
+
+        Returns:
+            list[str]: The keys of this worker, in their original order.
+        """
+        ring = HashRing(self.live_workers(), self.replicas)
+        return [k for k in keys if ring.owner(k) == self.worker_id]
+
+    def release(self) -> None:
+        """Stop renewing and remove the lease, so peers take over the datasets of this worker at once."""
+        self._stop.set()
+        self._thread.join()
+        with contextlib.suppress(FileNotFoundError):
+            self.fs.rm_file(self.path)
@@ -0,0 +1,144 @@
+"""Planning of fsync transfers by merging sorted listings of the local and Fusion states."""
+
+from __future__ import annotations
+
+import itertools
+from typing import TYPE_CHECKING, NamedTuple
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+
+class SyncEntry(NamedTuple):
+    """A file of a listing, identified by the url of its distribution."""
+
+    url: str
+    sha256: str | None
+    path: str
+    size: int | None = None
+
+
+class SyncAction(NamedTuple):
+    """A transfer required to bring the target of a synchronisation up to date."""
+
+    direction: str
+    url: str
+    path_local: str | None
+    path_fusion: str | None
+    size: int | None
+    sha256: str | None = None
+
+
+def _ordered(entries: Iterable[SyncEntry], side: str) -> Iterator[SyncEntry]:
+    prev = None
+    for entry in entries:
+        if prev is not None and entry.url < prev:
+            raise ValueError(f"The {side} listing is not sorted by url, {entry.url} follows {prev}")
+        prev = entry.url
+        yield entry
+
+
+def iter_sync_actions(
+    local: Iterable[SyncEntry], remote: Iterable[SyncEntry], direction: str = "upload"
+) -> Iterator[SyncAction]:
+    """Transfers required to synchronise two listings, in url order.
+
+    Both listings are consumed once, in step, so only their current entries are held in memory.
+    A file is transferred if it is missing from the target or its digest differs.
+
+    Args:
+        local (Iterable[SyncEntry]): The local files, sorted by url.
+        remote (Iterable[SyncEntry]): The distributions in Fusion, sorted by url.
+        direction (str, optional): upload or download. Defaults to upload.
+
+    Yields:
+        SyncAction: The transfers, in url order.
+    """
+    if direction not in ("upload", "download"):
+        raise ValueError("Unknown direction of operation.")
+    source, target = (local, remote) if direction == "upload" else (remote, local)
+    targets = _ordered(target, "remote" if direction == "upload" else "local")
+    current = next(targets, None)
+    for entry in _ordered(source, "local" if direction == "upload" else "remote"):
+        while current is not None and current.url < entry.url:
+            current = next(targets, None)
+        match = current if current is not None and current.url == entry.url else None
+        if match is not None and match.sha256 == entry.sha256:
+            continue
+        if direction == "upload":
+            yield SyncAction(direction, entry.url, entry.path, match.path if match else None, entry.size, entry.sha256)
+        else:
+            yield SyncAction(direction, entry.url, match.path if match else None, entry.path, entry.size, entry.sha256)
+
+
+def frame_entries(state: pd.DataFrame) -> Iterator[SyncEntry]:
+    """Entries of a local or Fusion state frame, in the url order of the listing the frame holds.
+
+    The rows are read one at a time, the frame is neither sorted nor copied.
+
+    Args:
+        state (pd.DataFrame): A frame sorted by url, with url, sha256 and path columns, and optionally size.
+
+    Yields:
+        SyncEntry: The rows of the frame.
+    """
+    if len(state) == 0:
+        return
+    sizes = state["size"] if "size" in state.columns else itertools.repeat(None)
+    for url, sha256, path, size in zip(state["url"], state["sha256"], state["path"], sizes):
+        yield SyncEntry(url, sha256, path, None if pd.isna(size) else int(size))
+
+
+class SyncPlan:
+    """Transfers a synchronisation would make, e.g. to review them before running fsync.
+
+    The plan holds every transfer, synchronisations make them as they are planned instead.
+    """
+
+    def __init__(self, actions: Iterable[SyncAction]) -> None:
+        """Constructor to collect the actions of a plan.
+
+        Args:
+            actions (Iterable[SyncAction]): The transfers.
+        """
+        self.actions = list(actions)
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def __repr__(self) -> str:
+        return f"SyncPlan({self.n_files} files, {self.n_bytes} bytes)"
+
+    @property
+    def n_files(self) -> int:
+        """Number of files to transfer."""
+        return len(self.actions)
+
+    @property
+    def n_bytes(self) -> int:
+        """Number of bytes to transfer, counting files of unknown size as empty."""
+        return sum(a.size or 0 for a in self.actions)
+
+    def to_df(self) -> pd.DataFrame:
+        """The transfers as a frame.
+
+        Returns:
+            pd.DataFrame: One row per transfer, with the fields of SyncAction as columns.
+        """
+        return pd.DataFrame(self.actions, columns=list(SyncAction._fields))
+
+
+def plan_sync(df_local: pd.DataFrame, df_fusion: pd.DataFrame, direction: str = "upload") -> SyncPlan:
+    """Plan the synchronisation of a local and a Fusion state.
+
+    Args:
+        df_local (pd.DataFrame): The local state sorted by url, with url, sha256, path and size columns.
+        df_fusion (pd.DataFrame): The Fusion state sorted by url, with url, sha256, path and size columns.
+        direction (str, optional): upload or download. Defaults to upload.
+
+    Returns:
+        SyncPlan: The transfers required.
+    """
+    return SyncPlan(iter_sync_actions(frame_entries(df_local), frame_entries(df_fusion), direction))
@@ -0,0 +1,128 @@
+"""Durable state of the files synchronised by fsync, kept in SQLite."""
+
+from __future__ import annotations
+
+import os
+import posixpath
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    import fsspec
+
+DEFAULT_SYNC_STATE_PATH = Path.home() / ".cache" / "fusion" / "fsync_state.db"
+_MAX_QUERY_PARAMS = 500
+
+
+class FileState(NamedTuple):
+    """Stat signature and digest of a file."""
+
+    size: int
+    mtime: str
+    inode: int | None
+    digest: str
+
+
+class SyncStateDB:
+    """Digests of synchronised files keyed by path, reused while their stat signature is unchanged.
+
+    A file whose size, modification time and inode match the recorded ones is not hashed again,
+    including after a restart.
+    """
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        """Constructor to open, or create, the database.
+
+        Args:
+            path (Union[str, Path], optional): The SQLite file.
+                Defaults to FUSION_SYNC_STATE or ~/.cache/fusion/fsync_state.db.
+        """
+        self.path = Path(path or os.environ.get("FUSION_SYNC_STATE") or DEFAULT_SYNC_STATE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime TEXT, inode INTEGER, digest TEXT, updated REAL)"
+            )
+
+    def get_many(self, paths: Iterable[str]) -> dict[str, FileState]:
+        """Look up the recorded state of files.
+
+        Args:
+            paths (Iterable[str]): File paths.
+
+        Returns:
+            dict[str, FileState]: The state of each recorded file.
+        """
+        paths = list(paths)
+        res = {}
+        with self._lock:
+            for i in range(0, len(paths), _MAX_QUERY_PARAMS):
+                batch = paths[i : i + _MAX_QUERY_PARAMS]
+                rows = self._conn.execute(
+                    f"SELECT path, size, mtime, inode, digest FROM files WHERE path IN ({','.join('?' * len(batch))})",  # noqa: S608
+                    batch,
+                )
+                res.update({row[0]: FileState(*row[1:]) for row in rows})
+        return res
+
+    def set_many(self, states: dict[str, FileState]) -> None:
+        """Record the state of files.
+
+        Args:
+            states (dict[str, FileState]): The state of each file, by path.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime, inode, digest, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                [(p, *s, now) for p, s in states.items()],
+            )
+
+    def remove(self, paths: Iterable[str]) -> None:
+        """Forget files, e.g. once they are deleted.
+
+        Args:
+            paths (Iterable[str]): File paths.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in paths])
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+
+def file_signature(info: dict[str, Any]) -> tuple[int, str, int | None]:
+    """Stat signature of a file from its fsspec info.
+
+    Args:
+        info (dict): The info of the file.
+
+    Returns:
+        tuple: The size, modification time and inode of the file, the inode None if unknown.
+    """
+    ino = info.get("ino")
+    return int(info["size"]), str(info.get("mtime")), int(ino) if ino is not None else None
+
+
+def state_key(fs: fsspec.AbstractFileSystem, path: str) -> str:
+    """Key of a file in the state database, its normalised path with the protocol of its filesystem.
+
+    Args:
+        fs (fsspec.AbstractFileSystem): The filesystem of the file.
+        path (str): The file path.
+
+    Returns:
+        str: The key.
+    """
+    return str(fs.unstrip_protocol(posixpath.normpath(fs._strip_protocol(str(path)))))
@@ -0,0 +1,155 @@
+"""Serialization of tables straight into an upload, without materialising the file."""
+
+from __future__ import annotations
+
+import io
+import threading
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+
+DEFAULT_CHUNK_SIZE = 5 * 2**20
+DEFAULT_BATCH_ROWS = 2**16
+TABLE_FORMATS = ["parquet", "csv"]
+
+
+class ChunkPipe(io.RawIOBase):
+    """Bounded in memory pipe between a writer thread and the upload reading from it.
+
+    Writes block once max_buffered bytes are waiting to be read, so a file of any size is
+    streamed through a fixed amount of memory. Reads block until a full chunk is available or
+    the writer finished, so every part of a multipart upload but the last has the requested size.
+    """
+
+    def __init__(self, max_buffered: int = 2 * DEFAULT_CHUNK_SIZE) -> None:
+        """Constructor to instantiate an empty pipe.
+
+        Args:
+            max_buffered (int, optional): Number of written bytes held before writes block.
+        """
+        super().__init__()
+        self.max_buffered = max_buffered
+        self._buffer = bytearray()
+        self._cond = threading.Condition()
+        self._written = 0
+        self._write_closed = False
+        self._aborted = False
+        self._error: BaseException | None = None
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def tell(self) -> int:
+        return self._written
+
+    def write(self, b: Any) -> int:
+        data = bytes(b)
+        with self._cond:
+            self._cond.wait_for(lambda: self._aborted or len(self._buffer) < self.max_buffered)
+            if self._aborted:
+                raise BrokenPipeError("The upload reading the pipe stopped")
+            self._buffer += data
+            self._written += len(data)
+            self._cond.notify_all()
+        return len(data)
+
+    def read(self, size: int | None = -1) -> bytes:
+        with self._cond:
+            if size is None or size < 0:
+                self._cond.wait_for(lambda: self._write_closed)
+            else:
+                self._cond.wait_for(lambda: self._write_closed or len(self._buffer) >= size)
+            if self._error is not None:
+                raise self._error
+            n = len(self._buffer) if size is None or size < 0 else size
+            out = bytes(self._buffer[:n])
+            del self._buffer[:n]
+            self._cond.notify_all()
+        return out
+
+    def close(self) -> None:
+        # writers such as ParquetWriter close their sink when done, the reader still drains it
+        self.finish()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        """Mark the end of the written data.
+
+        Args:
+            error (BaseException, optional): Failure of the writer, raised to the reader instead of the data.
+        """
+        with self._cond:
+            self._write_closed = True
+            self._error = self._error or error
+            self._cond.notify_all()
+
+    def abort(self) -> None:
+        """Stop the writer, e.g. once the upload failed."""
+        with self._cond:
+            self._aborted = True
+            self._buffer.clear()
+            self._cond.notify_all()
+
+
+def iter_record_batches(data: Any, batch_rows: int = DEFAULT_BATCH_ROWS) -> tuple[pa.Schema, Any]:
+    """Record batches of an arrow table or a pandas or polars dataframe.
+
+    Dataframes are converted slice by slice, so no arrow copy of the whole frame is made.
+
+    Args:
+        data (Any): A pyarrow Table, pandas DataFrame or polars DataFrame.
+        batch_rows (int, optional): Maximum number of rows per batch.
+
+    Returns:
+        tuple: The schema and an iterator over the record batches.
+    """
+    if isinstance(data, pa.Table):
+        return data.schema, iter(data.to_batches(max_chunksize=batch_rows))
+    if isinstance(data, pd.DataFrame):
+        schema = pa.Schema.from_pandas(data, preserve_index=False)
+        batches = (
+            pa.RecordBatch.from_pandas(data.iloc[i : i + batch_rows], schema=schema, preserve_index=False)
+            for i in range(0, len(data), batch_rows)
+        )
+        return schema, batches
+    if hasattr(data, "to_arrow"):
+        schema = data.slice(0, 0).to_arrow().schema
+        batches = (
+            batch
+            for i in range(0, len(data), batch_rows)
+            for batch in data.slice(i, batch_rows).to_arrow().to_batches()
+        )
+        return schema, batches
+    raise ValueError(f"Cannot upload data of type {type(data).__name__}, expected a pyarrow Table or a DataFrame")
+
+
+def write_table(data: Any, sink: Any, distribution: str = "parquet", batch_rows: int = DEFAULT_BATCH_ROWS) -> None:
+    """Serialize a table batch by batch.
+
+    Args:
+        data (Any): A pyarrow Table, pandas DataFrame or polars DataFrame.
+        sink (Any): A writable binary file object.
+        distribution (str, optional): The file format, parquet or csv. Defaults to parquet.
+        batch_rows (int, optional): Number of rows written at once, a parquet row group at most.
+    """
+    schema, batches = iter_record_batches(data, batch_rows)
+    if distribution == "parquet":
+        import pyarrow.parquet as pq
+
+        with pq.ParquetWriter(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    elif distribution == "csv":
+        from pyarrow import csv
+
+        with csv.CSVWriter(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    else:
+        raise ValueError(f"Dataset format {distribution} is not supported, expected one of {TABLE_FORMATS}")
@@ -0,0 +1,172 @@
+"""Checkpoints of multipart uploads, so failed uploads can be resumed."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+VERBOSE_LVL = 25
+DEFAULT_UPLOAD_CHECKPOINT_DIR = Path.home() / ".cache" / "fusion" / "uploads"
+
+
+def _source_fingerprint(source: Any) -> tuple[str, int, str] | None:
+    """Identify the version of an upload source.
+
+    Args:
+        source (Any): A local path or an fsspec file object.
+
+    Returns:
+        tuple: The source path, size and modification marker, or None if the source cannot be identified.
+    """
+    if isinstance(source, (str, Path)):
+        stat = Path(source).stat()
+        return str(Path(source).resolve()), stat.st_size, str(stat.st_mtime_ns)
+
+    fs = getattr(source, "fs", None)
+    path = getattr(source, "path", None)
+    if fs is None or path is None or not getattr(source, "seekable", lambda: False)():
+        return None
+    try:
+        info = fs.info(path)
+    except Exception:  # noqa: BLE001
+        return None
+    marker = info.get("mtime") or info.get("LastModified") or info.get("ETag") or info.get("created") or ""
+    return f"{fs.protocol}:{path}", int(info["size"]), str(marker)
+
+
+class UploadCheckpoint:
+    """Persisted progress of a multipart upload.
+
+    The checkpoint is a journal: its first line records the operation id and the chunk size, and
+    a line is appended for every part the server acknowledged, with its response and digest. A
+    later upload of the same unchanged source to the same distribution reuses the operation, sends
+    only the missing parts and completes it. Checkpoints are removed once the upload completes.
+    """
+
+    def __init__(self, path: Path, rpath: str, source: str, size: int, marker: str, chunk_size: int) -> None:
+        """Constructor to instantiate an empty checkpoint.
+
+        Args:
+            path (Path): File the checkpoint is persisted to.
+            rpath (str): The distribution URL uploaded to.
+            source (str): Identifier of the uploaded file.
+            size (int): Size of the uploaded file.
+            marker (str): Modification marker of the uploaded file, e.g. its mtime.
+            chunk_size (int): Size of the upload parts.
+        """
+        self.path = path
+        self.rpath = rpath
+        self.source = source
+        self.size = size
+        self.marker = marker
+        self.chunk_size = chunk_size
+        self.operation_id: str | None = None
+        self.parts: dict[int, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_upload(
+        cls: type[UploadCheckpoint],
+        source: Any,
+        rpath: str,
+        chunk_size: int,
+        checkpoint_dir: str | Path | None = None,
+    ) -> UploadCheckpoint | None:
+        """Load the checkpoint of an upload, or create an empty one.
+
+        Args:
+            source (Any): A local path or a seekable fsspec file object.
+            rpath (str): The distribution URL uploaded to.
+            chunk_size (int): Size of the upload parts.
+            checkpoint_dir (Union[str, Path], optional): Folder where checkpoints are kept.
+                Defaults to FUSION_UPLOAD_CHECKPOINT_DIR or ~/.cache/fusion/uploads.
+
+        Returns:
+            UploadCheckpoint: The checkpoint, or None if the source cannot be identified, e.g. an in memory buffer.
+        """
+        fingerprint = _source_fingerprint(source)
+        if fingerprint is None:
+            return None
+        source_id, size, marker = fingerprint
+        folder = Path(checkpoint_dir or os.environ.get("FUSION_UPLOAD_CHECKPOINT_DIR") or DEFAULT_UPLOAD_CHECKPOINT_DIR)
+        key = hashlib.sha256(f"{rpath}|{source_id}".encode()).hexdigest()
+        checkpoint = cls(folder / f"{key}.jsonl", rpath, source_id, size, marker, chunk_size)
+
+        try:
+            with checkpoint.path.open() as f:
+                lines = f.read().splitlines()
+            state = json.loads(lines[0])
+        except (FileNotFoundError, IndexError, json.JSONDecodeError):
+            return checkpoint
+        if (state.get("size"), state.get("marker"), state.get("chunk_size")) != (size, marker, chunk_size):
+            logger.log(VERBOSE_LVL, "Source of %s changed since the last attempt, starting over", rpath)
+            checkpoint.remove()
+            return checkpoint
+
+        checkpoint.operation_id = state["operation_id"]
+        for line in lines[1:]:
+            try:
+                part = json.loads(line)
+            except json.JSONDecodeError:
+                # the line of a part being recorded when the upload was interrupted, it is sent again
+                continue
+            checkpoint.parts[int(part["part_number"])] = {"response": part["response"], "digest": part["digest"]}
+        logger.log(
+            VERBOSE_LVL,
+            "Resuming upload of %s with operation %s, %d parts already uploaded",
+            rpath,
+            checkpoint.operation_id,
+            len(checkpoint.parts),
+        )
+        return checkpoint
+
+    def start(self, operation_id: str) -> None:
+        """Record the operation of a new upload, replacing the journal atomically.
+
+        Args:
+            operation_id (str): The operation id returned by the server.
+        """
+        state = {
+            "rpath": self.rpath,
+            "source": self.source,
+            "size": self.size,
+            "marker": self.marker,
+            "chunk_size": self.chunk_size,
+            "operation_id": operation_id,
+        }
+        with self._lock:
+            self.operation_id = operation_id
+            self.parts = {}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "w") as f:
+                f.write(json.dumps(state) + "\n")
+            Path(tmp_path).replace(self.path)
+
+    def add_part(self, part_number: int, response: Any, digest: str) -> None:
+        """Record a part acknowledged by the server, appending one line to the journal.
+
+        Args:
+            part_number (int): The part number, starting at 1.
+            response (Any): The server response to the part upload, sent again on completion.
+            digest (str): The base64 encoded SHA-256 digest of the part.
+        """
+        line = json.dumps({"part_number": part_number, "response": response, "digest": digest}) + "\n"
+        with self._lock:
+            self.parts[part_number] = {"response": response, "digest": digest}
+            with self.path.open("a") as f:
+                f.write(line)
+
+    def remove(self) -> None:
+        """Delete the checkpoint, e.g. once the upload completed."""
+        with self._lock:
+            self.path.unlink(missing_ok=True)
+            self.operation_id = None
+            self.parts = {}
@@ -0,0 +1,113 @@
+"""Concurrent upload of many files on the event loop and session of the Fusion filesystem."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from .fusion_filesystem import DEFAULT_PART_CONCURRENCY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    import fsspec
+
+    from .fusion_filesystem import FusionHTTPFileSystem
+
+logger = logging.getLogger(__name__)
+VERBOSE_LVL = 25
+
+
+class UploadResult(NamedTuple):
+    """Outcome of the upload of a single file, equal to the (success, path, error) tuples returned so far."""
+
+    success: bool
+    path: str
+    error: str | None
+
+
+async def upload_many(  # noqa: PLR0913
+    fs_fusion: FusionHTTPFileSystem,
+    fs_local: fsspec.AbstractFileSystem | io.BytesIO,
+    files: Iterable[tuple[str, str, str | None]],
+    max_files: int = 10,
+    max_parts: int | None = None,
+    multipart: bool = True,
+    chunk_size: int = 5 * 2**20,
+    part_concurrency: int | None = None,
+    from_date: str | None = None,
+    to_date: str | None = None,
+    additional_headers: dict[str, str] | None = None,
+    on_result: Callable[[UploadResult], Any] | None = None,
+) -> list[UploadResult]:
+    """Upload files concurrently.
+
+    A fixed number of workers pull files from the iterable, so the number of pending tasks does not
+    grow with the number of files. All requests share the session of the Fusion filesystem and
+    local files are opened off the event loop.
+
+    Args:
+        fs_fusion (FusionHTTPFileSystem): Fusion filesystem.
+        fs_local (Union[fsspec.AbstractFileSystem, io.BytesIO]): Local filesystem, or a buffer to upload.
+        files (Iterable[tuple[str, str, str]]): The url, local path and file name of each file to upload.
+        max_files (int, optional): Maximum number of files uploaded at once.
+        max_parts (int, optional): Maximum number of parts uploaded at once across all multipart uploads.
+            Defaults to no global limit.
+        multipart (bool, optional): Upload files larger than chunk_size in parts. Defaults to True.
+        chunk_size (int, optional): Maximum chunk size.
+        part_concurrency (int, optional): Number of parts of each multipart upload sent concurrently.
+        from_date (str, optional): earliest date of data contained in distribution.
+        to_date (str, optional): latest date of data contained in distribution.
+        additional_headers (dict, optional): Additional headers to include in the requests.
+        on_result (Callable, optional): Called with the result of each file once it is uploaded.
+
+    Returns:
+        list[UploadResult]: The result of each file, in the order of files.
+    """
+    loop = asyncio.get_running_loop()
+    part_slots = asyncio.Semaphore(max_parts) if max_parts else None
+    results: dict[int, UploadResult] = {}
+    jobs = enumerate(files)
+
+    async def upload_one(url: str, path: str, file_name: str | None) -> UploadResult:
+        try:
+            if isinstance(fs_local, io.BytesIO):
+                size, source = fs_local.getbuffer().nbytes, fs_local
+            else:
+                # local filesystems may themselves be async filesystems running on this loop
+                size = await loop.run_in_executor(None, fs_local.size, path)
+                source = await loop.run_in_executor(None, fs_local.open, path, "rb")
+            try:
+                await fs_fusion._put_distribution(
+                    source,
+                    url,
+                    chunk_size,
+                    method="put",
+                    multipart=multipart and size > chunk_size,
+                    from_date=from_date,
+                    to_date=to_date,
+                    file_name=file_name,
+                    additional_headers=additional_headers,
+                    part_concurrency=part_concurrency or DEFAULT_PART_CONCURRENCY,
+                    part_slots=part_slots,
+                )
+            finally:
+                if source is not fs_local:
+                    await loop.run_in_executor(None, source.close)
+            return UploadResult(True, path, None)
+        except Exception as ex:  # noqa: BLE001
+            logger.log(VERBOSE_LVL, f"Failed to upload {path}.", exc_info=True)
+            return UploadResult(False, path, str(ex))
+
+    async def worker() -> None:
+        for i, (url, path, file_name) in jobs:
+            results[i] = await upload_one(url, path, file_name)
+            if on_result:
+                on_result(results[i])
+
+    # a buffer is a single file object, its uploads cannot overlap
+    n_workers = 1 if isinstance(fs_local, io.BytesIO) else max(max_files, 1)
+    await asyncio.gather(*(worker() for _ in range(n_workers)))
+    return [results[i] for i in sorted(results)]
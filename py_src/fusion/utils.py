@@ -9,6 +9,10 @@ import multiprocessing as mp
 import os
 import re
 import ssl
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import nullcontext
 from datetime import date, datetime
 from io import BytesIO
@@ -19,6 +23,7 @@ from urllib.parse import urlparse, urlunparse
 import aiohttp
 import certifi
 import fsspec
+import fsspec.asyn
 import joblib
 import pandas as pd
 import pyarrow as pa
@@ -41,10 +46,11 @@ from urllib3.util.retry import Retry
 from .authentication import FusionAiohttpSession, FusionOAuthAdapter
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
+    from collections.abc import Callable, Generator, Iterable
 
     from fusion._fusion import FusionCredentials
 
+    from .fusion_filesystem import FusionHTTPFileSystem
     from .types import PyArrowFilterT
 
 logger = logging.getLogger(__name__)
@@ -54,6 +60,8 @@ DT_YYYYMMDDTHHMM_RE = re.compile(r"(\d{4})(\d{2})(\d{2})T(\d{4})$")
 DT_YYYY_MM_DD_RE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$")
 DEFAULT_CHUNK_SIZE = 2**16
 DEFAULT_THREAD_POOL_SIZE = 5
+DEFAULT_RESOLVER_TTL = 300
+DEFAULT_RESOLVER_WORKERS = 16
 RECOGNIZED_FORMATS = [
     "csv",
     "parquet",
@@ -669,6 +677,147 @@ def get_session(
     return session
 
 
+class DatasetResolver:
+    """Cached, concurrent lookups of the catalogs, datasets and dataset attributes of a Fusion filesystem.
+
+    Lookups that are not cached are sent concurrently, and their results are reused for ttl seconds
+    by every function resolving datasets with the same filesystem.
+    """
+
+    def __init__(
+        self,
+        fs_fusion: fsspec.AbstractFileSystem,
+        ttl: float = DEFAULT_RESOLVER_TTL,
+        max_workers: int = DEFAULT_RESOLVER_WORKERS,
+    ) -> None:
+        """Constructor to instantiate an empty resolver.
+
+        Args:
+            fs_fusion: Fusion filesystem.
+            ttl (float, optional): Number of seconds lookups are cached for.
+            max_workers (int, optional): Maximum number of lookups sent at once.
+        """
+        self.fs_fusion = fs_fusion
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self._cache: dict[tuple[str, str], tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(
+        self, kind: str, keys: Iterable[str], fetch: Callable[[str], Any], refresh: bool = False
+    ) -> dict[str, Any]:
+        now = time.monotonic()
+        keys = set(keys)
+        with self._lock:
+            cached = {} if refresh else {k: self._cache.get((kind, k)) for k in keys}
+        found = {k: v[1] for k, v in cached.items() if v is not None and now - v[0] < self.ttl}
+        missing = sorted(keys - found.keys())
+        if len(missing) == 1:
+            fetched = {missing[0]: fetch(missing[0])}
+        elif missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as executor:
+                fetched = dict(zip(missing, executor.map(fetch, missing)))
+        else:
+            fetched = {}
+        with self._lock:
+            self._cache.update({(kind, k): (now, v) for k, v in fetched.items()})
+        return {**found, **fetched}
+
+    def catalogs(self, refresh: bool = False) -> list[str]:
+        """The catalogs available to the user.
+
+        Args:
+            refresh (bool, optional): Ignore cached lookups. Defaults to False.
+
+        Returns (list): Catalog identifiers.
+
+        """
+        res: list[str] = self._resolve("catalogs", [""], self.fs_fusion.ls, refresh)[""]
+        return res
+
+    def datasets(self, catalogs: Iterable[str], refresh: bool = False) -> dict[str, list[str]]:
+        """The datasets of each catalog.
+
+        Args:
+            catalogs (Iterable[str]): Catalog identifiers.
+            refresh (bool, optional): Ignore cached lookups. Defaults to False.
+
+        Returns (dict): Dataset identifiers by catalog.
+
+        """
+        return self._resolve(
+            "datasets", catalogs, lambda c: [i.split("/")[-1] for i in self.fs_fusion.ls(f"{c}/datasets")], refresh
+        )
+
+    def exists(self, pairs: Iterable[tuple[str, str]]) -> dict[tuple[str, str], bool]:
+        """Check if datasets exist.
+
+        Datasets missing from the cached listings are looked up again, so datasets created since are found.
+
+        Args:
+            pairs (Iterable[tuple[str, str]]): Catalog and dataset identifier pairs.
+
+        Returns (dict): Whether each catalog and dataset pair exists.
+
+        """
+        pairs = set(pairs)
+        res: dict[tuple[str, str], bool] = {}
+        for refresh in (False, True):
+            pending = [p for p in pairs if not res.get(p)]
+            if not pending:
+                break
+            catalogs = self.catalogs(refresh)
+            datasets = self.datasets({c for c, _ in pending if c in catalogs}, refresh)
+            res.update({(c, d): c in catalogs and d in datasets[c] for c, d in pending})
+        return res
+
+    def attributes(self, datasets: Iterable[tuple[str, str]]) -> dict[tuple[str, str], dict[str, Any]]:
+        """The definition of each dataset, e.g. isRawData.
+
+        Args:
+            datasets (Iterable[tuple[str, str]]): Catalog and dataset identifier pairs.
+
+        Returns (dict): Dataset definitions by catalog and dataset identifier pairs.
+
+        """
+        res = self._resolve(
+            "attributes", (f"{c}/datasets/{d}" for c, d in datasets), lambda k: js.loads(self.fs_fusion.cat(k))
+        )
+        return {(k.split("/")[0], k.split("/")[-1]): v for k, v in res.items()}
+
+    def is_raw(self, catalog: str, dataset: str) -> bool:
+        """Check if a dataset is raw.
+
+        Args:
+            catalog (str): Catalog identifier.
+            dataset (str): Dataset identifier.
+
+        Returns (bool): The isRawData attribute of the dataset.
+
+        """
+        return bool(self.attributes([(catalog, dataset)])[(catalog, dataset)]["isRawData"])
+
+
+_resolvers: weakref.WeakKeyDictionary[Any, DatasetResolver] = weakref.WeakKeyDictionary()
+_resolvers_lock = threading.Lock()
+
+
+def dataset_resolver(fs_fusion: fsspec.AbstractFileSystem) -> DatasetResolver:
+    """The resolver shared by all lookups with a Fusion filesystem.
+
+    Args:
+        fs_fusion: Fusion filesystem.
+
+    Returns (DatasetResolver): The resolver of the filesystem.
+
+    """
+    with _resolvers_lock:
+        resolver = _resolvers.get(fs_fusion)
+        if resolver is None:
+            resolver = _resolvers[fs_fusion] = DatasetResolver(fs_fusion)
+    return resolver
+
+
 def validate_file_names(paths: list[str], fs_fusion: fsspec.AbstractFileSystem) -> list[bool]:
     """Validate if the file name format adheres to the standard.
 
@@ -681,23 +830,12 @@ def validate_file_names(paths: list[str], fs_fusion: fsspec.AbstractFileSystem)
     """
     file_names = [i.split("/")[-1].split(".")[0] for i in paths]
     validation = []
-    all_catalogs = fs_fusion.ls("")
-    all_datasets = {}
     file_seg_cnt = 3
-    for i, f_n in enumerate(file_names):
-        tmp = f_n.split("__")
-        if len(tmp) == file_seg_cnt:
-            val = tmp[1] in all_catalogs
-            if not val:
-                validation.append(False)
-            else:
-                if tmp[1] not in all_datasets:
-                    all_datasets[tmp[1]] = [i.split("/")[-1] for i in fs_fusion.ls(f"{tmp[1]}/datasets")]
-
-                val = tmp[0] in all_datasets[tmp[1]]
-                validation.append(val)
-        else:
-            validation.append(False)
+    segments = [f_n.split("__") for f_n in file_names]
+    # all datasets are resolved at once, from listings cached across calls
+    exists = dataset_resolver(fs_fusion).exists([(tmp[1], tmp[0]) for tmp in segments if len(tmp) == file_seg_cnt])
+    for i, tmp in enumerate(segments):
+        validation.append(len(tmp) == file_seg_cnt and exists[(tmp[1], tmp[0])])
         if not validation[-1] and len(tmp) == file_seg_cnt:
             logger.warning(
                 "You might not have access to the catalog %s or dataset %s. "
@@ -725,15 +863,10 @@ def is_dataset_raw(paths: list[str], fs_fusion: fsspec.AbstractFileSystem) -> li
 
     """
     file_names = [i.split("/")[-1].split(".")[0] for i in paths]
-    ret = []
-    is_raw = {}
-    for _i, f_n in enumerate(file_names):
-        tmp = f_n.split("__")
-        if tmp[0] not in is_raw:
-            is_raw[tmp[0]] = js.loads(fs_fusion.cat(f"{tmp[1]}/datasets/{tmp[0]}"))["isRawData"]
-        ret.append(is_raw[tmp[0]])
-
-    return ret
+    datasets = [(tmp[1], tmp[0]) for tmp in (f_n.split("__") for f_n in file_names)]
+    # the definitions of all datasets are fetched at once
+    attributes = dataset_resolver(fs_fusion).attributes(datasets)
+    return [attributes[d]["isRawData"] for d in datasets]
 
 
 def path_to_url(x: str, is_raw: bool = False, is_download: bool = False) -> str:
@@ -752,6 +885,138 @@ def path_to_url(x: str, is_raw: bool = False, is_download: bool = False) -> str:
     return "/".join(distribution_to_url("", dataset, date, ext, catalog, is_download).split("/")[1:])
 
 
+def _remote_digests(fs_fusion: fsspec.AbstractFileSystem, urls: list[str]) -> dict[str, tuple[int, str]]:
+    """Sizes and digests of the published distributions of the datasets of the given urls.
+
+    Args:
+        fs_fusion (fsspec.AbstractFileSystem): Fusion filesystem.
+        urls (list[str]): Distribution urls, e.g. common/datasets/my_dataset/datasetseries/20200101/distributions/csv.
+
+    Returns:
+        dict: The size and base64 encoded digest of each published distribution, by url.
+    """
+    from .listing import _get_fusion_df
+
+    datasets: dict[str, set[str]] = {}
+    for url in urls:
+        parts = url.split("/")
+        datasets.setdefault(parts[0], set()).add(parts[2])
+
+    digests: dict[str, tuple[int, str]] = {}
+    for catalog, catalog_datasets in datasets.items():
+        # the datasets of a catalog are listed in one call, their changes requested concurrently
+        try:
+            fusion_df = _get_fusion_df(fs_fusion, sorted(catalog_datasets), catalog)
+        except (OSError, aiohttp.ClientError):
+            # requests and fsspec raise OSError subclasses for failed calls, aiohttp ClientError
+            logger.warning(
+                f"Could not list the distributions of {len(catalog_datasets)} datasets of {catalog}, "
+                "their files are uploaded",
+                exc_info=True,
+            )
+            continue
+        digests.update(zip(fusion_df["url"], zip(fusion_df["size"], fusion_df["sha256"])))
+    return digests
+
+
+def _unchanged(
+    fs_fusion: fsspec.AbstractFileSystem,
+    fs_local: fsspec.AbstractFileSystem,
+    loop: pd.DataFrame,
+    multipart: bool,
+    chunk_size: int,
+    state_path: str | None = None,
+) -> list[bool]:
+    """Flag the files whose identical content is already published.
+
+    Local files are only hashed when their size matches the published distribution, and their
+    digests are recorded in the state database until they are modified.
+
+    Args:
+        fs_fusion (fsspec.AbstractFileSystem): Fusion filesystem.
+        fs_local (fsspec.AbstractFileSystem): Local filesystem.
+        loop (pd.DataFrame): DataFrame of files to upload, with path and url columns.
+        multipart (bool): Is multipart upload.
+        chunk_size (int): Maximum chunk size.
+        state_path (str, optional): SQLite file the digests of local files are recorded in.
+            Defaults to FUSION_SYNC_STATE or ~/.cache/fusion/fsync_state.db.
+
+    Returns:
+        list[bool]: Whether each file is unchanged.
+    """
+    from .digest import file_digest
+    from .sync_state import SyncStateDB
+
+    remote = _remote_digests(fs_fusion, list(loop["url"]))
+    state_db = SyncStateDB(state_path)
+    try:
+        flags = []
+        for url, path in zip(loop["url"], loop["path"]):
+            published = remote.get(url)
+            if published is None or fs_local.size(path) != published[0]:
+                flags.append(False)
+                continue
+            flags.append(file_digest(fs_local, path, chunk_size, multipart, state_db)[1] == published[1])
+    finally:
+        state_db.close()
+    return flags
+
+
+def _upload_files_async(  # noqa: PLR0913
+    fs_fusion: FusionHTTPFileSystem,
+    fs_local: fsspec.AbstractFileSystem,
+    loop: pd.DataFrame,
+    n_par: int,
+    multipart: bool,
+    chunk_size: int,
+    show_progress: bool,
+    from_date: str | None,
+    to_date: str | None,
+    additional_headers: dict[str, str] | None,
+    part_concurrency: int | None,
+    max_parts: int | None,
+) -> list[tuple[bool, str, str | None]]:
+    """Upload files with the upload scheduler, on the event loop and session of the Fusion filesystem.
+
+    Args:
+        fs_fusion: Fusion filesystem.
+        fs_local: Local filesystem.
+        loop (pd.DataFrame): DataFrame of files to iterate through.
+        n_par (int): Number of files uploaded at once.
+        multipart (bool): Is multipart upload.
+        chunk_size (int): Maximum chunk size.
+        show_progress (bool): Show progress bar
+        from_date (str, optional): earliest date of data contained in distribution.
+        to_date (str, optional): latest date of data contained in distribution.
+        additional_headers (dict, optional): Additional headers to include in the request.
+        part_concurrency (int, optional): Number of parts of a multipart upload sent concurrently.
+        max_parts (int, optional): Maximum number of parts uploaded at once across all files.
+
+    Returns: List of update statuses.
+
+    """
+    from .upload_scheduler import upload_many
+
+    file_names = loop["file_name"] if "file_name" in loop.columns else [None] * len(loop)
+    files = zip(loop["url"], loop["path"], file_names)
+    kwargs: dict[str, Any] = {
+        "max_files": n_par,
+        "max_parts": max_parts,
+        "multipart": multipart,
+        "chunk_size": chunk_size,
+        "part_concurrency": part_concurrency,
+        "from_date": from_date,
+        "to_date": to_date,
+        "additional_headers": additional_headers,
+    }
+    if not show_progress:
+        return list(fsspec.asyn.sync(fs_fusion.loop, upload_many, fs_fusion, fs_local, files, **kwargs))
+    with Progress() as p:
+        task = p.add_task("Uploading", total=len(loop))
+        kwargs["on_result"] = lambda _: p.update(task, advance=1)
+        return list(fsspec.asyn.sync(fs_fusion.loop, upload_many, fs_fusion, fs_local, files, **kwargs))
+
+
 def upload_files(  # noqa: PLR0913
     fs_fusion: fsspec.AbstractFileSystem,
     fs_local: fsspec.AbstractFileSystem,
@@ -764,6 +1029,10 @@ def upload_files(  # noqa: PLR0913
     from_date: str | None = None,
     to_date: str | None = None,
     additional_headers: dict[str, str] | None = None,
+    part_concurrency: int | None = None,
+    skip_unchanged: bool = False,
+    max_parts: int | None = None,
+    state_path: str | None = None,
 ) -> list[tuple[bool, str, str | None]]:
     """Upload file into Fusion.
 
@@ -779,6 +1048,14 @@ def upload_files(  # noqa: PLR0913
         from_date (str, optional): earliest date of data contained in distribution.
         to_date (str, optional): latest date of data contained in distribution.
         additional_headers (dict, optional): Additional headers to include in the request.
+        part_concurrency (int, optional): Number of parts of a multipart upload sent concurrently, when uploading
+            to a Fusion filesystem. Defaults to the filesystem default.
+        skip_unchanged (bool, optional): Skip files whose identical content is already published.
+            Defaults to False.
+        max_parts (int, optional): Maximum number of parts uploaded at once across all files, when uploading
+            to a Fusion filesystem. Defaults to no global limit.
+        state_path (str, optional): With skip_unchanged, SQLite file the digests of local files are recorded in,
+            so unmodified files are not hashed again. Defaults to FUSION_SYNC_STATE or ~/.cache/fusion/fsync_state.db.
 
     Returns: List of update statuses.
 
@@ -786,7 +1063,8 @@ def upload_files(  # noqa: PLR0913
 
     def _upload(p_url: str, path: str, file_name: str | None = None) -> tuple[bool, str, str | None]:
         try:
-            mp = multipart and fs_local.size(path) > chunk_size
+            size = fs_local.getbuffer().nbytes if isinstance(fs_local, BytesIO) else fs_local.size(path)
+            mp = multipart and size > chunk_size
 
             if isinstance(fs_local, BytesIO):
                 fs_fusion.put(
@@ -822,6 +1100,42 @@ def upload_files(  # noqa: PLR0913
             )
             return (False, path, str(ex))
 
+    paths = list(loop["path"])
+    unchanged: list[bool] = []
+    if skip_unchanged and not isinstance(fs_local, BytesIO) and len(loop) > 0:
+        unchanged = _unchanged(fs_fusion, fs_local, loop, multipart, chunk_size, state_path)
+        for path in (p for p, flag in zip(paths, unchanged) if flag):
+            logger.log(VERBOSE_LVL, f"Skipping {path}, it is already published.")
+        loop = loop[[not flag for flag in unchanged]]
+
+    def _in_input_order(res: list[tuple[bool, str, str | None]]) -> list[tuple[bool, str, str | None]]:
+        # the skipped files are reported as uploaded, at their position among the uploaded ones
+        if not unchanged:
+            return res
+        uploaded = iter(res)
+        return [(True, path, None) if flag else next(uploaded) for path, flag in zip(paths, unchanged)]
+
+    from .fusion_filesystem import FusionHTTPFileSystem
+
+    if isinstance(fs_fusion, FusionHTTPFileSystem):
+        return _in_input_order(
+            _upload_files_async(
+                fs_fusion,
+                fs_local,
+                loop,
+                n_par=(n_par if n_par > 0 else cpu_count()) if parallel else 1,
+                multipart=multipart,
+                chunk_size=chunk_size,
+                show_progress=show_progress,
+                from_date=from_date,
+                to_date=to_date,
+                additional_headers=additional_headers,
+                part_concurrency=part_concurrency,
+                max_parts=max_parts,
+            )
+        )
+
+    # other filesystems, e.g. mocks or plain fsspec ones, get one put per file with the original arguments
     if parallel:
         if show_progress:
             with joblib_progress("Uploading", total=len(loop)):
@@ -845,4 +1159,4 @@ def upload_files(  # noqa: PLR0913
         else:
             res = [_upload(row["url"], row["path"], row.get("file_name", None)) for _, row in loop.iterrows()]
 
-    return res  # type: ignore
+    return _in_input_order(res)
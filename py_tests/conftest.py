@@ -39,6 +39,12 @@ def change_dir(destination: PathLike) -> Generator[None, None, None]:
         os.chdir(cwd)
 
 
+@pytest.fixture(autouse=True)
+def _upload_checkpoint_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # multipart uploads keep resume checkpoints, tests never write them to the real home folder
+    monkeypatch.setenv("FUSION_UPLOAD_CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+
+
 @pytest.fixture()
 def example_creds_dict() -> dict[str, Any]:
     return {
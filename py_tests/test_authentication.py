@@ -2,8 +2,10 @@ import json
 import os
 import pickle
 from collections.abc import Generator
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from threading import Thread
 from typing import Any, Optional
 from unittest.mock import MagicMock, Mock, patch
 
@@ -51,6 +53,50 @@ def test_pickle_fusion_credentials(tmp_path: Path) -> None:
     assert creds_loaded.auth_url == "my_auth_url"
 
 
+@pytest.mark.skipif(
+    not hasattr(FusionCredentials, "token_cache_stats"), reason="the extension module predates the token cache"
+)
+def test_token_cache_stats() -> None:
+    token_requests = []
+
+    class TokenHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            token_requests.append(self.path)
+            body = json.dumps({"access_token": "fusion_token", "expires_in": 3600}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), TokenHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        creds = FusionCredentials.from_client_id(
+            client_id="my_client_id",
+            client_secret="my_client_secret",
+            resource="my_resource",
+            auth_url="my_auth_url",
+            proxies={},
+            fusion_e2e=None,
+        )
+        creds.put_bearer_token("bearer_token", 3600)
+        url = f"http://127.0.0.1:{server.server_port}/catalogs/common/datasets/ds1/datasetseries/20200101/distributions/csv"
+
+        assert creds.token_cache_stats() == {"hits": 0, "misses": 0, "refreshes": 0}
+        headers = creds.get_fusion_token_headers(url)
+        assert headers["Fusion-Authorization"] == "Bearer fusion_token"
+        assert creds.token_cache_stats() == {"hits": 0, "misses": 1, "refreshes": 0}
+        creds.get_fusion_token_headers(url)
+        creds.get_fusion_token_headers(url)
+        assert creds.token_cache_stats() == {"hits": 2, "misses": 1, "refreshes": 0}
+        assert token_requests == ["/catalogs/common/datasets/ds1/authorize/token"]
+    finally:
+        server.shutdown()
+
+
 def test_from_file_relative_path_walkup_exists(tmp_path: Path, good_json: str) -> None:
     # Create a temporary credentials file
     dir_down_path = Path(tmp_path / "level_1" / "level_2" / "level_3")
@@ -0,0 +1,134 @@
+from pathlib import Path
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from fusion._fusion import FusionCredentials
+from fusion.block_cache import FusionBlockCache, block_cache_key
+from fusion.fusion_filesystem import FusionHTTPFileSystem
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+
+
+class _Fetcher:
+    def __init__(self) -> None:
+        self.calls: list[tuple[int, int]] = []
+
+    def __call__(self, start: int, end: int) -> bytes:
+        self.calls.append((start, end))
+        return DATA[start:end]
+
+
+def _cache(tmp_path: Path, fetcher: _Fetcher, **kwargs: object) -> FusionBlockCache:
+    return FusionBlockCache(1024, fetcher, len(DATA), cache_dir=tmp_path, **kwargs)  # type: ignore
+
+
+def test_block_cache_persisted_across_instances(tmp_path: Path) -> None:
+    fetcher = _Fetcher()
+    cache = _cache(tmp_path, fetcher, key="url|a", readahead="none")
+    assert cache._fetch(100, 3000) == DATA[100:3000]
+    assert fetcher.calls == [(0, 3072)]
+
+    other = _cache(tmp_path, fetcher, key="url|a", readahead="none")
+    assert other._fetch(1500, 2500) == DATA[1500:2500]
+    assert fetcher.calls == [(0, 3072)]
+    assert other.miss_count == 0
+
+    # a new digest is a new version of the distribution
+    changed = _cache(tmp_path, fetcher, key="url|b", readahead="none")
+    assert changed._fetch(1500, 2500) == DATA[1500:2500]
+    assert fetcher.calls == [(0, 3072), (1024, 3072)]
+
+
+def test_block_cache_coalesces_missing_blocks(tmp_path: Path) -> None:
+    fetcher = _Fetcher()
+    cache = _cache(tmp_path, fetcher, readahead="none")
+    cache._fetch(2048, 3072)
+    assert cache._fetch(0, 5000) == DATA[0:5000]
+    assert fetcher.calls == [(2048, 3072), (0, 2048), (3072, 5120)]
+
+
+def test_block_cache_parquet_footer_first(tmp_path: Path) -> None:
+    fetcher = _Fetcher()
+    cache = _cache(tmp_path, fetcher, key="cat/datasets/ds/datasetseries/20200101/distributions/parquet|a")
+    assert cache.readahead == "parquet"
+    assert cache._fetch(0, 4) == DATA[0:4]
+    assert fetcher.calls == [(0, 1024), (9216, 10240)]
+    assert cache._fetch(len(DATA) - 8, len(DATA)) == DATA[-8:]
+    assert fetcher.calls == [(0, 1024), (9216, 10240)]
+
+
+def test_block_cache_sequential_readahead(tmp_path: Path) -> None:
+    fetcher = _Fetcher()
+    cache = _cache(tmp_path, fetcher, key="cat/datasets/ds/datasetseries/20200101/distributions/csv|a")
+    assert cache.readahead == "sequential"
+    cache._fetch(0, 1024)
+    cache._fetch(1024, 2048)
+    assert fetcher.calls == [(0, 1024), (1024, 4096)]
+
+    # blocks already read ahead are served from disk, only new ones are prefetched
+    assert cache._fetch(2048, 4096) == DATA[2048:4096]
+    assert fetcher.calls == [(0, 1024), (1024, 4096), (4096, 6144)]
+
+    # random access does not trigger readahead
+    cache._fetch(8192, 8200)
+    assert fetcher.calls[-1] == (8192, 9216)
+
+
+def test_block_cache_eviction(tmp_path: Path) -> None:
+    fetcher = _Fetcher()
+    max_size = 4096
+    cache = _cache(tmp_path, fetcher, readahead="none", max_size=max_size)
+    cache._fetch(0, len(DATA))
+    blocks = [p for p in tmp_path.glob("*/*") if p.is_file()]
+    assert sum(p.stat().st_size for p in blocks) <= max_size
+
+
+def test_block_cache_scans_folder_only_when_eviction_is_due(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    scans = []
+    blocks_on_disk = FusionBlockCache._blocks_on_disk
+
+    def _blocks_on_disk(self: FusionBlockCache) -> list[tuple[float, int, Path]]:
+        scans.append(self.cache_dir)
+        return blocks_on_disk(self)
+
+    monkeypatch.setattr(FusionBlockCache, "_blocks_on_disk", _blocks_on_disk)
+    fetcher = _Fetcher()
+    cache = _cache(tmp_path, fetcher, readahead="none", max_size=5000)
+    # the folder is scanned once for its initial size, then kept as a running total
+    for block_number in range(4):
+        cache._fetch(block_number * 1024, block_number * 1024 + 1)
+    assert len(scans) == 1
+    # the fifth block exceeds max_size, the folder is scanned again and evicted to 90% of it
+    cache._fetch(4096, 4097)
+    assert len(scans) == 2  # noqa: PLR2004
+    assert len([p for p in tmp_path.glob("*/*") if p.is_file()]) == 4  # noqa: PLR2004
+
+
+def test_block_cache_bad_readahead(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="Unknown readahead policy"):
+        _cache(tmp_path, _Fetcher(), readahead="random")
+
+
+def test_block_cache_key() -> None:
+    assert block_cache_key("url", {"size": 10, "digest": "abc"}) == "url|abc"
+    assert block_cache_key("url", {"size": 10, "digest": None}) is None
+
+
+@pytest.mark.parametrize("digest", ['"v1"', None])
+def test_open_fusion_disk_needs_digest(
+    digest: Optional[str], credentials_examples: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fs = FusionHTTPFileSystem(credentials=FusionCredentials.from_file(credentials_examples))
+    monkeypatch.setattr(fs, "info", MagicMock(return_value={"size": len(DATA), "digest": digest}))
+    monkeypatch.setattr(fs, "set_session", AsyncMock(return_value=MagicMock()))
+    url = "https://fusion.jpmorgan.com/api/v1/catalogs/cat/datasets/ds/datasetseries/20200101/distributions/csv"
+    f = fs.open(url, cache_type="fusion_disk", cache_options={"cache_dir": tmp_path})
+    if digest:
+        assert isinstance(f.cache, FusionBlockCache)
+        assert f.cache.key == f'{url}|"v1"'
+    else:
+        # blocks of a distribution of unknown version are never persisted
+        assert not isinstance(f.cache, FusionBlockCache)
+        assert f.cache.name == "blockcache"
@@ -0,0 +1,78 @@
+import base64
+import hashlib
+import io
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import fsspec
+import pytest
+
+import fusion.digest
+from fusion.digest import b64, file_chunk_digests, file_digest, fusion_digest, hash_chunks, iter_chunks
+from fusion.fs_sync import _generate_sha256_token
+from fusion.fusion_filesystem import FusionHTTPFileSystem
+from fusion.sync_state import SyncStateDB, state_key
+
+
+def _sequential_digest(data: bytes, chunk_size: int) -> str:
+    hash_sha256 = hashlib.sha256()
+    chunks = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
+    for chunk in chunks:
+        hash_sha256.update(hashlib.sha256(chunk).digest())
+    if len(chunks) > 1:
+        return base64.b64encode(hash_sha256.digest()).decode()
+    return base64.b64encode(hashlib.sha256(chunks[0]).digest()).decode()
+
+
+def test_hash_chunks_ordered() -> None:
+    chunks = [bytes([i]) * (1000 + i) for i in range(50)]
+    res = list(hash_chunks(iter(chunks), max_pending=3))
+    assert [c for c, _ in res] == chunks
+    assert [d for _, d in res] == [hashlib.sha256(c).digest() for c in chunks]
+
+
+@pytest.mark.parametrize("size", [10, 100, 1001])
+def test_fusion_digest_format(size: int) -> None:
+    data = bytes(range(256)) * 4
+    data = data[:size]
+    digests = file_chunk_digests(io.BytesIO(data), chunk_size=100)
+    assert b64(fusion_digest(digests)) == _sequential_digest(data, 100)
+
+
+def test_fusion_digest_empty() -> None:
+    assert fusion_digest([]) == hashlib.sha256().digest()
+    assert list(iter_chunks(io.BytesIO(b""), 10)) == []
+
+
+def test_generate_sha256_token(tmp_path: Path) -> None:
+    data = b"0123456789" * 25
+    path = tmp_path / "file.csv"
+    path.write_bytes(data)
+    assert _generate_sha256_token(str(path), fsspec.filesystem("file"), chunk_size=100) == _sequential_digest(data, 100)
+
+
+def test_file_digest_reuses_recorded_digests(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fs = fsspec.filesystem("file")
+    data = b"0123456789" * 25
+    path = str(tmp_path / "file.csv")
+    Path(path).write_bytes(data)
+    state_db = SyncStateDB(tmp_path / "state.db")
+
+    assert file_digest(fs, path, chunk_size=100, state_db=state_db) == (len(data), _sequential_digest(data, 100))
+    assert file_digest(fs, path, chunk_size=10**6, state_db=state_db) == (len(data), _sequential_digest(data, 10**6))
+    monkeypatch.setattr(fusion.digest, "file_chunk_digests", MagicMock(side_effect=AssertionError("rehashed")))
+    monkeypatch.setattr(fusion.digest, "stream_digest", MagicMock(side_effect=AssertionError("rehashed")))
+    assert file_digest(fs, path, chunk_size=100, state_db=state_db)[1] == _sequential_digest(data, 100)
+    # the digest of a single chunk file is the one fsync records for it
+    assert state_db.get_many([state_key(fs, path)])[state_key(fs, path)].digest == _sequential_digest(data, 10**6)
+    state_db.close()
+
+
+def test_construct_headers() -> None:
+    data = b"0123456789" * 25
+    headers, chunk_headers = FusionHTTPFileSystem._construct_headers(
+        io.BytesIO(data), "2020-01-01", "2020-01-02", "2020-01-03", chunk_size=100, multipart=True
+    )
+    chunk_digests = [hashlib.sha256(data[i : i + 100]).digest() for i in range(0, len(data), 100)]
+    assert [h["Digest"] for h in chunk_headers] == ["SHA-256=" + b64(d) for d in chunk_digests]
+    assert headers["Digest"] == "SHA-256=" + _sequential_digest(data, 100)
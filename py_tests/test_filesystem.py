@@ -1,5 +1,9 @@
+import asyncio
+import base64
+import hashlib
 import io
 import json
+import os
 from pathlib import Path
 from typing import Any, Literal, Optional
 from unittest import mock
@@ -10,7 +14,8 @@ import pytest
 from aiohttp import ClientResponse
 
 from fusion._fusion import FusionCredentials
-from fusion.fusion_filesystem import FusionHTTPFileSystem
+from fusion.fusion_filesystem import FusionHTTPFileSystem, _coalesce_ranges
+from fusion.upload_checkpoint import UploadCheckpoint
 
 
 @pytest.fixture()
@@ -98,6 +103,349 @@ async def test_decorate_url_with_http_async(http_fs_instance: FusionHTTPFileSyst
     assert result == exp_res
 
 
+def test_coalesce_ranges() -> None:
+    ranges = [("a", 100, 200), ("b", 0, 10), ("a", 0, 50), ("a", 60, 70), ("a", 120, 150), ("a", 1000, 1010)]
+    assert _coalesce_ranges(ranges, max_gap=10, max_block=None) == [
+        ("a", 0, 70),
+        ("a", 100, 200),
+        ("a", 1000, 1010),
+        ("b", 0, 10),
+    ]
+    assert _coalesce_ranges(ranges, max_gap=1000, max_block=100) == [
+        ("a", 0, 70),
+        ("a", 100, 200),
+        ("a", 1000, 1010),
+        ("b", 0, 10),
+    ]
+    assert _coalesce_ranges(ranges, max_gap=1000, max_block=None) == [("a", 0, 1010), ("b", 0, 10)]
+
+
+@pytest.mark.asyncio()
+async def test_cat_ranges(http_fs_instance: FusionHTTPFileSystem) -> None:
+    data = bytes(range(256)) * 4
+    calls = []
+
+    async def _cat_range(url: str, start: int, end: int) -> bytes:
+        calls.append((url, start, end))
+        return data[start:end]
+
+    http_fs_instance._cat_range = _cat_range  # type: ignore
+    http_fs_instance._ls_real = AsyncMock(return_value=[{"size": len(data)}])  # type: ignore
+    path = "http://example.com/distributions/parquet"
+    res = await http_fs_instance._cat_ranges(
+        [path] * 5, [500, 0, 10, -4, 700], [510, 4, 20, None, 700], max_gap=16, batch_size=2
+    )
+    assert res == [data[500:510], data[0:4], data[10:20], data[-4:], b""]
+    assert sorted(calls) == [(path, 0, 20), (path, 500, 510), (path, len(data) - 4, len(data))]
+
+
+@pytest.mark.asyncio()
+async def test_cat_ranges_sizes_concurrent(http_fs_instance: FusionHTTPFileSystem) -> None:
+    state = {"now": 0, "max": 0}
+    sized = []
+
+    async def _size(url: str) -> int:
+        sized.append(url)
+        state["now"] += 1
+        state["max"] = max(state["max"], state["now"])
+        await asyncio.sleep(0.01)
+        state["now"] -= 1
+        return 100
+
+    async def _cat_range(url: str, start: int, end: int) -> bytes:  # noqa: ARG001
+        return b"x" * (end - start)
+
+    http_fs_instance._size = _size  # type: ignore
+    http_fs_instance._cat_range = _cat_range  # type: ignore
+    paths = [f"http://example.com/{i}/distributions/parquet" for i in range(6)]
+    # the sizes of the files read from their end are requested concurrently, once per file
+    res = await http_fs_instance._cat_ranges(paths * 2, -8, None, batch_size=3)
+    assert res == [b"x" * 8] * 12
+    assert sorted(sized) == sorted(paths)
+    assert state["max"] == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio()
+async def test_cat_ranges_error(http_fs_instance: FusionHTTPFileSystem) -> None:
+    async def _cat_range(url: str, start: int, end: int) -> bytes:  # noqa: ARG001
+        if start > 0:
+            raise FileNotFoundError(url)
+        return b"data"
+
+    http_fs_instance._cat_range = _cat_range  # type: ignore
+    path = "http://example.com/distributions/parquet"
+    res = await http_fs_instance._cat_ranges([path, path], [0, 100], [4, 104], max_gap=0)
+    assert res[0] == b"data"
+    assert isinstance(res[1], FileNotFoundError)
+    with pytest.raises(FileNotFoundError):
+        await http_fs_instance._cat_ranges([path, path], [0, 100], [4, 104], max_gap=0, on_error="raise")
+
+
+class _CountingBytesIO(io.BytesIO):
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        out = super().read(size)
+        self.bytes_read += len(out)
+        return out
+
+
+def _upload_session() -> MagicMock:
+    def _response(json_value: Any) -> AsyncMock:
+        resp = AsyncMock()
+        resp.status = 200
+        resp.json = AsyncMock(return_value=json_value)
+        resp.__aenter__.return_value = resp
+        return resp
+
+    session = MagicMock()
+    session.post.side_effect = lambda url, **_: _response({"operationId": "op_id"} if "operationType" in url else {})
+    session.put.side_effect = lambda url, **_: _response({"partNumber": url.split("partNumber=")[-1]})
+    return session
+
+
+def test_put_multipart_single_pass(http_fs_instance: FusionHTTPFileSystem) -> None:
+    chunk_size = 10
+    data = b"0123456789" * 2 + b"01234"
+    session = _upload_session()
+    http_fs_instance.set_session = AsyncMock(return_value=session)  # type: ignore
+    lpath = _CountingBytesIO(data)
+    http_fs_instance.put(lpath, "http://example.com/distributions/csv", chunk_size=chunk_size, multipart=True)  # type: ignore
+
+    assert lpath.bytes_read == len(data)
+    chunk_digests = [hashlib.sha256(data[i : i + chunk_size]).digest() for i in range(0, len(data), chunk_size)]
+    part_headers = [c.kwargs["headers"]["Digest"] for c in session.put.call_args_list]
+    assert part_headers == ["SHA-256=" + base64.b64encode(d).decode() for d in chunk_digests]
+
+    url, kwargs = session.post.call_args_list[-1].kwargs["url"], session.post.call_args_list[-1].kwargs
+    assert url.endswith("operations/upload?operationId=op_id")
+    assert kwargs["json"] == {"parts": [{"partNumber": "1"}, {"partNumber": "2"}, {"partNumber": "3"}]}
+    expected = hashlib.sha256(b"".join(chunk_digests)).digest()
+    assert kwargs["headers"]["Digest"] == "SHA-256=" + base64.b64encode(expected).decode()
+
+
+def test_put_streaming_body(http_fs_instance: FusionHTTPFileSystem) -> None:
+    data = b"0123456789"
+    session = _upload_session()
+    http_fs_instance.set_session = AsyncMock(return_value=session)  # type: ignore
+    lpath = io.BytesIO(data)
+    lpath.seek(5)
+    with patch("fusion.fusion_filesystem.DEFAULT_CHUNK_SIZE", 4):
+        http_fs_instance.put(lpath, "http://example.com/distributions/csv", multipart=False)  # type: ignore
+
+    kwargs = session.put.call_args.kwargs
+    assert kwargs["headers"]["Digest"] == "SHA-256=" + base64.b64encode(hashlib.sha256(data).digest()).decode()
+    assert kwargs["headers"]["Content-Length"] == str(len(data))
+
+    async def _consume() -> list[bytes]:
+        return [chunk async for chunk in kwargs["data"]]
+
+    # the body is sent chunk by chunk rather than read into memory
+    assert asyncio.run(_consume()) == [b"0123", b"4567", b"89"]
+
+
+def test_put_multipart_concurrent_parts(http_fs_instance: FusionHTTPFileSystem) -> None:
+    chunk_size = 10
+    n_parts = 8
+    part_concurrency = 3
+    state = {"in_flight": 0, "max_in_flight": 0, "failures": 0}
+    session = _upload_session()
+    real_sleep = asyncio.sleep
+
+    class _SlowResponse:
+        def __init__(self, url: str) -> None:
+            self.url = url
+            self.status = 200
+
+        async def __aenter__(self) -> "_SlowResponse":
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            await real_sleep(0.01)
+            state["in_flight"] -= 1
+            if self.url.endswith("partNumber=2") and state["failures"] == 0:
+                state["failures"] += 1
+                self.status = 500
+            return self
+
+        async def __aexit__(self, *args: object) -> None:
+            pass
+
+        def raise_for_status(self) -> None:
+            if self.status != 200:  # noqa: PLR2004
+                raise RuntimeError("server error")
+
+        async def text(self) -> str:
+            return ""
+
+        async def json(self) -> dict[str, str]:
+            return {"partNumber": self.url.split("partNumber=")[-1]}
+
+    session.put.side_effect = lambda url, **_: _SlowResponse(url)
+    http_fs_instance.set_session = AsyncMock(return_value=session)  # type: ignore
+    # the retry backoff is skipped
+    with patch("asyncio.sleep", new=AsyncMock()):
+        http_fs_instance.put(
+            io.BytesIO(b"0123456789" * n_parts),  # type: ignore
+            "http://example.com/distributions/csv",
+            chunk_size=chunk_size,
+            multipart=True,
+            part_concurrency=part_concurrency,
+        )
+
+    assert 1 < state["max_in_flight"] <= part_concurrency
+    assert state["failures"] == 1
+    parts = session.post.call_args_list[-1].kwargs["json"]["parts"]
+    assert parts == [{"partNumber": str(i + 1)} for i in range(n_parts)]
+
+
+def test_put_multipart_resume(http_fs_instance: FusionHTTPFileSystem, tmp_path: Path) -> None:
+    chunk_size = 10
+    n_parts = 5
+    lpath = tmp_path / "file.csv"
+    lpath.write_bytes(b"0123456789" * n_parts)
+    rpath = "http://example.com/distributions/csv"
+    fs_local = fsspec.filesystem("file")
+    checkpoint_dir = Path(os.environ["FUSION_UPLOAD_CHECKPOINT_DIR"])
+
+    session = _upload_session()
+    put_part = session.put.side_effect
+
+    def _failing_put(url: str, **kwargs: Any) -> Any:
+        if url.endswith("partNumber=4"):
+            raise RuntimeError("connection reset")
+        return put_part(url, **kwargs)
+
+    session.put.side_effect = _failing_put
+    http_fs_instance.set_session = AsyncMock(return_value=session)  # type: ignore
+    with patch("asyncio.sleep", new=AsyncMock()), fs_local.open(str(lpath), "rb") as f, pytest.raises(RuntimeError):
+        http_fs_instance.put(f, rpath, chunk_size=chunk_size, multipart=True, part_concurrency=1)
+    (checkpoint,) = checkpoint_dir.glob("*.jsonl")
+    # the operation and each acknowledged part take one line of the journal
+    assert len(checkpoint.read_text().splitlines()) == 1 + 3
+
+    session.put.reset_mock()
+    session.post.reset_mock()
+    session.put.side_effect = put_part
+    with fs_local.open(str(lpath), "rb") as f:
+        http_fs_instance.put(f, rpath, chunk_size=chunk_size, multipart=True, part_concurrency=1)
+
+    # the operation is resumed and only the missing parts are sent
+    assert [c.kwargs["url"].split("partNumber=")[-1] for c in session.put.call_args_list] == ["4", "5"]
+    completion = session.post.call_args.kwargs
+    assert completion["url"].endswith("operationId=op_id")
+    assert completion["json"] == {"parts": [{"partNumber": str(i + 1)} for i in range(n_parts)]}
+    chunk_digests = [hashlib.sha256(b"0123456789").digest()] * n_parts
+    expected = hashlib.sha256(b"".join(chunk_digests)).digest()
+    assert completion["headers"]["Digest"] == "SHA-256=" + base64.b64encode(expected).decode()
+    assert not list(checkpoint_dir.glob("*.jsonl"))
+
+
+def test_put_multipart_resume_expired_operation(http_fs_instance: FusionHTTPFileSystem, tmp_path: Path) -> None:
+    chunk_size = 10
+    n_parts = 3
+    lpath = tmp_path / "file.csv"
+    lpath.write_bytes(b"0123456789" * n_parts)
+    rpath = "http://example.com/distributions/csv"
+    checkpoint = UploadCheckpoint.for_upload(str(lpath), rpath, chunk_size)
+    assert checkpoint is not None
+    checkpoint.start("op_expired")
+    checkpoint.add_part(1, {"partNumber": "1"}, base64.b64encode(hashlib.sha256(b"0123456789").digest()).decode())
+
+    session = _upload_session()
+    post = session.post.side_effect
+
+    def _expired_post(url: str, **kwargs: Any) -> Any:
+        resp = post(url, **kwargs)
+        if url.endswith("operationId=op_expired"):
+            resp.status = 410
+            resp.raise_for_status = MagicMock(side_effect=RuntimeError("410 Gone"))
+        return resp
+
+    session.post.side_effect = _expired_post
+    http_fs_instance.set_session = AsyncMock(return_value=session)  # type: ignore
+    http_fs_instance.put(str(lpath), rpath, chunk_size=chunk_size, multipart=True, part_concurrency=1)
+
+    # the expired operation is dropped and the whole file is sent with a new operation
+    urls = [c.kwargs.get("url", c.args[0] if c.args else "") for c in session.post.call_args_list]
+    assert urls[0].endswith("operationId=op_expired")
+    assert urls[1].endswith("operationType/upload")
+    assert urls[2].endswith("operationId=op_id")
+    assert [c.kwargs["url"].split("partNumber=")[-1] for c in session.put.call_args_list] == ["2", "3", "1", "2", "3"]
+    assert session.post.call_args.kwargs["json"] == {"parts": [{"partNumber": str(i + 1)} for i in range(n_parts)]}
+    assert not checkpoint.path.exists()
+
+
+def test_put_multipart_part_retries(http_fs_instance: FusionHTTPFileSystem) -> None:
+    session = _upload_session()
+    session.put.side_effect = RuntimeError("connection reset")
+    http_fs_instance.set_session = AsyncMock(return_value=session)  # type: ignore
+    rpath = "http://example.com/distributions/csv"
+
+    with pytest.raises(ValueError, match="part_retries must be at least 1"):
+        http_fs_instance.put(io.BytesIO(b"0123456789"), rpath, chunk_size=10, multipart=True, part_retries=0)  # type: ignore
+    session.put.assert_not_called()
+
+    # the error of the last attempt fails the upload instead of leaving the part out
+    with patch("asyncio.sleep", new=AsyncMock()), pytest.raises(RuntimeError, match="connection reset"):
+        http_fs_instance.put(io.BytesIO(b"0123456789"), rpath, chunk_size=10, multipart=True, part_retries=2)  # type: ignore
+    assert session.put.call_count == 2  # noqa: PLR2004
+    assert not any(c.kwargs.get("json") for c in session.post.call_args_list)
+
+
+def test_cloud_copy_reads_ahead(http_fs_instance: FusionHTTPFileSystem) -> None:
+    chunk_size = 10
+    n_parts = 6
+    state = {"reads": 0, "reads_during_first_part": 0}
+    loop = http_fs_instance.loop
+
+    class S3File(io.BytesIO):
+        def read(self, size: Optional[int] = -1) -> bytes:
+            # like s3fs, reads block on requests sent on the shared fsspec loop
+            fsspec.asyn.sync(loop, asyncio.sleep, 0)
+            state["reads"] += 1
+            return super().read(size)
+
+    class _SlowResponse:
+        def __init__(self, url: str) -> None:
+            self.url = url
+            self.status = 200
+
+        async def __aenter__(self) -> "_SlowResponse":
+            await asyncio.sleep(0.05)
+            if self.url.endswith("partNumber=1"):
+                state["reads_during_first_part"] = state["reads"]
+            return self
+
+        async def __aexit__(self, *args: object) -> None:
+            pass
+
+        def raise_for_status(self) -> None:
+            pass
+
+        async def text(self) -> str:
+            return ""
+
+        async def json(self) -> dict[str, str]:
+            return {"partNumber": self.url.split("partNumber=")[-1]}
+
+    session = _upload_session()
+    session.put.side_effect = lambda url, **_: _SlowResponse(url)
+    http_fs_instance.set_session = AsyncMock(return_value=session)  # type: ignore
+    data = b"0123456789" * n_parts
+    lpath = S3File(data)
+    lpath.seek(7)
+    http_fs_instance.put(lpath, "http://example.com/distributions/csv", chunk_size=chunk_size, part_concurrency=1)  # type: ignore
+
+    # the next chunks were read from the source while the first part was uploaded
+    assert state["reads_during_first_part"] > 1
+    completion = session.post.call_args.kwargs
+    assert completion["json"] == {"parts": [{"partNumber": str(i + 1)} for i in range(n_parts)]}
+    expected = hashlib.sha256(b"".join([hashlib.sha256(b"0123456789").digest()] * n_parts)).digest()
+    assert completion["headers"]["Digest"] == "SHA-256=" + base64.b64encode(expected).decode()
+
+
 @pytest.mark.asyncio()
 async def test_isdir_true(http_fs_instance: FusionHTTPFileSystem) -> None:
     http_fs_instance._decorate_url = AsyncMock(return_value="decorated_path_dir")  # type: ignore
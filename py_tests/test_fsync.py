@@ -1,4 +1,30 @@
-from fusion.fs_sync import _url_to_path
+import asyncio
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import fsspec
+import pandas as pd
+import pytest
+
+import fusion.fs_sync
+from fusion._fusion import FusionCredentials
+from fusion.fs_sync import (
+    _Backoff,
+    _DatasetEvents,
+    _get_fusion_df,
+    _get_local_state,
+    _idle,
+    _LocalChanges,
+    _synchronize,
+    _url_to_path,
+    fsync,
+)
+from fusion.fusion_filesystem import FusionHTTPFileSystem
+from fusion.sync_state import SyncStateDB
 
 
 def test__url_to_path() -> None:
@@ -13,3 +39,394 @@ def test__url_to_path() -> None:
     path = _url_to_path(url)
     exp_res = f"{catalog}/my_dataset/{dt_str}//{dataset}__{catalog}__{dt_str}.csv"
     assert path == exp_res
+
+
+def test_dataset_events(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def _listen(_: Any) -> None:
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(_DatasetEvents, "_listen", _listen)
+    fs_fusion = MagicMock(client_kwargs={"root_url": "https://fusion/api/v1/"})
+    events = _DatasetEvents(fs_fusion, "common", ["ds1", "ds2", "ds3"])
+    assert events.url == "https://fusion/api/v1/catalogs/common/notifications/subscribe"
+    assert not events.has_changes()
+
+    events._on_message(json.dumps({"type": "HeartBeatNotification"}))
+    assert not events.has_changes()
+    events._on_message(json.dumps({"type": "ResourceUpdate", "datasetIdentifier": "ds1"}), "1")
+    events._on_message(json.dumps([{"resource": "catalogs/common/datasets/ds2/datasetseries/20200101"}]), "2")
+    events._on_message(json.dumps({"datasetIdentifier": "other"}))
+    assert events.has_changes()
+    assert events.pop() == {"ds1", "ds2"}
+    assert events.last_event_id == "2"
+    assert events.pop() == set()
+
+    # notifications naming no dataset may concern any of them
+    events._on_message(json.dumps({"type": "CatalogUpdate"}))
+    assert events.pop() == {"ds1", "ds2", "ds3"}
+    events.close()
+
+
+def test_fsync_with_events(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    versions = {"ds1": 0, "ds2": 0}
+    queried: list[list[str]] = []
+
+    def _get_fusion_df(_fs: Any, datasets: list[str], catalog: str, *_: Any) -> pd.DataFrame:
+        queried.append(datasets)
+        urls = [f"{catalog}/datasets/{d}/datasetseries/20200101/distributions/csv" for d in datasets]
+        return pd.DataFrame({"url": urls, "sha256": [str(versions[d]) for d in datasets]})
+
+    class _Events:
+        def __init__(self, *_: Any, **__: Any) -> None:
+            self.changes = [set(), {"ds1"}, set()]
+
+        def pop(self) -> set[str]:
+            changed = self.changes.pop(0)
+            for dataset in changed:
+                versions[dataset] += 1
+            return changed
+
+        def has_changes(self) -> bool:
+            if not self.changes:
+                raise KeyboardInterrupt
+            return True
+
+        def close(self) -> None:
+            pass
+
+    synchronize = MagicMock(return_value=[])
+    monkeypatch.setattr(fusion.fs_sync, "_DatasetEvents", _Events)
+    monkeypatch.setattr(fusion.fs_sync, "_get_fusion_df", _get_fusion_df)
+    monkeypatch.setattr(fusion.fs_sync, "_get_local_state", MagicMock(return_value=pd.DataFrame()))
+    monkeypatch.setattr(fusion.fs_sync, "_synchronize", synchronize)
+    monkeypatch.setattr("builtins.input", lambda _: "exit")
+
+    fsync(
+        MagicMock(),
+        MagicMock(),
+        datasets=["ds1", "ds2"],
+        log_path=str(tmp_path),
+        use_events=True,
+        state_path=str(tmp_path / "state.db"),
+    )
+
+    # all datasets are queried once, then only the dataset named in the notification
+    assert queried == [["ds1", "ds2"], ["ds1"]]
+    assert synchronize.call_count == 2  # noqa: PLR2004
+    assert list(synchronize.call_args[0][3]["sha256"]) == ["1", "0"]
+
+
+def test_get_local_state_reuses_stored_digests(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    fs_local = fsspec.filesystem("file")
+    fs_fusion = MagicMock()
+    fs_fusion.ls.side_effect = lambda path: {"": ["common"], "common/datasets": ["ds1"]}.get(path, [])
+    fs_fusion.cat.return_value = b'{"isRawData": false}'
+    local_dir = tmp_path / "common" / "ds1"
+    local_dir.mkdir(parents=True)
+    for i in range(3):
+        (local_dir / f"ds1__common__2020010{i}.csv").write_text(f"a,b\n{i},{i}\n")
+
+    hashed = MagicMock(side_effect=fusion.fs_sync._generate_sha256_token)
+    monkeypatch.setattr(fusion.fs_sync, "_generate_sha256_token", hashed)
+    local_path = f"{tmp_path}/"
+    state = SyncStateDB(tmp_path / "state.db")
+    first = _get_local_state(fs_local, fs_fusion, ["ds1"], "common", local_path=local_path, state_db=state)
+    state.close()
+    assert hashed.call_count == 3  # noqa: PLR2004
+
+    # after a restart, only the modified file is hashed again
+    (local_dir / "ds1__common__20200101.csv").write_text("a,b\n10,10\n")
+    state = SyncStateDB(tmp_path / "state.db")
+    second = _get_local_state(fs_local, fs_fusion, ["ds1"], "common", local_path=local_path, state_db=state)
+    state.close()
+    assert hashed.call_count == 4  # noqa: PLR2004
+    assert list(first["sha256"] != second["sha256"]) == [False, True, False]
+
+
+def test_get_local_state_with_changed_paths(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    fs_local = fsspec.filesystem("file")
+    fs_fusion = MagicMock()
+    fs_fusion.ls.side_effect = lambda path: {"": ["common"], "common/datasets": ["ds1"]}.get(path, [])
+    fs_fusion.cat.return_value = b'{"isRawData": false}'
+    local_dir = tmp_path / "common" / "ds1"
+    local_dir.mkdir(parents=True)
+    files = [local_dir / f"ds1__common__2020010{i}.csv" for i in range(3)]
+    for file in files:
+        file.write_text("a,b\n1,1\n")
+    local_path = f"{tmp_path}/"
+    state = SyncStateDB(tmp_path / "state.db")
+    full = _get_local_state(fs_local, fs_fusion, ["ds1"], "common", local_path=local_path, state_db=state)
+
+    monkeypatch.setattr(fs_local, "find", MagicMock(side_effect=AssertionError("the tree is listed")))
+    files[0].unlink()
+    files[1].write_text("a,b\n22,22\n")
+    new_file = local_dir / "ds1__common__20200105.csv"
+    new_file.write_text("a,b\n5,5\n")
+    changed = {str(files[0]), str(files[1]), str(new_file)}
+    res = _get_local_state(
+        fs_local, fs_fusion, ["ds1"], "common", local_state=full, local_path=local_path, state_db=state, changed=changed
+    )
+    state.close()
+
+    assert list(res["local_path"]) == [str(files[1]), str(files[2]), str(new_file)]
+    assert res["sha256"][1] == full["sha256"][2]
+    assert res["sha256"][0] != full["sha256"][1]
+    assert res.equals(res.sort_values("url").reset_index(drop=True))
+
+
+def test_local_changes(tmp_path: Path) -> None:
+    pytest.importorskip("watchdog")
+    changes = _LocalChanges([str(tmp_path)])
+    try:
+        assert not changes.has_changes()
+        (tmp_path / "a.csv").write_text("a")
+        (tmp_path / "b").mkdir()
+        deadline = time.monotonic() + 5
+        while not changes.has_changes() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.2)
+        # a new directory may hold files that were never reported
+        assert changes.pop() is None
+        (tmp_path / "a.csv").write_text("b")
+        deadline = time.monotonic() + 5
+        while not changes.has_changes() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert changes.pop() == {str(tmp_path / "a.csv")}
+    finally:
+        changes.close()
+
+
+def test_get_fusion_df_concurrent_changes(credentials_examples: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fs_fusion = FusionHTTPFileSystem(credentials=FusionCredentials.from_file(credentials_examples))
+    state = {"now": 0, "max": 0}
+    requested = []
+
+    async def _changes(url: str) -> dict[str, Any]:
+        requested.append(url)
+        state["now"] += 1
+        state["max"] = max(state["max"], state["now"])
+        await asyncio.sleep(0.01)
+        state["now"] -= 1
+        dataset = url.split("=")[-1]
+        if dataset == "ds0":
+            return {"datasets": []}
+        key = f"{dataset}.20200101.distribution.csv"
+        return {"datasets": [{"distributions": [{"key": key, "values": ["", "10", "SHA-256=" + "A" * 44]}]}]}
+
+    monkeypatch.setattr(fs_fusion, "_changes", _changes)
+    datasets = [f"ds{i}" for i in range(20)]
+    res = _get_fusion_df(fs_fusion, datasets, "common", max_concurrency=4)
+
+    assert sorted(requested) == sorted(f"common/datasets/changes?datasets={d}" for d in datasets)
+    assert state["max"] == 4  # noqa: PLR2004
+    # the listing is sorted by url
+    assert list(res["url"]) == sorted(
+        f"common/datasets/{d}/datasetseries/20200101/distributions/csv" for d in datasets[1:]
+    )
+    assert list(res["path"])[0] == "common/ds1/20200101//ds1__common__20200101.csv"
+    assert list(res["size"].unique()) == [10]
+
+
+def test_get_fusion_df_catalog_changes(credentials_examples: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fs_fusion = FusionHTTPFileSystem(credentials=FusionCredentials.from_file(credentials_examples))
+    requested = []
+
+    def _entry(dataset: str, digest: str) -> dict[str, Any]:
+        key = f"{dataset}.20200101.distribution.csv"
+        return {"identifier": dataset, "distributions": [{"key": key, "values": ["", "10", "SHA-256=" + digest * 44]}]}
+
+    async def _changes(url: str) -> dict[str, Any]:
+        requested.append(url)
+        # the latest change of a dataset comes first
+        return {"datasets": [_entry(f"ds{i}", "A") for i in range(100)] + [_entry("ds0", "B")]}
+
+    monkeypatch.setattr(fs_fusion, "_changes", _changes)
+
+    # without a dataset filter, the changes of the catalog are requested once
+    res = _get_fusion_df(fs_fusion, None, "common")
+    assert requested == ["common/datasets/changes"]
+    assert len(res) == 100  # noqa: PLR2004
+    assert set(res["sha256"]) == {"A" * 44}
+
+    # and so are the changes of more datasets than the threshold, keeping only those datasets
+    requested.clear()
+    datasets = [f"ds{i}" for i in range(0, 100, 2)]
+    res = _get_fusion_df(fs_fusion, datasets, "common", catalog_changes_threshold=10)
+    assert requested == ["common/datasets/changes"]
+    assert list(res["url"]) == sorted(f"common/datasets/{d}/datasetseries/20200101/distributions/csv" for d in datasets)
+
+
+def test_backoff() -> None:
+    backoff = _Backoff(1, 5, jitter=0)
+    assert [backoff.next_delay() for _ in range(5)] == [1, 2, 4, 5, 5]
+    backoff.reset()
+    assert backoff.next_delay() == 1
+    jittered = _Backoff(10, 10, jitter=0.1)
+    assert all(9 <= jittered.next_delay() <= 11 for _ in range(100))  # noqa: PLR2004
+
+
+def test_fsync_probes_before_polling(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    fingerprints = iter(["a", "a", "a", "b", "b"])
+    sleeps: list[float] = []
+    get_fusion_df = MagicMock(return_value=pd.DataFrame({"url": ["u"], "sha256": ["s"]}))
+
+    def _sleep(delay: float) -> None:
+        sleeps.append(delay)
+        if len(sleeps) == 4:  # noqa: PLR2004
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(fusion.fs_sync, "_probe", lambda *_: next(fingerprints))
+    monkeypatch.setattr(fusion.fs_sync, "_get_fusion_df", get_fusion_df)
+    monkeypatch.setattr(fusion.fs_sync, "_get_local_state", MagicMock(return_value=pd.DataFrame()))
+    monkeypatch.setattr(fusion.fs_sync, "_synchronize", MagicMock(return_value=[]))
+    monkeypatch.setattr(fusion.fs_sync.time, "sleep", _sleep)
+    monkeypatch.setattr(fusion.fs_sync.random, "random", lambda: 0.5)
+    monkeypatch.setattr("builtins.input", lambda _: "exit")
+
+    fsync(
+        MagicMock(),
+        MagicMock(),
+        datasets=["ds1"],
+        log_path=str(tmp_path),
+        state_path=str(tmp_path / "state.db"),
+        poll_interval=1,
+        max_poll_interval=4,
+    )
+
+    # the state is collected on the first loop and once the fingerprint changed
+    assert get_fusion_df.call_count == 2  # noqa: PLR2004
+    assert sleeps == [1, 2, 4, 4]
+
+
+def test_fingerprint(credentials_examples: Path) -> None:
+    fs_fusion = FusionHTTPFileSystem(credentials=FusionCredentials.from_file(credentials_examples))
+    url = "https://fusion.jpmorgan.com/api/v1/catalogs/common/datasets/changes"
+    response = MagicMock(status=200, headers={})
+    response.read = AsyncMock(return_value=b"changes")
+    session = MagicMock()
+    for method in (session.get, session.head):
+        method.return_value.__aenter__ = AsyncMock(return_value=response)
+        method.return_value.__aexit__ = AsyncMock(return_value=None)
+    fs_fusion.set_session = AsyncMock(return_value=session)  # type: ignore
+
+    # without an ETag the content is hashed
+    assert fs_fusion.fingerprint("common/datasets/changes") == hashlib.sha256(b"changes").hexdigest()
+    assert session.head.call_args[0][0] == url
+    assert session.get.call_args[0][0] == url
+
+    # the ETag is requested with HEAD, the content is not transferred
+    session.reset_mock()
+    response.read.reset_mock()
+    response.headers = {"ETag": '"v1"'}
+    assert fs_fusion.fingerprint("common/datasets/changes") == '"v1"'
+    session.get.assert_not_called()
+
+    # then with a GET conditional on the previous ETag, unchanged changes are not transferred
+    session.reset_mock()
+    response.status = 304
+    assert fs_fusion.fingerprint("common/datasets/changes", '"v1"') == '"v1"'
+    session.head.assert_not_called()
+    assert session.get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+    response.read.assert_not_called()
+    response.status, response.headers = 200, {"ETag": '"v2"'}
+    assert fs_fusion.fingerprint("common/datasets/changes", '"v1"') == '"v2"'
+    response.read.assert_not_called()
+
+    # without an ETag, the Last-Modified date is used the same way
+    session.reset_mock()
+    response.headers = {"Last-Modified": "Wed, 21 Oct 2026 07:28:00 GMT"}
+    fingerprint = fs_fusion.fingerprint("common/datasets/changes")
+    assert fingerprint == "Last-Modified:Wed, 21 Oct 2026 07:28:00 GMT"
+    session.get.assert_not_called()
+    response.status = 304
+    assert fs_fusion.fingerprint("common/datasets/changes", fingerprint) == fingerprint
+    assert session.get.call_args.kwargs["headers"]["If-Modified-Since"] == "Wed, 21 Oct 2026 07:28:00 GMT"
+    response.read.assert_not_called()
+
+    # once a probe found neither, the content is hashed without a HEAD first
+    session.reset_mock()
+    response.status, response.headers = 200, {}
+    digest = hashlib.sha256(b"changes").hexdigest()
+    assert fs_fusion.fingerprint("common/datasets/changes", digest) == digest
+    session.head.assert_not_called()
+    assert session.get.call_count == 1
+
+
+def test_downloaded_files_are_not_rehashed(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    fs_local = fsspec.filesystem("file")
+    fs_fusion = MagicMock()
+    fs_fusion.ls.side_effect = lambda path: {"": ["common"], "common/datasets": ["ds1"]}.get(path, [])
+    fs_fusion.cat.return_value = b'{"isRawData": false}'
+    data = b"a,b\n1,1\n"
+
+    def _download(lfs: Any, _url: str, lpath: str) -> tuple[bool, str, None]:
+        lfs.mkdirs(str(Path(lpath).parent), exist_ok=True)
+        lfs.pipe_file(lpath, data)
+        return True, lpath, None
+
+    fs_fusion.download.side_effect = _download
+    urls = [f"common/datasets/ds1/datasetseries/2020010{i}/distributions/csv" for i in (1, 2)]
+    df_fusion = pd.DataFrame(
+        {
+            "path": [_url_to_path(url) for url in urls],
+            "url": urls,
+            "size": [len(data), len(data) + 1],
+            "sha256": ["remote-digest"] * 2,
+        }
+    )
+    local_path = f"{tmp_path}/"
+    state = SyncStateDB(tmp_path / "state.db")
+    empty = pd.DataFrame(columns=["path", "url", "mtime", "sha256"])
+    generate_sha256_token = MagicMock(return_value="local-digest")
+    monkeypatch.setattr(fusion.fs_sync, "_generate_sha256_token", generate_sha256_token)
+    res = _synchronize(fs_fusion, fs_local, empty, df_fusion, "download", 1, False, local_path, state)
+    # a file of another size than announced was not fully downloaded
+    assert [r[0] for r in res] == [True, False]
+    assert "not of the announced size" in str(res[1][2])
+    generate_sha256_token.assert_not_called()
+
+    # the digest Fusion reports is recorded, so the next scan only reads the partial file
+    df_local = _get_local_state(fs_local, fs_fusion, ["ds1"], "common", local_path=local_path, state_db=state)
+    state.close()
+    assert list(df_local["sha256"]) == ["remote-digest", "local-digest"]
+    assert generate_sha256_token.call_count == 1
+
+
+def test_synchronize_transfers_in_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    urls = [f"common/datasets/ds1/datasetseries/2020010{i}/distributions/csv" for i in range(5)]
+    df_fusion = pd.DataFrame({"path": [_url_to_path(u) for u in urls], "url": urls, "size": 1, "sha256": "a"})
+    df_local = pd.DataFrame({"path": [_url_to_path(urls[1])], "url": [urls[1]], "sha256": ["a"]})
+    batches = []
+
+    def _download(*args: Any, **_: Any) -> list[tuple[bool, str, None]]:
+        batches.append(list(args[2]["url"]))
+        return [(True, u, None) for u in args[2]["url"]]
+
+    monkeypatch.setattr(fusion.fs_sync, "_download", _download)
+    monkeypatch.setattr(fusion.fs_sync, "DEFAULT_SYNC_BATCH", 2)
+    res = _synchronize(MagicMock(), MagicMock(), df_local, df_fusion, "download", 1, False)
+
+    # the transfers are made as they are planned, no more than a batch at a time
+    assert batches == [[urls[0], urls[2]], [urls[3], urls[4]]]
+    assert [r[1] for r in res] == [urls[0], *urls[2:]]
+
+
+def test_idle_checks_the_lease_within_its_ttl() -> None:
+    lease = MagicMock(ttl=60)
+    lease.owned.side_effect = [["ds1", "ds2"], ["ds1", "ds2"], ["ds1", "ds2", "ds3"]]
+    waits: list[float] = []
+
+    def _wait(timeout: float) -> bool:
+        waits.append(timeout)
+        return False
+
+    # the sleep is cut in steps of a third of the ttl and ends once datasets are taken over
+    assert not _idle(_wait, 300, lease, ["ds1", "ds2", "ds3"], ["ds1", "ds2"])
+    assert len(waits) == lease.owned.call_count == 3  # noqa: PLR2004
+    assert all(w <= lease.ttl / 3 for w in waits)
+
+    # without a lease, the whole sleep is one wait, and changes end it
+    waits.clear()
+    assert not _idle(_wait, 300, None, [], [])
+    assert waits == [300]
+    assert _idle(lambda _: True, 300, lease, [], [])
@@ -1,17 +1,22 @@
 import datetime
+import io
 import json
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 import pandas as pd
 import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 import requests
 import requests_mock
 from pytest_mock import MockerFixture
 
 from fusion._fusion import FusionCredentials
+from fusion.exceptions import APIResponseError
 from fusion.fusion import Fusion
+from fusion.fusion_filesystem import FusionHTTPFileSystem
 from fusion.utils import _normalise_dt_param, distribution_to_url
 
 
@@ -686,3 +691,203 @@ def test_to_table(mocker: MockerFixture, tmp_path: Path, data_table_as_csv: str,
 
     res = fusion_obj.to_table(dataset, f"{dates[0]}:{dates[-1]}", fmt, catalog=catalog)
     assert len(res) > 0
+
+
+@pytest.mark.parametrize("reader", ["to_df", "to_table", "to_lazyframe"])
+def test_readers_download_errors(mocker: MockerFixture, fusion_obj: Fusion, reader: str) -> None:
+    download = mocker.patch.object(fusion_obj, "download", return_value=[])
+    with pytest.raises(APIResponseError, match="No series members for dataset: my_dataset"):
+        getattr(fusion_obj, reader)("my_dataset", "20200101", "csv", catalog="my_catalog")
+
+    download.return_value = [(True, "a.csv", None), (False, "b.csv", "error")]
+    with pytest.raises(RuntimeError, match="Not all downloads were successfully completed"):
+        getattr(fusion_obj, reader)("my_dataset", "20200101", "csv", catalog="my_catalog")
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_to_lazyframe(
+    mocker: MockerFixture, tmp_path: Path, data_table: pl.DataFrame, fusion_obj: Fusion, fmt: str
+) -> None:
+    catalog = "my_catalog"
+    dataset = "my_dataset"
+    dates = ["2020-01-01", "2020-01-02", "2020-01-03"]
+
+    files = [f"{tmp_path}/{dataset}__{catalog}__{dt}.{fmt}" for dt in dates]
+    for f in files:
+        if fmt == "csv":
+            data_table.write_csv(f)
+        else:
+            data_table.write_parquet(f)
+
+    patch_res = [(True, file, None) for file in files]
+
+    mocker.patch.object(
+        fusion_obj,
+        "download",
+        return_value=patch_res,
+    )
+
+    res = fusion_obj.to_lazyframe(dataset, f"{dates[0]}:{dates[-1]}", fmt, catalog=catalog)
+    assert isinstance(res, pl.LazyFrame)
+    collected = res.select(data_table.columns[:1]).collect()
+    assert len(collected) == 3 * len(data_table)
+    assert collected.columns == data_table.columns[:1]
+
+
+def test_to_lazyframe_unsupported_format(fusion_obj: Fusion) -> None:
+    with pytest.raises(ValueError, match="No polars function to scan file in format raw"):
+        fusion_obj.to_lazyframe("my_dataset", "20200101", "raw")
+
+
+def test_query(mocker: MockerFixture, tmp_path: Path, data_table: pl.DataFrame, fusion_obj: Fusion) -> None:
+    pytest.importorskip("duckdb")
+    catalog = "my_catalog"
+    dates = ["2020-01-01", "2020-01-02", "2020-01-03"]
+
+    def _files(dataset: str) -> list[tuple[bool, str, None]]:
+        files = [f"{tmp_path}/{dataset}__{catalog}__{dt}.parquet" for dt in dates]
+        for f in files:
+            data_table.write_parquet(f)
+        return [(True, file, None) for file in files]
+
+    mocker.patch.object(
+        fusion_obj,
+        "download",
+        side_effect=lambda dataset, *_args, **_kwargs: _files(dataset),
+    )
+
+    n_keys = 5
+    res = fusion_obj.query(
+        f"SELECT a.col_2, count(*) AS cnt FROM ds_a a JOIN ds_b b USING (col_1) WHERE a.col_1 < {n_keys} GROUP BY 1",
+        ["ds_a", "ds_b"],
+        f"{dates[0]}:{dates[-1]}",
+        catalog=catalog,
+    )
+    assert isinstance(res, pd.DataFrame)
+    assert len(res) == n_keys
+    # every key appears once per date in each dataset
+    assert (res["cnt"] == len(dates) ** 2).all()
+
+    res_pl = fusion_obj.query("SELECT * FROM ds_a", "ds_a", dataframe_type="polars", catalog=catalog)
+    assert isinstance(res_pl, pl.DataFrame)
+    assert len(res_pl) == 3 * len(data_table)
+
+    res_pa = fusion_obj.query("SELECT col_1 FROM ds_a", "ds_a", dataframe_type="arrow", catalog=catalog)
+    assert isinstance(res_pa, pa.Table)
+    assert res_pa.num_rows == 3 * len(data_table)
+
+
+def test_query_bad_args(fusion_obj: Fusion) -> None:
+    pytest.importorskip("duckdb")
+    with pytest.raises(ValueError, match="Unknown DataFrame type"):
+        fusion_obj.query("SELECT 1", "my_dataset", dataframe_type="numpy")
+    with pytest.raises(ValueError, match="No arrow dataset format"):
+        fusion_obj.query("SELECT 1", "my_dataset", dataset_format="raw")
+
+
+def test_to_table_remote(mocker: MockerFixture, fusion_obj: Fusion) -> None:
+    catalog = "my_catalog"
+    dataset = "my_dataset"
+    dts = ["20200101", "20200102"]
+    mocker.patch.object(
+        fusion_obj, "_resolve_distro_tuples", return_value=[(catalog, dataset, dt, "parquet") for dt in dts]
+    )
+    download = mocker.patch.object(fusion_obj, "download")
+    files = {}
+    for i, dt in enumerate(dts):
+        buf = io.BytesIO()
+        n_rows = 200000
+        tbl = pa.table(
+            {"a": range(n_rows), "b": [f"{j}-{i}" for j in range(n_rows)], "c": [float(j) for j in range(n_rows)]}
+        )
+        pq.write_table(tbl, buf, row_group_size=20000)
+        files[distribution_to_url(fusion_obj.root_url, dataset, dt, "parquet", catalog)] = buf.getvalue()
+
+    requests_made = []
+
+    def _response(status: int, body: bytes = b"", headers: Optional[dict[str, str]] = None) -> Any:
+        response = mocker.MagicMock(status=status, headers=headers or {})
+        response.read = mocker.AsyncMock(return_value=body)
+        context = mocker.MagicMock()
+        context.__aenter__ = mocker.AsyncMock(return_value=response)
+        context.__aexit__ = mocker.AsyncMock(return_value=None)
+        return context
+
+    def _head(url: str, **_: Any) -> Any:
+        requests_made.append(("HEAD", url))
+        data = files[url.removesuffix("/operationType/download")]
+        return _response(200, headers={"Content-Length": str(len(data))})
+
+    def _get(url: str, **_: Any) -> Any:
+        requests_made.append(("GET", url))
+        url, byte_range = url.split("/operationType/download?downloadRange=bytes=")
+        start, end = map(int, byte_range.split("-"))
+        return _response(206, files[url][start : end + 1])
+
+    session = mocker.MagicMock()
+    session.head.side_effect = _head
+    session.get.side_effect = _get
+    mocker.patch.object(FusionHTTPFileSystem, "set_session", mocker.AsyncMock(return_value=session))
+
+    filters = [("a", "<", 30000)]
+    res = fusion_obj.to_table(
+        dataset, "20200101:20200102", catalog=catalog, columns=["b"], filters=filters, remote=True
+    )
+    expected = pa.concat_tables(
+        pq.read_table(io.BytesIO(data), columns=["b"], filters=filters) for data in files.values()
+    )
+    assert res.equals(expected)
+    download.assert_not_called()
+
+    # one size and one footer request per distribution, then the chunks of the first two row groups
+    heads = [url for method, url in requests_made if method == "HEAD"]
+    gets = [url.split("downloadRange=bytes=")[1] for method, url in requests_made if method == "GET"]
+    assert len(heads) == len(files)
+    assert len(gets) <= 3 * len(files)
+    fetched = sum(int(end) - int(start) + 1 for start, end in (r.split("-") for r in gets))
+    assert fetched < sum(len(data) for data in files.values()) / 2
+
+    with pytest.raises(ValueError, match="do not apply to remote scans"):
+        fusion_obj.to_table(dataset, "20200101", catalog=catalog, force_download=True, remote=True)
+    with pytest.raises(ValueError, match="Remote scans are only supported for parquet"):
+        fusion_obj.to_table(dataset, "20200101", "csv", catalog=catalog, remote=True)
+
+
+def test_from_table(mocker: MockerFixture, fusion_obj: Fusion) -> None:
+    data_df = pd.DataFrame({"a": range(5000), "b": [f"value_{i}" for i in range(5000)]})
+    chunk_size = 4096
+    uploaded: list[bytes] = []
+
+    def _put(lpath: Any, *_: Any, chunk_size: int, **kwargs: Any) -> None:
+        assert kwargs["multipart"]
+        uploaded.extend(iter(lambda: lpath.read(chunk_size), b""))
+
+    fs = mocker.MagicMock()
+    fs.cat.return_value = json.dumps({"isRawData": False})
+    fs.put.side_effect = _put
+    mocker.patch.object(fusion_obj, "get_fusion_filesystem", return_value=fs)
+
+    res = fusion_obj.from_table(
+        data_df, "my_dataset", "20200101", catalog="my_catalog", chunk_size=chunk_size, return_paths=True
+    )
+    assert res == [(True, fs.put.call_args.args[1], None)]
+    assert len(uploaded) > 1
+    assert all(len(c) == chunk_size for c in uploaded[:-1])
+    assert pd.read_parquet(io.BytesIO(b"".join(uploaded))).equals(data_df)
+
+    with pytest.raises(ValueError, match="not supported"):
+        fusion_obj.from_table(data_df, "my_dataset", distribution="json")
+
+
+def test_from_table_failure(mocker: MockerFixture, fusion_obj: Fusion) -> None:
+    fs = mocker.MagicMock()
+    fs.cat.return_value = json.dumps({"isRawData": False})
+    fs.put.side_effect = RuntimeError("connection reset")
+    mocker.patch.object(fusion_obj, "get_fusion_filesystem", return_value=fs)
+
+    # the writer blocked on the full pipe is stopped once the upload fails
+    table = pa.table({"a": range(100000)})
+    with pytest.warns(UserWarning, match="connection reset"):
+        res = fusion_obj.from_table(table, "my_dataset", chunk_size=1024, return_paths=True)
+    assert res is not None
+    assert not res[0][0]
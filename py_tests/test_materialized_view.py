@@ -0,0 +1,85 @@
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pytest
+from pytest_mock import MockerFixture
+
+from fusion.fusion import Fusion
+from fusion.materialized_view import MaterializedView, _filter_members
+
+
+def _fusion_df(catalog: str, dataset: str, digests: dict[str, str]) -> pd.DataFrame:
+    urls = [f"{catalog}/datasets/{dataset}/datasetseries/{m}/distributions/csv" for m in digests]
+    return pd.DataFrame({"path": urls, "url": urls, "size": [1] * len(urls), "sha256": list(digests.values())})
+
+
+@pytest.fixture()
+def view_fusion(mocker: MockerFixture, fusion_obj: Fusion, tmp_path: Path) -> tuple[Fusion, MagicMock]:
+    fusion_obj.download_folder = str(tmp_path)
+    fs_fusion = MagicMock()
+
+    def _download(_lfs: Any, rpath: str, lpath: str, **_kwargs: Any) -> tuple[bool, str, None]:
+        member = rpath.split("/")[4]
+        Path(lpath).write_text(f"member,value\n{member},1\n{member},2\n")
+        return True, lpath, None
+
+    fs_fusion.download.side_effect = _download
+    mocker.patch.object(fusion_obj, "get_fusion_filesystem", return_value=fs_fusion)
+    return fusion_obj, fs_fusion
+
+
+def test_filter_members() -> None:
+    members = ["20200101", "20200102", "20200103", "sample"]
+    assert _filter_members(members, "20200102:") == ["20200102", "20200103"]
+    assert _filter_members(members, ":20200101") == ["20200101"]
+    assert _filter_members(members, "20200102") == ["20200102"]
+
+
+def test_materialized_view_bad_format(fusion_obj: Fusion) -> None:
+    with pytest.raises(ValueError, match="not supported for materialized views"):
+        MaterializedView(fusion_obj, "my_dataset", "20200101:", dataset_format="raw")
+
+
+def test_materialized_view_refresh(mocker: MockerFixture, view_fusion: tuple[Fusion, MagicMock]) -> None:
+    fusion_obj, fs_fusion = view_fusion
+    catalog = "my_catalog"
+    dataset = "my_dataset"
+    get_df = mocker.patch("fusion.materialized_view._get_fusion_df")
+
+    get_df.return_value = _fusion_df(catalog, dataset, {"20200101": "a", "20200102": "b"})
+    view = fusion_obj.materialized_view(dataset, "20200101:", "csv", catalog=catalog)
+    res = view.refresh(n_par=1)
+    assert res == {"added": ["20200101", "20200102"], "updated": [], "removed": []}
+    assert [c.args[1].split("/")[4] for c in fs_fusion.download.call_args_list] == ["20200101", "20200102"]
+    assert view.to_df()["member"].tolist() == [20200101, 20200101, 20200102, 20200102]
+    # the downloads are deleted once rewritten as parts
+    assert not list((Path(fusion_obj.download_folder) / catalog / dataset).iterdir())
+
+    # a new member and a changed member are the only ones fetched
+    get_df.return_value = _fusion_df(catalog, dataset, {"20200101": "a", "20200102": "c", "20200103": "d"})
+    fs_fusion.download.reset_mock()
+    res = view.refresh(n_par=1)
+    assert res == {"added": ["20200103"], "updated": ["20200102"], "removed": []}
+    assert [c.args[1].split("/")[4] for c in fs_fusion.download.call_args_list] == ["20200102", "20200103"]
+
+    # the watermark is persisted, so a fresh view with nothing new does no work
+    reloaded = fusion_obj.materialized_view(dataset, "20200101:", "csv", catalog=catalog)
+    assert reloaded.members == ["20200101", "20200102", "20200103"]
+    fs_fusion.download.reset_mock()
+    res = reloaded.refresh(n_par=1)
+    assert res == {"added": [], "updated": [], "removed": []}
+    fs_fusion.download.assert_not_called()
+    assert sorted(reloaded.to_df(columns=["member"])["member"].unique()) == [20200101, 20200102, 20200103]
+
+    get_df.return_value = _fusion_df(catalog, dataset, {"20200102": "c", "20200103": "d"})
+    res = reloaded.refresh(n_par=1)
+    assert res == {"added": [], "updated": [], "removed": ["20200101"]}
+    assert reloaded.members == ["20200102", "20200103"]
+
+
+def test_materialized_view_empty(fusion_obj: Fusion, tmp_path: Path) -> None:
+    view = MaterializedView(fusion_obj, "my_dataset", "20200101:", path=str(tmp_path / "view"))
+    with pytest.raises(ValueError, match="call refresh first"):
+        view.to_table()
@@ -0,0 +1,69 @@
+import socket
+import time
+from pathlib import Path
+
+import fsspec
+import pytest
+
+from fusion.sharding import HashRing, WorkerLease
+
+
+def test_hash_ring_moves_only_keys_of_changed_members() -> None:
+    keys = [f"dataset_{i}" for i in range(1000)]
+    ring = HashRing(["a", "b", "c"])
+    owners = {k: ring.owner(k) for k in keys}
+    assert set(owners.values()) == {"a", "b", "c"}
+    assert min(list(owners.values()).count(m) for m in "abc") > 200  # noqa: PLR2004
+
+    # the keys of a dead member are spread over the others, all other keys keep their owner
+    ring = HashRing(["a", "c"])
+    assert all(ring.owner(k) == owners[k] for k in keys if owners[k] != "b")
+    assert {ring.owner(k) for k in keys if owners[k] == "b"} == {"a", "c"}
+
+    with pytest.raises(ValueError, match="no members"):
+        HashRing([]).owner("dataset_0")
+
+
+def test_worker_lease_takeover(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fs = fsspec.filesystem("file")
+    lease_dir = str(tmp_path / "leases")
+    keys = [f"dataset_{i}" for i in range(100)]
+    a = WorkerLease(fs, lease_dir, "a", ttl=30)
+    b = WorkerLease(fs, lease_dir, "b", ttl=30)
+    c = WorkerLease(fs, lease_dir, "c", ttl=30)
+    try:
+        shards = [w.owned(keys) for w in (a, b, c)]
+        assert sorted(k for s in shards for k in s) == sorted(keys)
+        assert all(shards)
+
+        # a released lease is taken over at once
+        c.release()
+        assert sorted(a.owned(keys) + b.owned(keys)) == sorted(keys)
+        assert set(shards[0]) < set(a.owned(keys))
+
+        # b stops renewing, a takes over once the lease is older than ttl on its own clock
+        b._stop.set()
+        b._thread.join()
+        assert a.live_workers() == ["a", "b"]
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+        assert a.live_workers() == ["a"]
+        assert a.owned(keys) == keys
+        # and removes its lease, so the leases of dead workers do not pile up
+        assert [Path(p).name for p in fs.ls(lease_dir, detail=False)] == ["a.lease"]
+    finally:
+        a.release()
+        b.release()
+    assert fs.ls(lease_dir) == []
+
+
+def test_worker_lease_default_id_is_stable(tmp_path: Path) -> None:
+    fs = fsspec.filesystem("file")
+    lease = WorkerLease(fs, str(tmp_path / "leases"))
+    lease.release()
+    # a restarted worker reuses its lease instead of adding another one
+    restarted = WorkerLease(fs, str(tmp_path / "leases"))
+    try:
+        assert restarted.worker_id == lease.worker_id == socket.gethostname()
+    finally:
+        restarted.release()
@@ -0,0 +1,76 @@
+import random
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import fsspec
+import pandas as pd
+import pytest
+
+from fusion.fs_sync import fsync
+from fusion.sync_plan import SyncEntry, iter_sync_actions, plan_sync
+
+
+def _state(urls: list[str], digests: list[str], prefix: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"url": urls, "sha256": digests, "path": [f"{prefix}/{u}" for u in urls], "size": range(len(urls))}
+    )
+
+
+@pytest.mark.parametrize("direction", ["upload", "download"])
+def test_plan_matches_merge(direction: str) -> None:
+    rng = random.Random(0)
+    urls = [f"common/datasets/ds{i:04d}/datasetseries/20200101/distributions/csv" for i in range(1000)]
+    # the listings are sorted by url
+    local_urls = sorted(rng.sample(urls, 700))
+    remote_urls = sorted(rng.sample(urls, 700))
+    df_local = _state(local_urls, [rng.choice("ab") for _ in local_urls], "local")
+    df_fusion = _state(remote_urls, [rng.choice("ab") for _ in remote_urls], "fusion")
+
+    plan = plan_sync(df_local, df_fusion, direction)
+
+    # the transfers selected by joining both states
+    how = "left" if direction == "upload" else "right"
+    join_df = df_local.merge(df_fusion, on="url", suffixes=("_local", "_fusion"), how=how)
+    join_df = join_df[join_df["sha256_local"] != join_df["sha256_fusion"]].sort_values("url")
+    actions = plan.to_df()
+    assert list(actions["url"]) == list(join_df["url"])
+    assert list(actions["path_local"].fillna("")) == list(join_df["path_local"].fillna(""))
+    assert list(actions["path_fusion"].fillna("")) == list(join_df["path_fusion"].fillna(""))
+    assert plan.n_files == len(join_df)
+    assert plan.n_bytes == join_df[f"size_{'local' if direction == 'upload' else 'fusion'}"].sum()
+
+
+def test_plan_requires_sorted_listings() -> None:
+    local = [SyncEntry("b", "x", "b"), SyncEntry("a", "x", "a")]
+    with pytest.raises(ValueError, match="not sorted"):
+        list(iter_sync_actions(local, []))
+    with pytest.raises(ValueError, match="Unknown direction"):
+        list(iter_sync_actions([], [], "sideways"))
+    # frames are read in their order, not sorted again
+    with pytest.raises(ValueError, match="not sorted"):
+        plan_sync(_state(["b", "a"], ["x", "x"], "local"), _state([], [], "fusion"))
+
+
+def test_fsync_dry_run(tmp_path: Path) -> None:
+    fs_fusion = MagicMock()
+    fs_fusion.ls.side_effect = lambda path: {"": ["common"], "common/datasets": ["ds1"]}.get(path, [])
+    fs_fusion.cat.return_value = b'{"isRawData": false}'
+    fs_fusion.info.return_value = {"changes": {"datasets": []}}
+    local_dir = tmp_path / "common" / "ds1"
+    local_dir.mkdir(parents=True)
+    (local_dir / "ds1__common__20200101.csv").write_text("a,b\n1,1\n")
+
+    plan = fsync(
+        fs_fusion,
+        fsspec.filesystem("file"),
+        datasets=["ds1"],
+        local_path=str(tmp_path),
+        log_path=str(tmp_path),
+        state_path=str(tmp_path / "state.db"),
+        dry_run=True,
+    )
+
+    assert plan is not None
+    assert (plan.n_files, plan.n_bytes) == (1, 8)
+    assert plan.actions[0].url == "common/datasets/ds1/datasetseries/20200101/distributions/csv"
+    fs_fusion.put.assert_not_called()
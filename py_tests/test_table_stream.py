@@ -0,0 +1,60 @@
+import io
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet as pq
+import pytest
+
+from fusion.table_stream import ChunkPipe, write_table
+
+
+def _drain(pipe: ChunkPipe, chunk_size: int) -> list[bytes]:
+    return list(iter(lambda: pipe.read(chunk_size), b""))
+
+
+def _write_in_thread(data: object, pipe: ChunkPipe, distribution: str) -> threading.Thread:
+    def _write() -> None:
+        try:
+            write_table(data, pipe, distribution, batch_rows=100)
+        except BaseException as ex:  # noqa: BLE001
+            pipe.finish(ex)
+        else:
+            pipe.finish()
+
+    writer = threading.Thread(target=_write)
+    writer.start()
+    return writer
+
+
+@pytest.mark.parametrize("distribution", ["parquet", "csv"])
+def test_write_table_through_pipe(distribution: str) -> None:
+    data_df = pd.DataFrame({"a": range(1000), "b": [f"value_{i}" for i in range(1000)]})
+    chunk_size = 512
+    pipe = ChunkPipe(max_buffered=2 * chunk_size)
+    writer = _write_in_thread(data_df, pipe, distribution)
+    chunks = _drain(pipe, chunk_size)
+    writer.join()
+
+    # every chunk but the last one is full
+    assert all(len(c) == chunk_size for c in chunks[:-1])
+    data = io.BytesIO(b"".join(chunks))
+    table = pq.read_table(data) if distribution == "parquet" else pyarrow.csv.read_csv(data)
+    assert table.to_pandas().equals(data_df)
+
+
+def test_write_table_error_reaches_reader() -> None:
+    pipe = ChunkPipe()
+    writer = _write_in_thread(pa.table({"a": [1]}), pipe, "json")
+    with pytest.raises(ValueError, match="not supported"):
+        _drain(pipe, 512)
+    writer.join()
+
+
+def test_pipe_abort_stops_writer() -> None:
+    pipe = ChunkPipe(max_buffered=10)
+    pipe.write(b"0123456789")
+    pipe.abort()
+    with pytest.raises(BrokenPipeError):
+        pipe.write(b"0123456789")
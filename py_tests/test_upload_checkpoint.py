@@ -0,0 +1,52 @@
+import io
+import os
+from pathlib import Path
+
+import fsspec
+
+from fusion.upload_checkpoint import UploadCheckpoint
+
+RPATH = "http://example.com/distributions/csv"
+
+
+def test_checkpoint_roundtrip(tmp_path: Path) -> None:
+    lpath = tmp_path / "file.csv"
+    lpath.write_bytes(b"0123456789" * 3)
+    with fsspec.filesystem("file").open(str(lpath), "rb") as f:
+        checkpoint = UploadCheckpoint.for_upload(f, RPATH, 10, checkpoint_dir=tmp_path / "checkpoints")
+        assert checkpoint is not None
+        assert checkpoint.operation_id is None
+        checkpoint.start("op_id")
+        checkpoint.add_part(1, {"partNumber": 1}, "digest_1")
+
+        loaded = UploadCheckpoint.for_upload(f, RPATH, 10, checkpoint_dir=tmp_path / "checkpoints")
+    assert loaded is not None
+    assert loaded.operation_id == "op_id"
+    assert loaded.parts == {1: {"response": {"partNumber": 1}, "digest": "digest_1"}}
+
+    loaded.remove()
+    assert not loaded.path.exists()
+
+
+def test_checkpoint_discarded_when_source_changes(tmp_path: Path) -> None:
+    lpath = tmp_path / "file.csv"
+    lpath.write_bytes(b"0123456789" * 3)
+    checkpoint = UploadCheckpoint.for_upload(str(lpath), RPATH, 10, checkpoint_dir=tmp_path)
+    assert checkpoint is not None
+    checkpoint.start("op_id")
+
+    # a different chunk size cannot reuse the parts
+    other = UploadCheckpoint.for_upload(str(lpath), RPATH, 5, checkpoint_dir=tmp_path)
+    assert other is not None
+    assert other.operation_id is None
+
+    checkpoint.start("op_id")
+    lpath.write_bytes(b"0123456789" * 4)
+    os.utime(lpath, ns=(0, 0))
+    changed = UploadCheckpoint.for_upload(str(lpath), RPATH, 10, checkpoint_dir=tmp_path)
+    assert changed is not None
+    assert changed.operation_id is None
+
+
+def test_checkpoint_not_created_for_buffers(tmp_path: Path) -> None:
+    assert UploadCheckpoint.for_upload(io.BytesIO(b"data"), RPATH, 10, checkpoint_dir=tmp_path) is None
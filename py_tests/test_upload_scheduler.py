@@ -0,0 +1,118 @@
+import asyncio
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import fsspec
+import pandas as pd
+import pytest
+
+from fusion._fusion import FusionCredentials
+from fusion.fusion_filesystem import FusionHTTPFileSystem
+from fusion.upload_scheduler import UploadResult, upload_many
+from fusion.utils import upload_files
+
+
+@pytest.fixture()
+def http_fs_instance(credentials_examples: Path) -> FusionHTTPFileSystem:
+    creds = FusionCredentials.from_file(credentials_examples)
+    return FusionHTTPFileSystem(credentials=creds)
+
+
+class _Response:
+    def __init__(self, url: str, state: dict[str, int]) -> None:
+        self.url = url
+        self.state = state
+        self.status = 200
+
+    async def __aenter__(self) -> "_Response":
+        # parts of multipart uploads and bodies of single part uploads are counted while in flight
+        key = "parts" if "partNumber" in self.url else "" if "operation" in self.url else "files"
+        if key:
+            self.state[key] += 1
+            self.state[f"max_{key}"] = max(self.state[f"max_{key}"], self.state[key])
+            await asyncio.sleep(0.05)
+            self.state[key] -= 1
+        if "file_3" in self.url:
+            self.status = 500
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        pass
+
+    def raise_for_status(self) -> None:
+        if self.status != 200:  # noqa: PLR2004
+            raise RuntimeError("server error")
+
+    async def text(self) -> str:
+        return ""
+
+    async def json(self) -> dict[str, str]:
+        return {"operationId": "op_id"}
+
+
+def _session(state: dict[str, int]) -> MagicMock:
+    session = MagicMock()
+    session.put.side_effect = lambda url, **_: _Response(url, state)
+    session.post.side_effect = lambda url, **_: _Response(url, state)
+    return session
+
+
+def _files(tmp_path: Path, sizes: list[int]) -> pd.DataFrame:
+    paths = []
+    for i, size in enumerate(sizes):
+        path = tmp_path / f"file_{i}.csv"
+        path.write_bytes(b"0" * size)
+        paths.append(str(path))
+    urls = [f"common/datasets/file_{i}/datasetseries/20200101/distributions/csv" for i in range(len(sizes))]
+    return pd.DataFrame({"url": urls, "path": paths})
+
+
+def test_upload_many_limits(http_fs_instance: FusionHTTPFileSystem, tmp_path: Path) -> None:
+    state = {"files": 0, "max_files": 0, "parts": 0, "max_parts": 0}
+    http_fs_instance.set_session = AsyncMock(return_value=_session(state))  # type: ignore
+    # file_3 fails, files of 50 bytes are uploaded in parts
+    files = _files(tmp_path, [5, 5, 5, 5, 50, 50, 50, 50])
+    on_result = MagicMock()
+
+    res = fsspec.asyn.sync(
+        http_fs_instance.loop,
+        upload_many,
+        http_fs_instance,
+        fsspec.filesystem("file"),
+        zip(files["url"], files["path"], [None] * len(files)),
+        max_files=3,
+        max_parts=2,
+        chunk_size=10,
+        part_concurrency=4,
+        on_result=on_result,
+    )
+
+    assert [r.path for r in res] == list(files["path"])
+    assert [r.success for r in res] == [True, True, True, False, True, True, True, True]
+    assert res[3].error == "server error"
+    assert res[0] == (True, files["path"][0], None)
+    assert isinstance(res[0], UploadResult)
+    assert on_result.call_count == len(files)
+    assert 1 < state["max_parts"] <= 2  # noqa: PLR2004
+    assert 1 < state["max_files"] <= 3  # noqa: PLR2004
+
+
+def test_upload_files_uses_scheduler(
+    http_fs_instance: FusionHTTPFileSystem, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: list[dict[str, Any]] = []
+
+    async def _put_distribution(lpath: Any, rpath: str, *_: Any, **kwargs: Any) -> None:
+        calls.append({"rpath": rpath, "data": lpath.read(), **kwargs})
+
+    monkeypatch.setattr(http_fs_instance, "_put_distribution", _put_distribution)
+    files = _files(tmp_path, [5, 50])
+    files["file_name"] = ["a.csv", "b.csv"]
+
+    res = upload_files(http_fs_instance, fsspec.filesystem("file"), files, chunk_size=10, show_progress=True)
+    assert res == [(True, p, None) for p in files["path"]]
+    assert sorted((c["rpath"], c["file_name"], c["multipart"]) for c in calls) == [
+        (files["url"][0], "a.csv", False),
+        (files["url"][1], "b.csv", True),
+    ]
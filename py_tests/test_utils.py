@@ -1,6 +1,10 @@
+import base64
+import hashlib
 import io
 import multiprocessing as mp
 import tempfile
+import threading
+import time
 from collections.abc import Generator
 from pathlib import Path
 from typing import Any
@@ -17,10 +21,12 @@ from fusion._fusion import FusionCredentials
 from fusion.authentication import FusionOAuthAdapter
 from fusion.fusion import Fusion
 from fusion.utils import (
+    DatasetResolver,
     PathLikeT,
     _filename_to_distribution,
     cpu_count,
     csv_to_table,
+    dataset_resolver,
     get_session,
     is_dataset_raw,
     joblib_progress,
@@ -717,6 +723,53 @@ def test_is_dataset_raw_caching_of_results(mock_fs_fusion_w_cat: MagicMock) -> N
     mock_fs_fusion_w_cat.cat.assert_called_once()
 
 
+def test_is_dataset_raw_concurrent_lookups() -> None:
+    fs = MagicMock()
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def _cat(path: str) -> bytes:
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return b'{"isRawData": true}' if path.endswith("0") else b'{"isRawData": false}'
+
+    fs.cat.side_effect = _cat
+    paths = [f"path/to/dataset{i}__catalog1__20230101.csv" for i in range(8)]
+    assert is_dataset_raw(paths, fs) == [True] + [False] * 7
+    assert active["max"] > 1
+
+
+def test_dataset_resolver_caches_across_calls(mock_fs_fusion: MagicMock) -> None:
+    paths = ["path/to/dataset1__catalog1__20230101.csv", "path/to/dataset3__catalog2__20230101.csv"]
+    assert validate_file_names(paths, mock_fs_fusion) == [True, True]
+    assert validate_file_names(paths, mock_fs_fusion) == [True, True]
+    assert dataset_resolver(mock_fs_fusion) is dataset_resolver(mock_fs_fusion)
+    # the catalogs and the datasets of both catalogs are listed once
+    assert mock_fs_fusion.ls.call_count == 3  # noqa: PLR2004
+
+
+def test_dataset_resolver_refreshes_missing_datasets(mock_fs_fusion: MagicMock) -> None:
+    paths = ["path/to/dataset1__catalog1__20230101.csv"]
+    assert validate_file_names(paths, mock_fs_fusion) == [True]
+    # a dataset created after the listing was cached is found
+    mock_fs_fusion.ls.side_effect = lambda path: {"": ["catalog1"], "catalog1/datasets": ["dataset5"]}.get(path, [])
+    assert validate_file_names(["path/to/dataset5__catalog1__20230101.csv"], mock_fs_fusion) == [True]
+
+
+def test_dataset_resolver_ttl(mock_fs_fusion_w_cat: MagicMock) -> None:
+    resolver = DatasetResolver(mock_fs_fusion_w_cat, ttl=0.05)
+    assert resolver.is_raw("catalog1", "dataset1")
+    assert resolver.is_raw("catalog1", "dataset1")
+    mock_fs_fusion_w_cat.cat.assert_called_once()
+    time.sleep(0.1)
+    assert resolver.is_raw("catalog1", "dataset1")
+    assert mock_fs_fusion_w_cat.cat.call_count == 2  # noqa: PLR2004
+
+
 @pytest.fixture()
 def setup_fs() -> tuple[fsspec.AbstractFileSystem, fsspec.AbstractFileSystem]:
     fs_fusion = MagicMock(spec=fsspec.AbstractFileSystem)
@@ -757,6 +810,21 @@ def test_upload_public(
     assert res
 
 
+def test_upload_bytes_multipart_above_chunk_size(
+    setup_fs: tuple[fsspec.AbstractFileSystem, fsspec.AbstractFileSystem], upload_row: pd.Series
+) -> None:
+    fs_fusion, _ = setup_fs
+    upload_df = pd.DataFrame([upload_row])
+
+    res = upload_files(fs_fusion, io.BytesIO(b"0123456789"), upload_df, chunk_size=10, parallel=False)
+    assert res == [(True, upload_row["path"], None)]
+    assert fs_fusion.put.call_args.kwargs["multipart"] is False  # type: ignore
+
+    res = upload_files(fs_fusion, io.BytesIO(b"0123456789" * 2), upload_df, chunk_size=10, parallel=False)
+    assert res == [(True, upload_row["path"], None)]
+    assert fs_fusion.put.call_args.kwargs["multipart"] is True  # type: ignore
+
+
 def test_upload_public_parallel(
     setup_fs: tuple[fsspec.AbstractFileSystem, fsspec.AbstractFileSystem], upload_rows: pd.DataFrame
 ) -> None:
@@ -769,3 +837,75 @@ def test_upload_public_parallel(
     fs_local = io.BytesIO(b"some data to simulate file content" * 100)
     res = upload_files(fs_fusion, fs_local, upload_rows, show_progress=False, parallel=True)
     assert res
+
+
+def test_upload_skip_unchanged(tmp_path: Path, mocker: MockerFixture) -> None:
+    state_path = str(tmp_path / "state.db")
+    data = b"0123456789" * 3
+    for name in ["same", "changed", "new"]:
+        (tmp_path / f"{name}.csv").write_bytes(data)
+    url = "common/datasets/{}/datasetseries/20200101/distributions/csv"
+    upload_df = pd.DataFrame(
+        {
+            "url": [url.format(name) for name in ["same", "changed", "new"]],
+            "path": [str(tmp_path / f"{name}.csv") for name in ["same", "changed", "new"]],
+        }
+    )
+    chunk_digests = [hashlib.sha256(b"0123456789").digest()] * 3
+    published = base64.b64encode(hashlib.sha256(b"".join(chunk_digests)).digest()).decode()
+    fusion_df = pd.DataFrame(
+        {"url": [url.format("same"), url.format("changed")], "size": [len(data), len(data)], "sha256": [published, "x"]}
+    )
+    get_fusion_df = mocker.patch(
+        "fusion.listing._get_fusion_df",
+        side_effect=lambda _, datasets, __: fusion_df[fusion_df.url.str.split("/").str[2].isin(datasets)],
+    )
+    fs_fusion = MagicMock(spec=fsspec.AbstractFileSystem)
+    fs_local = fsspec.filesystem("file")
+
+    res = upload_files(
+        fs_fusion, fs_local, upload_df, chunk_size=10, parallel=False, skip_unchanged=True, state_path=state_path
+    )
+    assert res == [(True, p, None) for p in upload_df["path"]]
+    assert sorted(c.args[1] for c in fs_fusion.put.call_args_list) == [url.format("changed"), url.format("new")]
+    # the datasets of a catalog are listed in one call
+    get_fusion_df.assert_called_once()
+    assert get_fusion_df.call_args.args[1:] == (["changed", "new", "same"], "common")
+
+    # the digest of the unchanged file is recorded in the state database and not computed again
+    mocker.patch("fusion.digest.file_chunk_digests", side_effect=AssertionError("rehashed"))
+    fs_fusion.reset_mock()
+    upload_files(
+        fs_fusion,
+        fs_local,
+        upload_df.iloc[:1],
+        chunk_size=10,
+        parallel=False,
+        skip_unchanged=True,
+        state_path=state_path,
+    )
+    fs_fusion.put.assert_not_called()
+
+    # files of datasets whose distributions cannot be listed are uploaded, other errors are raised
+    get_fusion_df.side_effect = FileNotFoundError("common/datasets/changes")
+    upload_files(
+        fs_fusion,
+        fs_local,
+        upload_df.iloc[:1],
+        chunk_size=10,
+        parallel=False,
+        skip_unchanged=True,
+        state_path=state_path,
+    )
+    assert fs_fusion.put.call_count == 1
+    get_fusion_df.side_effect = KeyError("distributions")
+    with pytest.raises(KeyError):
+        upload_files(
+            fs_fusion,
+            fs_local,
+            upload_df.iloc[:1],
+            chunk_size=10,
+            parallel=False,
+            skip_unchanged=True,
+            state_path=state_path,
+        )
@@ -14,6 +14,9 @@ use std::fs::File;
 use std::io::prelude::*;
 use std::path::{Path, PathBuf};
 use std::str::FromStr;
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::sync::{Arc, Mutex, Weak};
+use std::time::Duration;
 use url::Url;
 
 #[allow(unused_imports)]
@@ -285,7 +288,6 @@ impl Default for AuthToken {
 }
 
 fn build_client(proxies: &Option<HashMap<String, String>>) -> PyResult<reqwest::Client> {
-
     client_builder_from_proxies(proxies.as_ref().unwrap_or(&HashMap::new()))
         .use_rustls_tls()
         .tls_built_in_native_certs(true)
@@ -293,6 +295,220 @@ fn build_client(proxies: &Option<HashMap<String, String>>) -> PyResult<reqwest::
         .map_err(|err| CredentialError::new_err(format!("Error creating HTTP client: {}", err)))
 }
 
+// Tokens with less than this many seconds left are not used for a request
+const TOKEN_MIN_REMAIN_SECS: i64 = 30;
+// Tokens are refreshed in the background this many seconds before they expire, or half way through shorter lifetimes
+const TOKEN_REFRESH_AHEAD_SECS: i64 = 120;
+const TOKEN_REFRESH_CHECK_SECS: u64 = 15;
+// Fusion tokens not used for this many seconds are no longer refreshed in the background
+const HOT_TOKEN_SECS: i64 = 600;
+
+fn user_agent() -> String {
+    format!("fusion-python-sdk {}", env!("CARGO_PKG_VERSION"))
+}
+
+fn parse_token_response(text: &str) -> PyResult<(String, Option<i64>)> {
+    let res_json = json::parse(text).map_err(|e| {
+        CredentialError::new_err(format!("Could not parse response to json: {:?}", e))
+    })?;
+    let token = res_json["access_token"]
+        .as_str()
+        .ok_or_else(|| CredentialError::new_err(format!("No access token in response: {}", text)))?
+        .to_string();
+    Ok((token, res_json["expires_in"].as_i64()))
+}
+
+async fn request_bearer_token(
+    client: &reqwest::Client,
+    auth_url: &str,
+    payload: &[(String, String)],
+) -> PyResult<(String, Option<i64>)> {
+    let res = client
+        .post(auth_url)
+        .header("User-Agent", user_agent())
+        .form(payload)
+        .send()
+        .await
+        .map_err(|e| CredentialError::new_err(format!("Could not post request: {:?}", e)))?;
+    let res_text = res
+        .text()
+        .await
+        .map_err(|e| CredentialError::new_err(format!("Could not get response text: {:?}", e)))?;
+    parse_token_response(&res_text)
+}
+
+async fn request_fusion_token(
+    client: &reqwest::Client,
+    url: &str,
+    bearer_token: &str,
+) -> PyResult<(String, Option<i64>)> {
+    let res = client
+        .get(url)
+        .header("Authorization", format!("Bearer {}", bearer_token))
+        .header("User-Agent", user_agent())
+        .send()
+        .await
+        .map_err(|e| CredentialError::new_err(format!("Could not post request: {:?}", e)))?
+        .error_for_status()
+        .map_err(|e| CredentialError::new_err(format!("Error from endpoint: {:?}", e)))?;
+    let res_text = res
+        .text()
+        .await
+        .map_err(|e| CredentialError::new_err(format!("Could not get response text: {:?}", e)))?;
+    parse_token_response(&res_text)
+}
+
+fn refresh_due(token: &AuthToken, lifetime: Option<i64>, now: i64) -> bool {
+    match token.expiry {
+        Some(expiry) => {
+            let ahead = lifetime.map_or(TOKEN_REFRESH_AHEAD_SECS, |secs| {
+                TOKEN_REFRESH_AHEAD_SECS.min(secs / 2)
+            });
+            expiry - now <= ahead
+        }
+        None => false,
+    }
+}
+
+#[derive(Debug, Clone)]
+struct HotToken {
+    url: String,
+    token: AuthToken,
+    lifetime: Option<i64>,
+    last_used: i64,
+}
+
+#[derive(Debug, Default)]
+struct TokenCacheState {
+    client: Option<reqwest::Client>,
+    auth_url: Option<String>,
+    // None for credentials that cannot request a new bearer token
+    payload: Option<Vec<(String, String)>>,
+    bearer: Option<AuthToken>,
+    bearer_lifetime: Option<i64>,
+    hot: HashMap<String, HotToken>,
+    // The latest tokens, with the version they were published at
+    latest_bearer: Option<(u64, AuthToken)>,
+    latest_fusion: HashMap<String, (u64, AuthToken)>,
+}
+
+/// Counters of the Fusion token cache, and the latest tokens shared by all the clones of
+/// the credentials. Each clone picks up the tokens published after the version it last saw.
+#[derive(Debug, Default)]
+struct TokenCache {
+    hits: AtomicU64,
+    misses: AtomicU64,
+    refreshes: AtomicU64,
+    version: AtomicU64,
+    refresher_started: AtomicBool,
+    state: Mutex<TokenCacheState>,
+}
+
+impl TokenCache {
+    fn state(&self) -> std::sync::MutexGuard<'_, TokenCacheState> {
+        self.state.lock().unwrap_or_else(|e| e.into_inner())
+    }
+
+    fn publish_bearer(&self, state: &mut TokenCacheState, token: AuthToken, lifetime: Option<i64>) {
+        let version = self.version.fetch_add(1, Ordering::SeqCst) + 1;
+        state.bearer = Some(token.clone());
+        state.bearer_lifetime = lifetime;
+        state.latest_bearer = Some((version, token));
+    }
+
+    fn publish_fusion(&self, state: &mut TokenCacheState, key: String, token: AuthToken) {
+        let version = self.version.fetch_add(1, Ordering::SeqCst) + 1;
+        state.latest_fusion.insert(key, (version, token));
+    }
+
+    fn stats(&self) -> HashMap<String, u64> {
+        HashMap::from([
+            ("hits".to_string(), self.hits.load(Ordering::Relaxed)),
+            ("misses".to_string(), self.misses.load(Ordering::Relaxed)),
+            (
+                "refreshes".to_string(),
+                self.refreshes.load(Ordering::Relaxed),
+            ),
+        ])
+    }
+
+    // The background task does not log, as logging from its threads would wait for the GIL
+    // held by Python threads blocking on the runtime.
+    async fn refresh_due_tokens(&self) {
+        let now = Utc::now().timestamp();
+        let (client, bearer_request, mut bearer, due) = {
+            let mut state = self.state();
+            state.hot.retain(|_, t| now - t.last_used < HOT_TOKEN_SECS);
+            let TokenCacheState {
+                hot, latest_fusion, ..
+            } = &mut *state;
+            latest_fusion.retain(|key, _| hot.contains_key(key));
+            let client = match state.client.clone() {
+                Some(client) => client,
+                None => return,
+            };
+            let bearer_due = state
+                .bearer
+                .as_ref()
+                .map_or(true, |b| refresh_due(b, state.bearer_lifetime, now));
+            let bearer_request = match (&state.auth_url, &state.payload) {
+                (Some(auth_url), Some(payload)) if bearer_due => {
+                    Some((auth_url.clone(), payload.clone()))
+                }
+                _ => None,
+            };
+            let due: Vec<(String, String)> = state
+                .hot
+                .iter()
+                .filter(|(_, t)| refresh_due(&t.token, t.lifetime, now))
+                .map(|(key, t)| (key.clone(), t.url.clone()))
+                .collect();
+            (client, bearer_request, state.bearer.clone(), due)
+        };
+
+        if let Some((auth_url, payload)) = bearer_request {
+            if let Ok((token, expires_in_secs)) =
+                request_bearer_token(&client, &auth_url, &payload).await
+            {
+                let token = AuthToken::from_token(token, expires_in_secs);
+                self.refreshes.fetch_add(1, Ordering::Relaxed);
+                self.publish_bearer(&mut self.state(), token.clone(), expires_in_secs);
+                bearer = Some(token);
+            }
+        }
+        let bearer = match bearer {
+            Some(bearer) => bearer,
+            None => return,
+        };
+        for (key, url) in due {
+            if let Ok((token, expires_in_secs)) =
+                request_fusion_token(&client, &url, &bearer.token).await
+            {
+                let token = AuthToken::from_token(token, expires_in_secs);
+                self.refreshes.fetch_add(1, Ordering::Relaxed);
+                let mut state = self.state();
+                if let Some(hot) = state.hot.get_mut(&key) {
+                    hot.token = token.clone();
+                    hot.lifetime = expires_in_secs;
+                }
+                self.publish_fusion(&mut state, key, token);
+            }
+        }
+    }
+}
+
+async fn refresh_tokens_periodically(cache: Weak<TokenCache>) {
+    let mut interval = tokio::time::interval(Duration::from_secs(TOKEN_REFRESH_CHECK_SECS));
+    loop {
+        interval.tick().await;
+        // the task ends with the credentials
+        match cache.upgrade() {
+            Some(cache) => cache.refresh_due_tokens().await,
+            None => return,
+        }
+    }
+}
+
 #[pyclass(module = "fusion._fusion")]
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct FusionCredentials {
@@ -331,6 +547,13 @@ pub struct FusionCredentials {
 
     #[serde(skip)]
     http_client: Option<reqwest::Client>,
+
+    #[serde(skip)]
+    token_cache: Arc<TokenCache>,
+
+    // Version of the shared tokens last picked up by these credentials
+    #[serde(skip)]
+    token_version: u64,
 }
 
 impl Default for FusionCredentials {
@@ -349,10 +572,134 @@ impl Default for FusionCredentials {
             fusion_e2e: None,
             headers: HashMap::new(),
             http_client: None,
+            token_cache: Arc::default(),
+            token_version: 0,
         }
     }
 }
 
+impl FusionCredentials {
+    fn bearer_payload(&self) -> PyResult<Option<Vec<(String, String)>>> {
+        let required = |name: &str, value: &Option<String>| {
+            value
+                .clone()
+                .ok_or_else(|| CredentialError::new_err(format!("Missing {}", name)))
+        };
+        let payload = match self.grant_type.as_str() {
+            "client_credentials" => vec![
+                ("grant_type".to_string(), self.grant_type.clone()),
+                (
+                    "client_id".to_string(),
+                    required("client ID", &self.client_id)?,
+                ),
+                (
+                    "client_secret".to_string(),
+                    required("client secret", &self.client_secret)?,
+                ),
+                ("aud".to_string(), required("resource", &self.resource)?),
+            ],
+            "password" => vec![
+                ("grant_type".to_string(), self.grant_type.clone()),
+                (
+                    "client_id".to_string(),
+                    required("client ID", &self.client_id)?,
+                ),
+                (
+                    "username".to_string(),
+                    required("username", &self.username)?,
+                ),
+                (
+                    "password".to_string(),
+                    required("password", &self.password)?,
+                ),
+                (
+                    "resource".to_string(),
+                    required("resource", &self.resource)?,
+                ),
+            ],
+            "bearer" => return Ok(None),
+            _ => return Err(PyValueError::new_err("Unrecognized grant type")),
+        };
+        Ok(Some(payload))
+    }
+
+    fn apply_refreshed_tokens(&mut self) {
+        let seen = self.token_version;
+        if self.token_cache.version.load(Ordering::SeqCst) == seen {
+            return;
+        }
+        let (version, bearer, fusion) = {
+            let state = self.token_cache.state();
+            let bearer = state
+                .latest_bearer
+                .as_ref()
+                .filter(|(version, _)| *version > seen)
+                .map(|(_, token)| token.clone());
+            let fusion: Vec<(String, AuthToken)> = state
+                .latest_fusion
+                .iter()
+                .filter(|(_, (version, _))| *version > seen)
+                .map(|(key, (_, token))| (key.clone(), token.clone()))
+                .collect();
+            // read under the lock, so no token published after it is skipped
+            (
+                self.token_cache.version.load(Ordering::SeqCst),
+                bearer,
+                fusion,
+            )
+        };
+        let newer = |current: Option<&AuthToken>, token: &AuthToken| {
+            current.map_or(true, |current| {
+                current.expiry.is_some() && token.expiry.map_or(true, |e| Some(e) > current.expiry)
+            })
+        };
+        if let Some(token) = bearer {
+            if newer(self.bearer_token.as_ref(), &token) {
+                self.bearer_token = Some(token);
+            }
+        }
+        for (key, token) in fusion {
+            if newer(self.fusion_token.get(&key), &token) {
+                self.fusion_token.insert(key, token);
+            }
+        }
+        self.token_version = version;
+    }
+
+    fn share_with_token_refresher(&self, py: Python) {
+        // the credentials are published once, then again whenever a bearer token is requested
+        if self
+            .token_cache
+            .refresher_started
+            .swap(true, Ordering::SeqCst)
+        {
+            return;
+        }
+        // credentials without the fields to request a bearer token still work while their
+        // token is valid, they are just not refreshed in the background
+        let payload = match self.bearer_payload() {
+            Ok(payload) => payload,
+            Err(e) => {
+                warn!("Tokens are not refreshed in the background: {}", e);
+                return;
+            }
+        };
+        {
+            let mut state = self.token_cache.state();
+            state.client = self.http_client.clone();
+            state.auth_url = self.auth_url.clone();
+            state.payload = payload;
+            if state.bearer.is_none() {
+                state.bearer = self.bearer_token.clone();
+            }
+        }
+        let rt = &get_tokio_runtime(py).0;
+        rt.spawn(refresh_tokens_periodically(Arc::downgrade(
+            &self.token_cache,
+        )));
+    }
+}
+
 #[pymethods]
 impl FusionCredentials {
     fn __getstate__(&self) -> PyResult<Vec<u8>> {
@@ -421,6 +768,8 @@ impl FusionCredentials {
             username: None,
             password: None,
             http_client: None,
+            token_cache: Arc::default(),
+            token_version: 0,
         })
     }
 
@@ -459,6 +808,8 @@ impl FusionCredentials {
             bearer_token: None,
             client_secret: None,
             http_client: None,
+            token_cache: Arc::default(),
+            token_version: 0,
         })
     }
 
@@ -500,6 +851,8 @@ impl FusionCredentials {
             username: None,
             password: None,
             http_client: None,
+            token_cache: Arc::default(),
+            token_version: 0,
         })
     }
 
@@ -533,6 +886,8 @@ impl FusionCredentials {
             fusion_e2e,
             headers: headers.unwrap_or_default(),
             http_client: None,
+            token_cache: Arc::default(),
+            token_version: 0,
         })
     }
 
@@ -562,60 +917,19 @@ impl FusionCredentials {
                 "HTTP client not initialized. Use from_* methods to create credentials",
             )
         })?;
-        let payload = match self.grant_type.clone().as_str() {
-            "client_credentials" => {
-                vec![
-                    ("grant_type", self.grant_type.as_str()),
-                    ("client_id", self.client_id.as_ref().unwrap()),
-                    ("client_secret", self.client_secret.as_ref().unwrap()),
-                    ("aud", self.resource.as_ref().unwrap()),
-                ]
-            }
-            "password" => {
-                vec![
-                    ("grant_type", self.grant_type.as_str()),
-                    ("client_id", self.client_id.as_ref().unwrap()),
-                    ("username", self.username.as_ref().unwrap()),
-                    ("password", self.password.as_ref().unwrap()),
-                    ("resource", self.resource.as_ref().unwrap()),
-                ]
-            }
-            "bearer" => {
-                // Nothing to do
-                return Ok(());
-            }
-            _ => {
-                return Err(PyValueError::new_err("Unrecognized grant type"));
-            }
+        let payload = match self.bearer_payload()? {
+            Some(payload) => payload,
+            // Nothing to do
+            None => return Ok(()),
         };
+        let auth_url = self
+            .auth_url
+            .clone()
+            .ok_or_else(|| CredentialError::new_err("Auth URL is missing"))?;
         let rt = &get_tokio_runtime(py).0;
 
-        let response_res: PyResult<json::JsonValue> = rt.block_on(async {
-            let res = client
-                .post(self.auth_url.as_ref().unwrap())
-                .header(
-                    "User-Agent",
-                    format!("fusion-python-sdk {}", env!("CARGO_PKG_VERSION")),
-                )
-                .form(&payload)
-                .send()
-                .await
-                .map_err(|e| {
-                    CredentialError::new_err(format!("Could not post request: {:?}", e))
-                })?;
-
-            let res_text = res.text().await.map_err(|e| {
-                CredentialError::new_err(format!("Could not get response text: {:?}", e))
-            })?;
-            let res_json = json::parse(&res_text).map_err(|e| {
-                CredentialError::new_err(format!("Could not parse test to json: {:?}", e))
-            })?;
-            debug!("Called for Bearer token. Response: {:?}", res_json);
-            Ok(res_json)
-        });
-        let response = response_res?;
-        let token = response["access_token"].as_str().unwrap().to_string();
-        let expires_in_secs = response["expires_in"].as_i64();
+        let (token, expires_in_secs) =
+            rt.block_on(request_bearer_token(client, &auth_url, &payload))?;
         match expires_in_secs {
             Some(expires_in_secs) => {
                 debug!("Got Bearer token, expires in: {}", expires_in_secs);
@@ -625,6 +939,15 @@ impl FusionCredentials {
             }
         }
         self.put_bearer_token(token, expires_in_secs);
+        // the clones and the background refresh use the new token, and the credentials it was requested with
+        let mut state = self.token_cache.state();
+        state.client = self.http_client.clone();
+        state.auth_url = Some(auth_url);
+        state.payload = Some(payload);
+        if let Some(token) = self.bearer_token.clone() {
+            self.token_cache
+                .publish_bearer(&mut state, token, expires_in_secs);
+        }
         Ok(())
     }
 
@@ -647,50 +970,14 @@ impl FusionCredentials {
                 "HTTP client not initialized. Use from_* methods to create credentials",
             )
         })?;
+        let bearer_token = self
+            .bearer_token
+            .as_ref()
+            .ok_or_else(|| CredentialError::new_err("Bearer token is missing".to_string()))?;
 
-        let response_res: PyResult<json::JsonValue> = rt.block_on(async {
-            let token = self
-                .bearer_token
-                .as_ref()
-                .ok_or_else(|| CredentialError::new_err("Bearer token is missing".to_string()))?;
-
-            let req = client
-                .get(&url)
-                .header("Authorization", format!("Bearer {}", token.token))
-                .header(
-                    "User-Agent",
-                    format!("fusion-python-sdk {}", env!("CARGO_PKG_VERSION")),
-                );
-
-            debug!("Calling for Fusion token: {:?}", req);
-
-            let res_maybe = req.send().await.map_err(|e| {
-                CredentialError::new_err(format!("Could not post request: {:?}", e))
-            })?;
-
-            let res = res_maybe
-                .error_for_status()
-                .map_err(|e| CredentialError::new_err(format!("Error from endpoint: {:?}", e)))?;
-
-            match res.text().await {
-                Ok(text) => {
-                    let res_json = json::parse(&text).map_err(|e| {
-                        CredentialError::new_err(format!(
-                            "Could not parse response to json: {:?}",
-                            e
-                        ))
-                    })?;
-                    Ok(res_json)
-                }
-                Err(e) => Err(CredentialError::new_err(format!(
-                    "Could not get response text: {:?}",
-                    e
-                ))),
-            }
-        });
-        let response = response_res?;
-        let token = response["access_token"].as_str().unwrap().to_string();
-        let expires_in_secs = response["expires_in"].as_i64();
+        debug!("Calling for Fusion token: {}", url);
+        let (token, expires_in_secs) =
+            rt.block_on(request_fusion_token(client, &url, &bearer_token.token))?;
         debug!("Got Fusion token, expires in: {:?}", expires_in_secs);
         Ok((token, expires_in_secs))
     }
@@ -700,12 +987,8 @@ impl FusionCredentials {
         py: Python,
         url: String,
     ) -> PyResult<HashMap<String, String>> {
-        // Ensure bearer token is valid, don't force refresh, and refresh if it expires in 30 seconds
         let mut ret = HashMap::new();
-        ret.insert(
-            "User-Agent".into(),
-            format!("fusion-python-sdk {}", env!("CARGO_PKG_VERSION")),
-        );
+        ret.insert("User-Agent".into(), user_agent());
         if self.fusion_e2e.is_some() {
             ret.insert(
                 "fusion-e2e".into(),
@@ -719,7 +1002,11 @@ impl FusionCredentials {
             }
         }
 
-        self._refresh_bearer_token(py, false, 30)?;
+        // Pick up the tokens refreshed in the background, then ensure the bearer token is valid,
+        // don't force refresh, and refresh if it expires in 30 seconds
+        self.apply_refreshed_tokens();
+        self._refresh_bearer_token(py, false, TOKEN_MIN_REMAIN_SECS as u32)?;
+        self.share_with_token_refresher(py);
         let bearer_token_tup = self
             .bearer_token
             .as_ref()
@@ -739,41 +1026,64 @@ impl FusionCredentials {
 
         let token_key = format!("{}_{}", catalog_name, dataset_name);
 
-        // Check if the token exists and if it's expired
-        let token_entry = self.fusion_token.entry(token_key.clone());
-        let (fusion_token_tup, new_token) = match token_entry {
-            std::collections::hash_map::Entry::Occupied(mut entry) => {
-                let token = entry.get_mut();
-                if let Some(expires_in_secs) = token.expires_in_secs() {
-                    if expires_in_secs > 30 {
-                        (None, Some(self._gen_fusion_token(py, fusion_tk_url)?))
-                    } else {
-                        (Some(token.as_fusion_header()?), None)
-                    }
-                } else {
-                    (Some(token.as_fusion_header()?), None)
-                }
+        // Reuse the cached token unless it is missing or about to expire
+        let cached = self
+            .fusion_token
+            .get(&token_key)
+            .filter(|token| {
+                token
+                    .expires_in_secs()
+                    .map_or(true, |secs| secs > TOKEN_MIN_REMAIN_SECS)
+            })
+            .cloned();
+        let (token, lifetime) = match cached {
+            Some(token) => {
+                self.token_cache.hits.fetch_add(1, Ordering::Relaxed);
+                (token, None)
             }
-            std::collections::hash_map::Entry::Vacant(_) => {
-                (None, Some(self._gen_fusion_token(py, fusion_tk_url)?))
+            None => {
+                self.token_cache.misses.fetch_add(1, Ordering::Relaxed);
+                let (new_token, expires_in_secs) =
+                    self._gen_fusion_token(py, fusion_tk_url.clone())?;
+                let token = AuthToken::from_token(new_token, expires_in_secs);
+                self.fusion_token.insert(token_key.clone(), token.clone());
+                let mut state = self.token_cache.state();
+                self.token_cache
+                    .publish_fusion(&mut state, token_key.clone(), token.clone());
+                (token, expires_in_secs)
             }
         };
 
-        // If we need to generate a new token, insert it into the HashMap
-        let fusion_token_tup = if let Some(new_token) = new_token {
-            let token = AuthToken::from_token(new_token.0, new_token.1);
-            self.fusion_token.insert(token_key, token.clone());
-            token.as_fusion_header()?
-        } else {
-            fusion_token_tup.unwrap()
-        };
+        // The token is kept fresh in the background while it is in use
+        {
+            let now = Utc::now().timestamp();
+            let mut state = self.token_cache.state();
+            let hot = state.hot.entry(token_key).or_insert_with(|| HotToken {
+                url: fusion_tk_url,
+                token: token.clone(),
+                lifetime,
+                last_used: now,
+            });
+            hot.token = token.clone();
+            if lifetime.is_some() {
+                hot.lifetime = lifetime;
+            }
+            hot.last_used = now;
+        }
 
+        let fusion_token_tup = token.as_fusion_header()?;
         ret.insert(bearer_token_tup.0, bearer_token_tup.1);
         ret.insert(fusion_token_tup.0, fusion_token_tup.1);
         debug!("Headers are {:?}", ret);
         Ok(ret)
     }
 
+    /// Number of Fusion tokens reused from the cache (hits), requested for a call (misses),
+    /// and tokens refreshed in the background before they expired (refreshes).
+    fn token_cache_stats(&self) -> HashMap<String, u64> {
+        self.token_cache.stats()
+    }
+
     fn get_fusion_token_expires_in(&self, token_key: String) -> PyResult<Option<i64>> {
         Ok(self
             .fusion_token
@@ -1300,6 +1610,242 @@ mod tests {
         assert!(expires_in.unwrap() <= 3600);
     }
 
+    #[test]
+    fn test_refresh_due() {
+        let now = Utc::now().timestamp();
+        assert!(!refresh_due(
+            &AuthToken::from_token("t".to_string(), None),
+            None,
+            now
+        ));
+        assert!(!refresh_due(
+            &AuthToken::from_token("t".to_string(), Some(3600)),
+            Some(3600),
+            now
+        ));
+        assert!(refresh_due(
+            &AuthToken::from_token("t".to_string(), Some(100)),
+            Some(3600),
+            now
+        ));
+        // short lived tokens are refreshed half way through
+        assert!(!refresh_due(
+            &AuthToken::from_token("t".to_string(), Some(100)),
+            Some(120),
+            now
+        ));
+        assert!(refresh_due(
+            &AuthToken::from_token("t".to_string(), Some(50)),
+            Some(120),
+            now
+        ));
+    }
+
+    #[test]
+    fn test_fusion_credentials_apply_refreshed_tokens() {
+        let mut creds = FusionCredentials::default();
+        creds.put_bearer_token("old".to_string(), Some(10));
+        creds.put_fusion_token("key".to_string(), "old".to_string(), Some(10));
+        let mut clone = creds.clone();
+        {
+            let cache = &creds.token_cache;
+            let mut state = cache.state();
+            cache.publish_bearer(
+                &mut state,
+                AuthToken::from_token("new".to_string(), Some(3600)),
+                Some(3600),
+            );
+            cache.publish_fusion(
+                &mut state,
+                "key".to_string(),
+                AuthToken::from_token("new".to_string(), Some(3600)),
+            );
+        }
+
+        // every clone picks up the tokens published after the version it last saw
+        for c in [&mut creds, &mut clone] {
+            c.apply_refreshed_tokens();
+            assert_eq!(c.bearer_token.clone().unwrap().token, "new".to_string());
+            assert_eq!(c.fusion_token.get("key").unwrap().token, "new".to_string());
+            assert_eq!(c.token_version, 2);
+        }
+        assert_eq!(creds.token_cache.state().latest_fusion.len(), 1);
+
+        // a token expiring before the one in use is not applied
+        clone.put_fusion_token("key".to_string(), "newest".to_string(), Some(7200));
+        {
+            let cache = &creds.token_cache;
+            let mut state = cache.state();
+            cache.publish_fusion(
+                &mut state,
+                "key".to_string(),
+                AuthToken::from_token("older".to_string(), Some(3600)),
+            );
+        }
+        clone.apply_refreshed_tokens();
+        assert_eq!(
+            clone.fusion_token.get("key").unwrap().token,
+            "newest".to_string()
+        );
+        assert_eq!(clone.token_version, 3);
+        assert_eq!(
+            creds.token_cache_stats(),
+            HashMap::from([
+                ("hits".to_string(), 0),
+                ("misses".to_string(), 0),
+                ("refreshes".to_string(), 0),
+            ])
+        );
+    }
+
+    #[test]
+    fn test_get_fusion_token_headers_without_refresh_fields() {
+        pyo3::prepare_freethreaded_python();
+        Python::with_gil(|py| {
+            // no client secret, so the bearer token cannot be refreshed
+            let mut creds = FusionCredentials::from_client_id(
+                &py.get_type_bound::<FusionCredentials>(),
+                Some("client_id".to_string()),
+                None,
+                Some("resource".to_string()),
+                None,
+                None,
+                None,
+                None,
+            )
+            .unwrap();
+            creds.put_bearer_token("bearer".to_string(), Some(3600));
+
+            let headers = creds
+                .get_fusion_token_headers(
+                    py,
+                    "https://fusion.example.com/api/v1/catalogs".to_string(),
+                )
+                .unwrap();
+
+            assert_eq!(
+                headers.get("Authorization"),
+                Some(&"Bearer bearer".to_string())
+            );
+            assert!(creds.token_cache.refresher_started.load(Ordering::SeqCst));
+            assert!(creds.token_cache.state().client.is_none());
+        });
+    }
+
+    #[test]
+    fn test_token_cache_refresh_due_tokens() {
+        let mut server = mockito::Server::new();
+        let auth_mock = server
+            .mock("POST", "/token")
+            .with_status(200)
+            .with_body(r#"{"access_token": "bearer-new", "expires_in": 3600}"#)
+            .expect(1)
+            .create();
+        let hot_mock = server
+            .mock("GET", "/catalogs/c/datasets/hot/authorize/token")
+            .match_header("authorization", "Bearer bearer-new")
+            .with_status(200)
+            .with_body(r#"{"access_token": "fusion-new", "expires_in": 3600}"#)
+            .expect(1)
+            .create();
+        let cold_mock = server
+            .mock("GET", "/catalogs/c/datasets/cold/authorize/token")
+            .expect(0)
+            .create();
+
+        let mut creds = FusionCredentials::default();
+        creds.put_bearer_token("bearer-old".to_string(), Some(10));
+        creds.put_fusion_token("c_hot".to_string(), "fusion-old".to_string(), Some(10));
+        let mut clone = creds.clone();
+        {
+            let now = Utc::now().timestamp();
+            let hot_token = |dataset: &str, last_used: i64| HotToken {
+                url: format!(
+                    "{}/catalogs/c/datasets/{}/authorize/token",
+                    server.url(),
+                    dataset
+                ),
+                token: AuthToken::from_token("fusion-old".to_string(), Some(10)),
+                lifetime: Some(3600),
+                last_used,
+            };
+            let mut state = creds.token_cache.state();
+            state.client = Some(reqwest::Client::new());
+            state.auth_url = Some(format!("{}/token", server.url()));
+            state.payload = Some(vec![(
+                "grant_type".to_string(),
+                "client_credentials".to_string(),
+            )]);
+            state.bearer = creds.bearer_token.clone();
+            state.bearer_lifetime = Some(3600);
+            state.hot.insert("c_hot".to_string(), hot_token("hot", now));
+            // tokens not used for a while are no longer refreshed
+            state.hot.insert(
+                "c_cold".to_string(),
+                hot_token("cold", now - HOT_TOKEN_SECS),
+            );
+        }
+
+        tokio::runtime::Runtime::new()
+            .unwrap()
+            .block_on(creds.token_cache.refresh_due_tokens());
+
+        auth_mock.assert();
+        hot_mock.assert();
+        cold_mock.assert();
+        assert_eq!(creds.token_cache_stats().get("refreshes"), Some(&2));
+        {
+            let state = creds.token_cache.state();
+            assert_eq!(
+                state.hot.keys().collect::<Vec<_>>(),
+                vec![&"c_hot".to_string()]
+            );
+            assert_eq!(state.hot["c_hot"].token.token, "fusion-new".to_string());
+            assert_eq!(
+                state.bearer.clone().unwrap().token,
+                "bearer-new".to_string()
+            );
+        }
+        for c in [&mut creds, &mut clone] {
+            c.apply_refreshed_tokens();
+            assert_eq!(
+                c.bearer_token.clone().unwrap().token,
+                "bearer-new".to_string()
+            );
+            assert_eq!(
+                c.fusion_token.get("c_hot").unwrap().token,
+                "fusion-new".to_string()
+            );
+        }
+
+        // nothing is due until the new tokens near their expiry
+        tokio::runtime::Runtime::new()
+            .unwrap()
+            .block_on(creds.token_cache.refresh_due_tokens());
+        auth_mock.assert();
+        hot_mock.assert();
+        assert_eq!(creds.token_cache_stats().get("refreshes"), Some(&2));
+    }
+
+    #[test]
+    fn test_fusion_credentials_bearer_payload() {
+        let creds = FusionCredentials {
+            client_id: Some("id".to_string()),
+            client_secret: Some("secret".to_string()),
+            resource: Some("resource".to_string()),
+            ..FusionCredentials::default()
+        };
+        let payload = creds.bearer_payload().unwrap().unwrap();
+        assert!(payload.contains(&("aud".to_string(), "resource".to_string())));
+
+        let creds = FusionCredentials {
+            grant_type: "bearer".to_string(),
+            ..FusionCredentials::default()
+        };
+        assert!(creds.bearer_payload().unwrap().is_none());
+        assert!(FusionCredentials::default().bearer_payload().is_err());
+    }
+
     #[test]
     fn test_fusion_credentials_from_file() {
         pyo3::prepare_freethreaded_python();